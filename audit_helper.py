@@ -1,26 +1,109 @@
 #!/usr/bin/env python3
 import sys
+import os
 import json
+import threading
 from pathlib import Path
 
-from audit_viewer.parser import parse_audit_log_file
+from audit_viewer.event_filter import EventFilter, iter_filtered_events
+from audit_viewer.helper_stream import CANCEL_COMMAND, MSG_ERROR, encode_message, write_event_stream
+from audit_viewer.parser import iter_audit_events
+
+# Режим фонового сборщика: разобрать журнал один раз и отдавать события через UNIX-сокет
+SERVE_FLAG = "--serve"
+# Условия отбора от GUI (JSON EventFilter.to_dict()): лишнее не разбирается и не передаётся
+FILTER_FLAG = "--filter"
+
+
+def _filter_from_argv():
+    if FILTER_FLAG not in sys.argv:
+        return None
+    i = sys.argv.index(FILTER_FLAG)
+    if i + 1 >= len(sys.argv):
+        raise ValueError("не задано значение --filter")
+    event_filter = EventFilter.from_dict(json.loads(sys.argv[i + 1]))
+    return None if event_filter.is_empty else event_filter
+
+
+def _watch_cancel(cancel_event: threading.Event):
+    """Ждёт команду отмены от GUI на stdin (конец stdin отменой не считается)."""
+    # читаем дескриптор напрямую: поток sys.stdin с блокировкой мешал бы завершению процесса
+    fd = sys.stdin.fileno()
+    data = b""
+    try:
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return
+            data += chunk
+            *lines, data = data.split(b"\n")
+            if any(line.strip() == CANCEL_COMMAND for line in lines):
+                cancel_event.set()
+                return
+    except (OSError, ValueError):
+        pass
 
 
 def main():
+    if SERVE_FLAG in sys.argv:
+        return _serve()
+
+    out = sys.stdout.buffer
     log_path = Path("/var/log/audit/audit.log")
     if not log_path.exists():
-        print(json.dumps({"error": "log_not_found"}))
+        out.write(encode_message({"type": MSG_ERROR, "error": "log_not_found"}))
+        out.flush()
+        return 1
+
+    try:
+        event_filter = _filter_from_argv()
+    except (ValueError, TypeError, AttributeError) as e:
+        out.write(encode_message({"type": MSG_ERROR, "error": "bad_filter", "message": str(e)}))
+        out.flush()
         return 1
 
+    cancel_event = threading.Event()
+    threading.Thread(target=_watch_cancel, args=(cancel_event,), daemon=True).start()
+
     try:
-        events = parse_audit_log_file(str(log_path))
+        with open(log_path, "rb") as f:
+            total = os.fstat(f.fileno()).st_size
+            # события отдаются по мере сборки, а не после разбора всего файла;
+            # сырой текст передаётся в событиях — у GUI нет прав читать журнал
+            if event_filter is None:
+                events = iter_audit_events(f)
+            else:
+                events = iter_filtered_events(f, event_filter, cancelled=cancel_event.is_set)
+            write_event_stream(
+                out,
+                events,
+                total,
+                position=f.tell,
+                cancelled=cancel_event.is_set,
+            )
+    except BrokenPipeError:
+        # GUI закрыл канал (отмена/закрытие окна) — просто выходим
+        # (stdout перенаправляется в /dev/null, иначе сброс буфера при выходе снова упадёт)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
     except Exception as e:
-        print(json.dumps({"error": "parse_error", "message": str(e)}))
+        out.write(encode_message({"type": MSG_ERROR, "error": "parse_error", "message": str(e)}))
+        out.flush()
         return 1
 
-    print(json.dumps({"events": events}))
     return 0
 
 
+def _serve():
+    from audit_viewer.collector import serve
+
+    try:
+        return serve()
+    except (OSError, RuntimeError) as e:
+        print(f"audit_helper: {e}", file=sys.stderr)
+        return 1
+
+
 if __name__ == "__main__":
     sys.exit(main())
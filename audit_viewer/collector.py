@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import json
+import os
+import pwd
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .event_filter import EventFilter, follow_filter
+from .follow import AuditLogFollower
+from .helper_stream import (
+    MSG_DONE, MSG_ERROR, MSG_EVENTS, MSG_START, MessageDecoder, encode_message, write_event_stream,
+)
+from .parser import event_sort_key, parse_audit_log_file_checkpoint
+from .rawtext import raw_log_files
+
+# Фоновый сборщик (helper в режиме --serve): живёт от root, держит разобранный
+# системный журнал в памяти, дочитывает его по мере роста и отдаёт события
+# через UNIX-сокет только пользователю, запустившему его через pkexec.
+COLLECTOR_SOCKET_DIR = "/run/audit-viewer"
+COLLECTOR_LOG_PATH = "/var/log/audit/audit.log"
+
+# Как часто сборщик дочитывает журнал
+COLLECTOR_POLL_SECONDS = 1.0
+# Сколько ждать ответа сборщика в блокирующем запросе (collector_request)
+COLLECTOR_CLIENT_TIMEOUT = 5.0
+
+# Команды запроса (одна JSON-строка от клиента)
+CMD_EVENTS = "events"
+CMD_SHUTDOWN = "shutdown"
+
+_PEERCRED = struct.Struct("3i")  # pid, uid, gid
+
+
+def collector_socket_path(uid: Optional[int] = None) -> str:
+    """Путь сокета сборщика для пользователя uid (по умолчанию — текущего)."""
+    if uid is None:
+        uid = os.getuid()
+    return os.path.join(COLLECTOR_SOCKET_DIR, f"{uid}.sock")
+
+
+def _invoking_user() -> tuple:
+    """(uid, gid) пользователя, от имени которого запущен helper (pkexec/sudo), иначе — текущего."""
+    for uid_var, gid_var in (("PKEXEC_UID", None), ("SUDO_UID", "SUDO_GID")):
+        value = os.environ.get(uid_var)
+        if value and value.isdigit():
+            uid = int(value)
+            gid = os.environ.get(gid_var or "", "")
+            if not gid.isdigit():
+                try:
+                    gid = pwd.getpwuid(uid).pw_gid
+                except KeyError:
+                    gid = uid
+            return uid, int(gid)
+    return os.getuid(), os.getgid()
+
+
+class CollectorIndex:
+    """
+    Разобранный журнал: события в порядке поступления, номер события в списке —
+    его seq. Запрос "события начиная с seq" — срез списка; для слежения клиенту
+    достаточно помнить следующий seq (next) и session — идентификатор запуска
+    сборщика (после перезапуска номера начинаются заново).
+    """
+
+    def __init__(self, path: str = COLLECTOR_LOG_PATH, poll_seconds: float = COLLECTOR_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.session = uuid.uuid4().hex
+
+        self.events: List[Any] = []
+        self.error: Optional[str] = None
+        self.ready = threading.Event()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._follower: Optional[AuditLogFollower] = None
+
+    def start(self):
+        threading.Thread(target=self._run, name="collector", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            # начальный разбор — параллельный, как при открытии файла; слежение
+            # продолжает ровно с того места, докуда дочитал разбор (иначе события,
+            # записанные во время разбора, попали бы в self.events дважды)
+            events, checkpoint = parse_audit_log_file_checkpoint(self.path, workers=os.cpu_count() or 1)
+            events.reverse()  # parse_audit_log_file() отдаёт от новых к старым
+            with self._lock:
+                self.events = events
+            self._follower = AuditLogFollower.from_checkpoint(checkpoint)
+        except Exception as e:
+            self.error = str(e)
+            return
+        finally:
+            self.ready.set()
+
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                new_events = self._follower.poll()
+                while not self._follower.at_eof:
+                    new_events.extend(self._follower.poll())
+            except OSError:
+                continue  # журнал в момент ротации — попробуем при следующем опросе
+            if new_events:
+                new_events.sort(key=event_sort_key)
+                with self._lock:
+                    self.events.extend(new_events)
+            self._release_unlinked_files()
+
+    def _release_unlinked_files(self):
+        """
+        Разобранный при запуске журнал после ротации со временем удаляется с диска
+        (num_logs auditd, logrotate), но открытый дескриптор не даёт освободить
+        место. Текст его событий переносится в память, файл закрывается.
+        """
+        unlinked = raw_log_files.unlinked()
+        if not unlinked:
+            return
+        with self._lock:
+            for ev in self.events:
+                spans = ev.raw_spans
+                if spans and spans[0][0] in unlinked:
+                    ev.load_raw()
+        raw_log_files.release(unlinked)
+
+    def since(
+            self,
+            seq: int = 0,
+            since_ts: Optional[float] = None,
+            event_filter: Optional[EventFilter] = None,
+    ) -> tuple:
+        """
+        (события с номера seq и, если задан, с момента since_ts, прошедшие
+        event_filter; следующий seq).
+        """
+        with self._lock:
+            end = len(self.events)
+            selected = self.events[max(0, seq):end]
+        if since_ts is not None:
+            selected = [ev for ev in selected if ev.timestamp is not None and ev.timestamp >= since_ts]
+        if event_filter is not None and not event_filter.is_empty:
+            selected = [ev for ev in selected if event_filter.matches(ev)]
+        return selected, end
+
+
+class _CollectorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server: CollectorServer = self.server
+
+        # проверка собеседника по учётным данным ядра (SO_PEERCRED), а не по правам файла
+        creds = self.connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _PEERCRED.size)
+        _pid, uid, _gid = _PEERCRED.unpack(creds)
+        if uid not in (server.owner_uid, 0):
+            return
+
+        line = self.rfile.readline()
+        if not line:
+            return  # подключились без запроса (проверка, запущен ли сборщик)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = {}
+        if not isinstance(request, dict):
+            request = {}
+
+        try:
+            self._dispatch(server, request)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # клиент ушёл (отмена загрузки, закрытие окна)
+
+    def _dispatch(self, server: "CollectorServer", request: Dict[str, Any]):
+        cmd = request.get("cmd", CMD_EVENTS)
+        index = server.index
+
+        if cmd == CMD_SHUTDOWN:
+            self.wfile.write(encode_message({"type": MSG_DONE, "count": 0}))
+            threading.Thread(target=server.shutdown, daemon=True).start()
+            return
+
+        if cmd != CMD_EVENTS:
+            self.wfile.write(encode_message({"type": MSG_ERROR, "error": "unknown_command", "message": str(cmd)}))
+            return
+
+        index.ready.wait()
+        if index.error is not None:
+            self.wfile.write(encode_message({"type": MSG_ERROR, "error": "parse_error", "message": index.error}))
+            return
+
+        # seq из другого запуска сборщика не имеет смысла — отдаём всё
+        seq = request.get("since", 0) if request.get("session") == index.session else 0
+        event_filter = EventFilter.from_dict(request.get("filter")) if request.get("filter") else None
+        events, next_seq = index.since(int(seq or 0), request.get("since_ts"), event_filter)
+
+        write_event_stream(
+            self.wfile,
+            events,
+            len(events),
+            start_fields={"session": index.session, "reset": not seq},
+            done_fields={"session": index.session, "next": next_seq},
+        )
+
+
+class CollectorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, index: CollectorIndex, owner_uid: int):
+        self.index = index
+        self.owner_uid = owner_uid
+        super().__init__(socket_path, _CollectorHandler)
+
+
+def _prepare_socket_dir(socket_path: str):
+    """Каталог сокета: создаётся root'ом, не должен быть ссылкой или чужим."""
+    directory = os.path.dirname(socket_path)
+    os.makedirs(directory, mode=0o755, exist_ok=True)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise RuntimeError(f"небезопасный каталог сокета: {directory}")
+
+    if os.path.lexists(socket_path):
+        if collector_is_running(socket_path):
+            raise RuntimeError(f"сборщик уже запущен: {socket_path}")
+        os.unlink(socket_path)  # остался от аварийно завершённого сборщика
+
+
+def serve(log_path: str = COLLECTOR_LOG_PATH, socket_path: Optional[str] = None) -> int:
+    """Запускает сборщик и обслуживает запросы до команды shutdown."""
+    uid, gid = _invoking_user()
+    if socket_path is None:
+        socket_path = collector_socket_path(uid)
+
+    _prepare_socket_dir(socket_path)
+
+    index = CollectorIndex(log_path)
+    index.start()
+
+    server = CollectorServer(socket_path, index, uid)
+    try:
+        os.chown(socket_path, uid, gid)
+        os.chmod(socket_path, 0o600)
+        server.serve_forever()
+    finally:
+        index.stop()
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+    return 0
+
+
+# --- клиент ---
+
+class CollectorCheckpoint(NamedTuple):
+    """
+    Докуда клиент получил события сборщика (для дозапроса и слежения);
+    filter — условия отбора (EventFilter.to_dict()), с которыми они запрошены.
+    """
+    socket_path: str
+    session: str
+    next: int
+    filter: Optional[Dict[str, Any]] = None
+
+
+def collector_is_running(socket_path: Optional[str] = None) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(socket_path or collector_socket_path())
+        return True
+    except OSError:
+        return False
+
+
+def collector_request(socket_path: str, request: Dict[str, Any], timeout: float = COLLECTOR_CLIENT_TIMEOUT) -> List[Dict[str, Any]]:
+    """Отправляет запрос сборщику и возвращает все сообщения ответа (блокирующий вызов)."""
+    decoder = MessageDecoder()
+    messages: List[Dict[str, Any]] = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(encode_message(request))
+        while True:
+            data = sock.recv(1 << 16)
+            if not data:
+                break
+            messages.extend(decoder.feed(data))
+    return messages
+
+
+def collector_shutdown(socket_path: Optional[str] = None):
+    collector_request(socket_path or collector_socket_path(), {"cmd": CMD_SHUTDOWN})
+
+
+class CollectorFollower:
+    """
+    Слежение через сборщик: запрос событий после последнего полученного seq
+    (request()) и разбор ответа (handle_response()). Соединение — у вызывающего:
+    GUI отправляет запрос через QLocalSocket, не блокируясь на время, пока
+    сборщик дочитывает журнал. poll() — то же блокирующим запросом,
+    интерфейс как у AuditLogFollower (poll/close).
+    """
+
+    def __init__(self, checkpoint: CollectorCheckpoint):
+        self.checkpoint = checkpoint
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: CollectorCheckpoint) -> "CollectorFollower":
+        return cls(checkpoint)
+
+    def close(self):
+        pass
+
+    def poll(self) -> List[Dict[str, Any]]:
+        return self.handle_response(collector_request(self.checkpoint.socket_path, self.request()))
+
+    def request(self) -> Dict[str, Any]:
+        """Запрос событий после checkpoint (одно сообщение протокола)."""
+        cp = self.checkpoint
+        request = {"cmd": CMD_EVENTS, "since": cp.next, "session": cp.session}
+        filter_dict = follow_filter(cp.filter)
+        if filter_dict is not None:
+            request["filter"] = filter_dict
+        return request
+
+    def handle_response(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Сообщения ответа на request() → новые события; checkpoint сдвигается
+        на next из done. Ошибка сборщика, его перезапуск или ответ без done — OSError.
+        """
+        cp = self.checkpoint
+        events: List[Dict[str, Any]] = []
+        done = False
+        for msg in messages:
+            msg_type = msg.get("type")
+            if msg_type == MSG_EVENTS:
+                events.extend(msg.get("events") or [])
+            elif msg_type == MSG_START and msg.get("session") != cp.session:
+                # сборщик перезапущен — продолжать с прежнего seq нельзя
+                raise OSError("сборщик перезапущен")
+            elif msg_type == MSG_DONE:
+                self.checkpoint = cp._replace(next=msg.get("next", cp.next))
+                done = True
+            elif msg_type == MSG_ERROR:
+                raise OSError(msg.get("message") or msg.get("error"))
+        if not done:
+            # без done неизвестно, докуда получены события
+            raise OSError("ответ сборщика оборван")
+        return events
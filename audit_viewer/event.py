@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .rawtext import RawSpan, read_raw_spans
+from .timefmt import format_timestamp
+
+# Поля события в порядке, в котором их отдаёт build_event_summary()
+EVENT_FIELDS: Tuple[str, ...] = (
+    "time", "timestamp", "event_id", "node", "user", "event_type", "comm", "exe",
+    "pid", "ppid", "syscall", "syscall_name", "arch", "exit", "cwd", "tty", "acct", "addr", "hostname",
+    "success", "key", "details", "raw",
+)
+
+_FIELD_SET = frozenset(EVENT_FIELDS)
+
+
+def intern_str(value: Optional[str]) -> Optional[str]:
+    """sys.intern для повторяющихся значений (comm, exe, user, ...); None остаётся None."""
+    if value is None:
+        return None
+    return sys.intern(value)
+
+
+# Кортежи имён полей record'ов. У record'ов одного типа набор и порядок полей
+# обычно совпадают, поэтому кортеж имён хранится один раз на все такие record'ы.
+_FIELD_LAYOUTS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+class EventDetails(Mapping):
+    """
+    details события — поля всех его record'ов.
+
+    При повторе ключа (например, name из нескольких PATH) значения собираются
+    в список, как раньше делал _merge_fields_to_details(). Сводный словарь
+    строится только при обращении ко всему набору (перебор, items(), len())
+    и запоминается; отдельные ключи (get(), first(), [], in) ищутся прямо
+    по record'ам без сборки.
+
+    Каждый record хранится как кортеж значений + общий кортеж имён полей.
+    """
+
+    __slots__ = ("_parts", "_merged")
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = ()):
+        parts: List[tuple] = []
+        layouts = _FIELD_LAYOUTS
+        for fields in records:
+            keys = tuple(fields)
+            layout = layouts.get(keys)
+            if layout is None:
+                layout = layouts[keys] = keys
+            parts += (layout, tuple(fields.values()))
+        # (имена_1, значения_1, имена_2, значения_2, ...)
+        self._parts = tuple(parts)
+        self._merged: Optional[Dict[str, Any]] = None
+
+    def _values(self, key: str) -> List[Any]:
+        parts = self._parts
+        values = []
+        for i in range(0, len(parts), 2):
+            keys = parts[i]
+            if key in keys:
+                values.append(parts[i + 1][keys.index(key)])
+        return values
+
+    def _merge(self) -> Dict[str, Any]:
+        merged = self._merged
+        if merged is None:
+            merged = {}
+            parts = self._parts
+            for i in range(0, len(parts), 2):
+                for k, v in zip(parts[i], parts[i + 1]):
+                    if k in merged:
+                        # уже есть значение → агрегируем в список
+                        if isinstance(merged[k], list):
+                            merged[k].append(v)
+                        else:
+                            merged[k] = [merged[k], v]
+                    else:
+                        merged[k] = v
+            self._merged = merged
+        return merged
+
+    def first(self, key: str, default: Any = None) -> Any:
+        """Первое значение поля (из первого record'а, где оно есть) без сборки details."""
+        if self._merged is not None:
+            value = self._merged.get(key, default)
+            return value[0] if isinstance(value, list) else value
+        parts = self._parts
+        for i in range(0, len(parts), 2):
+            keys = parts[i]
+            if key in keys:
+                return parts[i + 1][keys.index(key)]
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if self._merged is not None:
+            return self._merged[key]
+        values = self._values(key)
+        if not values:
+            raise KeyError(key)
+        return values[0] if len(values) == 1 else values
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        parts = self._parts
+        return any(key in parts[i] for i in range(0, len(parts), 2))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._merge())
+
+    def __len__(self) -> int:
+        return len(self._merge())
+
+    def __repr__(self) -> str:
+        return f"EventDetails({self._merge()!r})"
+
+
+def details_first(details: Mapping, key: str, default: Any = None) -> Any:
+    """
+    Первое значение поля из details (EventDetails или обычного dict):
+    строка — как есть, список — его первый элемент, нет ключа — default.
+    """
+    if isinstance(details, EventDetails):
+        return details.first(key, default)
+    val = details.get(key, default)
+    if isinstance(val, list):
+        if val:
+            return val[0]
+        return default
+    return val
+
+
+class AuditEvent:
+    """
+    Событие аудита (результат build_event_summary()).
+
+    Компактная замена dict'у на ~20 ключей: атрибуты в __slots__, без
+    __dict__ на каждый объект. Повторяющиеся строки (comm, exe, user,
+    event_type, key, ...) интернируются, так что одинаковые значения
+    разных событий — один объект в памяти.
+
+    Сырой текст может не храниться в событии: raw_spans — участки файла
+    журнала (file_id, offset, length), текст по ним читается через mmap
+    при обращении к raw (см. rawtext.RawLogFiles).
+
+    Поддерживает чтение как dict (get(), [], in, keys(), items()), поэтому
+    сценарии инцидентов и вкладки работают с ним так же, как раньше со словарём.
+    """
+
+    __slots__ = tuple(name for name in EVENT_FIELDS if name not in ("time", "raw")) + ("_raw", "raw_spans")
+
+    def __init__(
+            self,
+            timestamp: Optional[float] = None,
+            event_id: Optional[int] = None,
+            node: Optional[str] = None,
+            user: str = "?",
+            event_type: str = "",
+            comm: str = "",
+            exe: str = "",
+            pid: Optional[str] = None,
+            ppid: Optional[str] = None,
+            syscall: Optional[str] = None,
+            syscall_name: Optional[str] = None,
+            arch: Optional[str] = None,
+            exit: Optional[str] = None,
+            cwd: Optional[str] = None,
+            tty: Optional[str] = None,
+            acct: Optional[str] = None,
+            addr: Optional[str] = None,
+            hostname: Optional[str] = None,
+            success: Optional[bool] = None,
+            key: str = "",
+            details: Optional[Mapping] = None,
+            raw: Optional[str] = None,
+            raw_spans: Optional[Tuple[RawSpan, ...]] = None,
+    ):
+        self.timestamp = timestamp
+        self.event_id = event_id
+        self.node = intern_str(node)
+        self.user = intern_str(user)
+        self.event_type = intern_str(event_type)
+        self.comm = intern_str(comm)
+        self.exe = intern_str(exe)
+        self.pid = pid
+        self.ppid = ppid
+        self.syscall = intern_str(syscall)
+        self.syscall_name = intern_str(syscall_name)
+        self.arch = intern_str(arch)
+        self.exit = intern_str(exit)
+        self.cwd = intern_str(cwd)
+        self.tty = intern_str(tty)
+        self.acct = intern_str(acct)
+        self.addr = addr
+        self.hostname = intern_str(hostname)
+        self.success = success
+        self.key = intern_str(key)
+        self.details = details if details is not None else {}
+        self._raw = raw
+        self.raw_spans = raw_spans
+
+    @property
+    def time(self) -> str:
+        """'YYYY-MM-DD HH:MM:SS' — форматируется из timestamp при обращении (с кэшем по секундам)."""
+        if self.timestamp is None:
+            return ""
+        return format_timestamp(self.timestamp)
+
+    @property
+    def raw(self) -> str:
+        """Строки record'ов события; при raw_spans читаются из файла по запросу."""
+        if self._raw is not None:
+            return self._raw
+        if self.raw_spans:
+            return read_raw_spans(self.raw_spans)
+        return ""
+
+    def load_raw(self):
+        """Читает сырой текст из файла в событие: дальше оно не ссылается на файл (его можно закрыть)."""
+        if self._raw is None and self.raw_spans:
+            self._raw = read_raw_spans(self.raw_spans, cache=False)
+        self.raw_spans = None
+
+    def raw_size(self) -> int:
+        """Длина сырого текста (без чтения файла)."""
+        if self._raw is None and self.raw_spans:
+            return sum(length for _, _, length in self.raw_spans) + len(self.raw_spans) - 1
+        return len(self.raw)
+
+    # --- совместимость с dict ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in _FIELD_SET
+
+    def keys(self) -> Tuple[str, ...]:
+        return EVENT_FIELDS
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for name in EVENT_FIELDS:
+            yield name, getattr(self, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Обычный dict (для JSON и т.п.)."""
+        data = {name: getattr(self, name) for name in EVENT_FIELDS}
+        data["details"] = dict(self.details)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AuditEvent":
+        # time не передаётся — он вычисляется из timestamp
+        return cls(**{k: v for k, v in data.items() if (k in _FIELD_SET and k != "time") or k == "raw_spans"})
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, AuditEvent):
+            return all(getattr(self, n) == getattr(other, n) for n in EVENT_FIELDS)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"AuditEvent(time={self.time!r}, event_type={self.event_type!r}, "
+                f"user={self.user!r}, comm={self.comm!r}, event_id={self.event_id!r})")
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .identity import IdentityResolver
+from .parser import (
+    DEFAULT_REORDER_RECORDS,
+    DEFAULT_REORDER_SECONDS,
+    AuditEventAssembler,
+    _choose_main_record,
+    find_time_offset,
+    iter_audit_records,
+    line_timestamp_bytes,
+)
+
+# Через сколько строк журнала проверять отмену при отборе: под фильтр может
+# не подходить ничего, и тогда события (и проверка отмены при их отправке) не появятся
+FILTER_CANCEL_CHECK_LINES = 4096
+
+
+class EventFilter:
+    """
+    Условия отбора событий, которые можно выполнить ещё при чтении журнала
+    (на стороне helper'а или сборщика), а не после передачи всех событий в GUI:
+
+        time_from/time_to — интервал времени (включительно; события без времени проходят);
+        event_types       — допустимые типы событий;
+        keys              — подстроки ключа правила (без учёта регистра, любая из);
+        users             — допустимые значения колонки "Пользователь".
+
+    Пустое условие (None/пустой набор) не ограничивает.
+    """
+
+    def __init__(
+            self,
+            time_from: Optional[float] = None,
+            time_to: Optional[float] = None,
+            event_types: Optional[Iterable[str]] = None,
+            keys: Optional[Iterable[str]] = None,
+            users: Optional[Iterable[str]] = None,
+    ):
+        self.time_from = time_from
+        self.time_to = time_to
+        self.event_types = frozenset(event_types or ())
+        self.keys = tuple(k.lower() for k in (keys or ()) if k)
+        self.users = frozenset(users or ())
+
+    @property
+    def is_empty(self) -> bool:
+        return (self.time_from is None and self.time_to is None
+                and not self.event_types and not self.keys and not self.users)
+
+    # --- передача в helper/сборщик (JSON) ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "time_from": self.time_from,
+            "time_to": self.time_to,
+            "event_types": sorted(self.event_types),
+            "keys": list(self.keys),
+            "users": sorted(self.users),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "EventFilter":
+        data = data or {}
+        return cls(
+            time_from=data.get("time_from"),
+            time_to=data.get("time_to"),
+            event_types=data.get("event_types"),
+            keys=data.get("keys"),
+            users=data.get("users"),
+        )
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EventFilter) and self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    # --- проверки ---
+
+    def time_matches(self, ts: Optional[float]) -> bool:
+        if ts is None:
+            return True
+        if self.time_from is not None and ts < self.time_from:
+            return False
+        if self.time_to is not None and ts > self.time_to:
+            return False
+        return True
+
+    def _key_matches(self, key: Optional[str]) -> bool:
+        if not self.keys:
+            return True
+        key = (key or "").lower()
+        return any(k in key for k in self.keys)
+
+    def records_match(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        Проверка по record'ам собранного события — до build_event_summary():
+        тип события и ключ берутся из основного record'а так же, как там.
+        Пользователь здесь не проверяется (его даёт резолвер uid → имя).
+        """
+        if not (self.event_types or self.keys):
+            return True
+        main_rec = _choose_main_record(records)
+        if self.event_types and main_rec["type"] not in self.event_types:
+            return False
+        return self._key_matches(main_rec["fields"].get("key", ""))
+
+    def matches(self, ev) -> bool:
+        """Полная проверка готового события (AuditEvent или dict)."""
+        if not self.time_matches(ev.get("timestamp")):
+            return False
+        if self.event_types and ev.get("event_type") not in self.event_types:
+            return False
+        if self.users and ev.get("user") not in self.users:
+            return False
+        return self._key_matches(ev.get("key"))
+
+
+def follow_filter(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Условия отбора (EventFilter.to_dict()) для дозапроса новых событий — при
+    слежении и повторной загрузке: без верхней границы времени, иначе события
+    новее неё не пришли бы никогда. None — без отбора.
+    """
+    if not data:
+        return None
+    data = dict(data, time_to=None)
+    return None if EventFilter.from_dict(data).is_empty else data
+
+
+class _FilteringAssembler(AuditEventAssembler):
+    """Сборщик, который не строит summary для событий, заведомо не проходящих фильтр."""
+
+    def __init__(self, event_filter: EventFilter, identities: Optional[IdentityResolver] = None):
+        super().__init__(DEFAULT_REORDER_RECORDS, DEFAULT_REORDER_SECONDS, identities)
+        self.event_filter = event_filter
+
+    def _emit(self, bucket: Dict[str, Any], ready: List[Dict[str, Any]]):
+        if not self.event_filter.records_match(bucket["records"]):
+            return
+        before = len(ready)
+        super()._emit(bucket, ready)
+        if len(ready) > before and not self.event_filter.matches(ready[-1]):
+            ready.pop()
+
+
+def _lines_in_time_range(
+        f: IO[bytes],
+        event_filter: EventFilter,
+        cancelled: Optional[Callable[[], bool]] = None,
+) -> Iterator[bytes]:
+    """
+    Строки журнала, record'ы которых попадают в интервал фильтра. Время берётся
+    из заголовка, без разбора полей; чтение прекращается, когда record'ы
+    ушли за time_to дальше окна переупорядочивания, или по cancelled()
+    (проверяется каждые FILTER_CANCEL_CHECK_LINES строк).
+    """
+    stop_after = None
+    if event_filter.time_to is not None:
+        stop_after = event_filter.time_to + DEFAULT_REORDER_SECONDS
+
+    for i, line in enumerate(f, 1):
+        if cancelled is not None and not i % FILTER_CANCEL_CHECK_LINES and cancelled():
+            return
+        ts = line_timestamp_bytes(line)
+        if ts is None:
+            continue
+        if stop_after is not None and ts > stop_after:
+            return
+        if event_filter.time_matches(ts):
+            yield line
+
+
+def iter_filtered_events(
+        f: IO[bytes],
+        event_filter: EventFilter,
+        identities: Optional[IdentityResolver] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+) -> Iterator[Any]:
+    """
+    События открытого (бинарного, несжатого) журнала f, проходящие фильтр.
+
+    Начало интервала находится двоичным поиском по файлу (find_time_offset),
+    record'ы вне интервала отбрасываются до разбора полей, события чужих
+    типов/ключей — до построения summary. f.tell() показывает, сколько прочитано.
+    cancelled() — отмена: чтение прекращается, даже если ни одно событие
+    ещё не подошло (незавершённые события тогда не отдаются).
+    """
+    if event_filter.time_from is not None:
+        f.seek(find_time_offset(f, event_filter.time_from - DEFAULT_REORDER_SECONDS))
+
+    assembler = _FilteringAssembler(event_filter, identities)
+    for rec in iter_audit_records(_lines_in_time_range(f, event_filter, cancelled)):
+        yield from assembler.feed(rec)
+    if cancelled is not None and cancelled():
+        return
+    yield from assembler.flush()
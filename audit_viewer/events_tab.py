@@ -1,6 +1,18 @@
+import re
+
 from PyQt5 import QtWidgets, QtCore
+import numpy as np
+
+from .event_filter import EventFilter
+from .index import CodesIn, SuccessIn, TimeRange, filter_rows, narrows
+from .loader import FilterJob, FilterWorker
+from .models import EventRowsModel, PlaceholderTableView
+from .query import QueryError, parse_query
+from .store import SUCCESS_UNKNOWN
+from .textindex import TextContains, TextRegex
 
-from .models import PlaceholderTableView, AuditEventsTableModel
+# Живой фильтр: отбор начинается, когда ввод в панели фильтров затих на столько мс
+FILTER_DEBOUNCE_MS = 250
 
 
 class EventsTabMixin:
@@ -61,11 +73,26 @@ class EventsTabMixin:
         self.events_table.setSortingEnabled(True)
         self.events_table.setAlternatingRowColors(True)
 
+        # одна модель на всё время работы: фильтры меняют только её массив строк
+        self.events_model = EventRowsModel(self.event_source, self)
+        self.events_table.setModel(self.events_model)
+        self.events_model.sort_requested.connect(self._request_sort_order)
+        self.events_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.events_table.selectionModel().selectionChanged.connect(self._on_event_selection_changed)
+
+        # Строка запроса над таблицей
+        table_widget = QtWidgets.QWidget()
+        table_layout = QtWidgets.QVBoxLayout()
+        table_layout.setContentsMargins(0, 0, 0, 0)
+        table_widget.setLayout(table_layout)
+        table_layout.addWidget(self._create_query_bar())
+        table_layout.addWidget(self.events_table)
+
         # Панель деталей события (пока заглушка)
         self.event_details = self._create_event_details_widget()
 
         # Добавляем в вертикальный сплиттер
-        right_splitter.addWidget(self.events_table)
+        right_splitter.addWidget(table_widget)
         right_splitter.addWidget(self.event_details)
         right_splitter.setStretchFactor(0, 3)  # таблица занимает больше места
         right_splitter.setStretchFactor(1, 1)  # детали меньше
@@ -106,6 +133,11 @@ class EventsTabMixin:
 
         self.to_datetime.setDateTime(QtCore.QDateTime(today, QtCore.QTime(23, 59, 59)))
         self.from_datetime.setDateTime(QtCore.QDateTime(month_ago_date, QtCore.QTime(0, 0, 0)))
+        # значения полей времени, выставленные программой, а не пользователем (см. _pushdown_filter)
+        self._auto_time_range = (
+            self.from_datetime.dateTime().toSecsSinceEpoch(),
+            self.to_datetime.dateTime().toSecsSinceEpoch(),
+        )
 
         filters_layout.addRow("Время от:", self.from_datetime)
         filters_layout.addRow("Время до:", self.to_datetime)
@@ -132,6 +164,8 @@ class EventsTabMixin:
 
         # Общий поиск
         self.search_edit = QtWidgets.QLineEdit()
+        self.search_edit.setPlaceholderText("подстрока или /регулярное выражение/")
+        self._search_error = ""
         filters_layout.addRow("Поиск по тексту:", self.search_edit)
 
         layout.addWidget(filters_group)
@@ -152,19 +186,113 @@ class EventsTabMixin:
         self.apply_filter_btn.clicked.connect(self._apply_filters)
         self.reset_filter_btn.clicked.connect(self._reset_filters)
 
+        self._init_live_filter()
+
         return panel
 
+    def _create_query_bar(self) -> QtWidgets.QWidget:
+        """Строка 'Запрос:' — выражение на языке запросов (query.parse_query()), дополняет фильтры слева."""
+        bar = QtWidgets.QWidget()
+        layout = QtWidgets.QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        bar.setLayout(layout)
+
+        self.query_edit = QtWidgets.QLineEdit()
+        self.query_edit.setPlaceholderText("type=SYSCALL and (exe~/bash$/ or key=web_shell) and details.name^=/etc/")
+        self.query_edit.setClearButtonEnabled(True)
+        self.query_edit.setToolTip(
+            "Условия: поле оператор значение, например pid=1234, exe~/bash$/, details.name^=/etc/\n"
+            "Операторы: = != ~ !~ (регулярное выражение) ^= $= *= (начало, конец, подстрока) < <= > >=\n"
+            "Поля: type, user, comm, exe, key, pid, ppid, exit, syscall, success, time, text, details.<ключ>\n"
+            "Условия соединяются and, or, not и скобками; слово без оператора ищется в тексте события"
+        )
+        # (текст запроса, его условия): разобранный запрос переиспользуется, пока текст не изменился
+        self._parsed_query = ("", [])
+
+        layout.addWidget(QtWidgets.QLabel("Запрос:"))
+        layout.addWidget(self.query_edit)
+
+        self.query_edit.returnPressed.connect(self._apply_filters)
+        self.query_edit.textChanged.connect(self._schedule_live_filter)
+        return bar
+
+    def _init_live_filter(self):
+        """
+        Живой фильтр: изменения полей панели применяются сами, без кнопки
+        'Применить'. Отбор идёт в отдельном потоке (FilterWorker) после паузы
+        ввода FILTER_DEBOUNCE_MS; новый ввод отменяет начатый отбор.
+        """
+        # последний выполненный отбор (FilterJob) — основа для следующего, если тот его сужает
+        self._last_filter = None
+
+        self.filter_debounce_timer = QtCore.QTimer(self)
+        self.filter_debounce_timer.setSingleShot(True)
+        self.filter_debounce_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_debounce_timer.timeout.connect(self._start_live_filter)
+
+        self.filter_thread = QtCore.QThread(self)
+        self.filter_worker = FilterWorker()
+        self.filter_worker.moveToThread(self.filter_thread)
+        self.filter_worker.finished.connect(self._on_live_filter_finished)
+        self.filter_worker.failed.connect(self._on_live_filter_failed)
+        self.filter_thread.finished.connect(self.filter_worker.deleteLater)
+        self.filter_thread.start()
+
+        for signal in (
+                self.search_edit.textChanged,
+                self.key_edit.textChanged,
+                self.type_combo.currentIndexChanged,
+                self.user_combo.currentIndexChanged,
+                self.success_combo.currentIndexChanged,
+                self.from_datetime.dateTimeChanged,
+                self.to_datetime.dateTimeChanged,
+        ):
+            signal.connect(self._schedule_live_filter)
+
+    def _stop_live_filter(self):
+        """Останавливает поток живого фильтра (при закрытии окна)."""
+        self.filter_debounce_timer.stop()
+        self.filter_worker.cancel()
+        self.filter_thread.quit()
+        self.filter_thread.wait()
+
+    def _schedule_live_filter(self, *args):
+        """Поле фильтра изменилось: начатый отбор больше не нужен, новый — после паузы ввода."""
+        if not self.all_events:
+            return
+        self.filter_worker.cancel()
+        self.filter_debounce_timer.start()
+
+    def _start_live_filter(self):
+        if not self.all_events:
+            return
+        try:
+            job = self._filter_job()
+        except QueryError as e:
+            # таблица остаётся прежней, пока запрос не исправлен
+            self.statusBar().showMessage(f"Ошибка в запросе: {e}")
+            return
+        self.filter_worker.submit(job)
+
+    def _on_live_filter_finished(self, job):
+        # пока шёл отбор, фильтры или набор событий могли смениться
+        if not self.filter_worker.is_current(job) or job.store is not self.all_events:
+            return
+        self._show_filter_result(job)
+
+    def _on_live_filter_failed(self, message: str):
+        self.statusBar().showMessage(f"Ошибка фильтра: {message}")
+
     def _update_time_filters_from_events(self):
         """
         Обновляет поля 'Время от' и 'Время до' по минимальному и максимальному timestamp
         в self.all_events. Если timestamp'ов нет — ничего не трогаем.
         """
-        timestamps = [ev.get("timestamp") for ev in self.all_events if ev.get("timestamp") is not None]
-        if not timestamps:
+        time_range = self.all_events.time_range()
+        if time_range is None:
             return
 
-        min_ts = min(timestamps)
-        max_ts = max(timestamps)
+        min_ts, max_ts = time_range
 
         from_dt = QtCore.QDateTime.fromSecsSinceEpoch(int(min_ts))
         to_dt = QtCore.QDateTime.fromSecsSinceEpoch(int(max_ts))
@@ -179,76 +307,179 @@ class EventsTabMixin:
         self.to_datetime.setDateTime(to_dt)
         self.from_datetime.blockSignals(False)
         self.to_datetime.blockSignals(False)
+        self._auto_time_range = (from_dt.toSecsSinceEpoch(), to_dt.toSecsSinceEpoch())
 
-    def _apply_filters(self):
-        """Применяет фильтры слева к self.all_events и обновляет таблицу."""
-        if not self.all_events:
-            # даже если пусто — обновим вид, чтобы показался плейсхолдер
-            self._update_events_view([])
-            return
-
-        # --- время ---
-        from_dt = self.from_datetime.dateTime()
-        to_dt = self.to_datetime.dateTime()
-
-        # делаем верхнюю границу включительно: добавим 1 сек
-        from_ts = from_dt.toSecsSinceEpoch()
-        to_ts = to_dt.toSecsSinceEpoch()
+    def _panel_conditions(self, query: bool = True):
+        """
+        Фильтры панели слева и (query=True) строки 'Запрос' — условия отбора
+        строк хранилища (все должны выполняться; порядок проверки выбирает
+        index.select_rows()). Ошибка в запросе — QueryError.
+        """
+        store = self.all_events
 
         type_filter = self.type_combo.currentText()
         user_filter = self.user_combo.currentText()
         success_filter = self.success_combo.currentText()
         key_filter = self.key_edit.text().strip().lower()
-        text_filter = self.search_edit.text().strip().lower()
 
-        filtered = []
+        # --- время (события без timestamp остаются) ---
+        conditions = [TimeRange(
+            self.from_datetime.dateTime().toSecsSinceEpoch(),
+            self.to_datetime.dateTime().toSecsSinceEpoch(),
+        )]
+
+        # --- тип события / пользователь: значения, которых нет в словаре, не найдутся ---
+        for name, value in (("event_type", type_filter), ("user", user_filter)):
+            if value != "Любой":
+                code = store.pools[name].code_of(value)
+                conditions.append(CodesIn(name, [] if code is None else [code]))
+
+        # --- статус успеха (неизвестный статус считается ошибкой) ---
+        if success_filter == "Только успешные":
+            conditions.append(SuccessIn([1]))
+        elif success_filter == "Только с ошибкой":
+            conditions.append(SuccessIn([0, SUCCESS_UNKNOWN]))
+
+        # --- ключ правила: подстрока ищется по словарю значений, а не по событиям ---
+        if key_filter:
+            conditions.append(CodesIn("key", store.pools["key"].codes_where(lambda v: key_filter in v.lower())))
+
+        # --- общий текстовый поиск (самое дорогое условие — последним) ---
+        text_condition = self._text_condition()
+        if text_condition is not None:
+            conditions.append(text_condition)
+
+        if query:
+            conditions.extend(self._query_conditions())
+        return conditions
+
+    def _query_conditions(self):
+        text = self.query_edit.text().strip()
+        if text != self._parsed_query[0]:
+            # те же объекты условий для того же текста — так index.narrows() видит, что запрос не менялся
+            self._parsed_query = (text, parse_query(text))
+        return self._parsed_query[1]
+
+    def _text_condition(self):
+        """
+        Условие поля 'Поиск по тексту': подстрока или, если текст в /косых чертах/,
+        регулярное выражение (без учёта регистра).
+        """
+        self._search_error = ""
+        text = self.search_edit.text().strip()
+        if not text:
+            return None
+        if len(text) > 2 and text.startswith("/") and text.endswith("/"):
+            try:
+                return TextRegex(text[1:-1])
+            except re.error as e:
+                self._search_error = f"ошибка в регулярном выражении ({e}), ищется как текст"
+        return TextContains(text)
+
+    def _filter_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Строки из rows (row id self.all_events), проходящие фильтры панели,
+        с сохранением их порядка — так проверяются новые события в режиме
+        слежения за журналом. Условия читаются с панели заново: верхняя граница
+        времени к этому моменту уже сдвинута вслед за журналом.
+        """
+        try:
+            conditions = self._panel_conditions()
+        except QueryError:
+            conditions = self._panel_conditions(query=False)
+        return filter_rows(self.all_events, rows, conditions)
 
-        for ev in self.all_events:
-            # --- фильтр по времени ---
-            ts = ev.get("timestamp")
-            if ts is not None:
-                # timestamp у нас в float секундах
-                if ts < from_ts or ts > to_ts:
-                    continue
-            # если ts None — можно либо пропускать, либо оставлять; оставим
+    def _filter_job(self, query: bool = True) -> FilterJob:
+        """
+        Отбор всех событий по фильтрам панели: кандидаты берутся из индексов
+        хранилища (index.select_rows(), для текста — индекс триграмм, если он
+        уже построен). Если фильтры только сузились с прошлого отбора
+        (дописан символ в поиск, выбран тип и т.п.), проверяется лишь его результат.
+        """
+        store = self.all_events
+        conditions = self._panel_conditions(query)
+        last = self._last_filter
+        base = None
+        if last is not None and last.store is store and narrows(conditions, last.conditions):
+            base = (last.rows, last.size)
+        return FilterJob(store, conditions, base)
+
+    def _pushdown_filter(self) -> EventFilter:
+        """
+        Фильтры панели, которые можно выполнить при чтении журнала (helper/сборщик):
+        время, тип, пользователь, ключ. Статус и текстовый поиск применяются уже в GUI.
 
-            # --- тип события ---
-            if type_filter != "Любой" and ev.get("event_type") != type_filter:
-                continue
+        Граница времени передаётся, только если пользователь сам изменил поле:
+        значение, выставленное программой (по умолчанию или по загруженным событиям),
+        ничего не сужает. Для нетронутого поля остаётся граница прошлой загрузки
+        с отбором — тогда повторная загрузка дозапрашивает только новые события.
+        """
+        previous = self._helper_filter or {}
+        time_bounds = []
+        for name, widget, auto_ts in (("time_from", self.from_datetime, self._auto_time_range[0]),
+                                      ("time_to", self.to_datetime, self._auto_time_range[1])):
+            ts = widget.dateTime().toSecsSinceEpoch()
+            time_bounds.append(ts if ts != auto_ts else previous.get(name))
 
-            # --- пользователь ---
-            if user_filter != "Любой" and ev.get("user") != user_filter:
-                continue
+        type_filter = self.type_combo.currentText()
+        user_filter = self.user_combo.currentText()
+        key_filter = self.key_edit.text().strip()
+        return EventFilter(
+            time_from=time_bounds[0],
+            time_to=time_bounds[1],
+            event_types=[type_filter] if type_filter != "Любой" else None,
+            keys=[key_filter] if key_filter else None,
+            users=[user_filter] if user_filter != "Любой" else None,
+        )
 
-            # --- статус успеха ---
-            success_val = ev.get("success", True)
-            if success_filter == "Только успешные" and not success_val:
-                continue
-            if success_filter == "Только с ошибкой" and success_val:
-                continue
+    def _apply_filters(self):
+        """Применяет фильтры слева к self.all_events и обновляет таблицу (сразу, в GUI-потоке)."""
+        # отложенный или начатый живой фильтр этим заменяется
+        self.filter_debounce_timer.stop()
+        self.filter_worker.cancel()
 
-            # --- ключ правила ---
-            if key_filter:
-                ev_key = (ev.get("key") or "").lower()
-                if key_filter not in ev_key:
-                    continue
-
-            # --- общий текстовый поиск ---
-            if text_filter:
-                haystack = " ".join([
-                    ev.get("comm", ""),
-                    ev.get("exe", ""),
-                    ev.get("raw", ""),
-                ]).lower()
-                if text_filter not in haystack:
-                    continue
-
-            filtered.append(ev)
-
-        self._update_events_view(filtered)
-        self.statusBar().showMessage(
-            f"Фильтр: показано {len(filtered)} из {len(self.all_events)} событий"
-        )
+        if not self.all_events:
+            # даже если пусто — обновим вид, чтобы показался плейсхолдер
+            self._last_filter = None
+            self._update_events_view([])
+            return
+
+        note = ""
+        try:
+            job = self._filter_job()
+        except QueryError as e:
+            # показываем отбор по фильтрам слева, без запроса
+            note = f"ошибка в запросе: {e}, запрос не применён"
+            job = self._filter_job(query=False)
+        job.run()
+        self._show_filter_result(job, note)
+
+    def _show_filter_result(self, job: FilterJob, note: str = ""):
+        """Показывает в таблице результат отбора job (по набору self.all_events)."""
+        self._last_filter = job
+        store = job.store
+        rows = job.rows
+        if job.size < len(store):
+            # события, дописанные слежением, пока шёл отбор
+            tail = np.arange(job.size, len(store), dtype=np.int64)
+            rows = np.concatenate([rows, filter_rows(store, tail, job.conditions)])
+
+        # row id растут от старых к новым
+        filtered = store.view(rows[::-1])
+
+        self._update_events_view(filtered.rows)
+        message = f"Фильтр: показано {len(filtered)} из {len(store)} событий"
+        for extra in (self._search_error, note):
+            if extra:
+                message += f"; {extra}"
+        self.statusBar().showMessage(message)
+
+    def _add_filter_choices(self):
+        """Добавляет в списки 'Тип события'/'Пользователь' значения, которых там ещё нет."""
+        for combo, field in ((self.type_combo, "event_type"), (self.user_combo, "user")):
+            for value in sorted(v for v in self.all_events.pools[field].values if v):
+                if combo.findText(value) < 0:
+                    combo.addItem(value)
 
     def _reset_filters(self):
         """Сбрасывает фильтры в исходное состояние и показывает все события."""
@@ -261,6 +492,7 @@ class EventsTabMixin:
         self.success_combo.setCurrentIndex(0)
         self.key_edit.clear()
         self.search_edit.clear()
+        self.query_edit.clear()
 
         self._apply_filters()
 
@@ -302,20 +534,14 @@ class EventsTabMixin:
 
         return widget
 
-    def _update_events_view(self, events):
-        """Обновляет таблицу событий новым списком events (уже отфильтрованных)."""
-        self.events_model = AuditEventsTableModel(events, self)
-        self.events_table.setModel(self.events_model)
-
-        header = self.events_table.horizontalHeader()
-        header.setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
-
-        # переподключаем selectionModel к нашему слоту
-        selection_model = self.events_table.selectionModel()
-        selection_model.selectionChanged.connect(self._on_event_selection_changed)
-
-        # очищаем детали
-        self._clear_event_details()
+    def _update_events_view(self, rows):
+        """
+        Показывает в таблице событий строки rows (row id self.all_events, уже
+        отфильтрованные и упорядоченные). Модель не пересоздаётся: выделенное
+        событие и прокрутка сохраняются, если событие осталось в наборе.
+        """
+        if not self.events_table.show_rows(rows):
+            self._clear_event_details()
 
     def _on_event_selection_changed(self, selected, deselected):
         """Обновляет панель деталей при выборе строки в таблице."""
@@ -339,7 +565,8 @@ class EventsTabMixin:
 
         for i, (field, value) in enumerate(details.items()):
             field_item = QtWidgets.QTableWidgetItem(str(field))
-            value_item = QtWidgets.QTableWidgetItem(str(value))
+            # к uid/gid-полям дописывается имя учётной записи (из ENRICHED, если есть)
+            value_item = QtWidgets.QTableWidgetItem(self.identities.describe(field, value, details))
             self.details_table.setItem(i, 0, field_item)
             self.details_table.setItem(i, 1, value_item)
 
@@ -347,6 +574,37 @@ class EventsTabMixin:
         raw_text = event.get("raw", "")
         self.raw_text_edit.setPlainText(raw_text)
 
+    def _selected_event_key(self):
+        """(node, event_id, timestamp) выделенного события или None."""
+        selection_model = self.events_table.selectionModel()
+        indexes = selection_model.selectedRows() if selection_model is not None else []
+        if not indexes:
+            return None
+        event = self.events_model.get_event(indexes[0].row())
+        if not event:
+            return None
+        return event.get("node"), event.get("event_id"), event.get("timestamp")
+
+    def _select_event_by_key(self, key):
+        """Выделяет и прокручивает к событию с ключом key (см. _selected_event_key())."""
+        node, event_id, timestamp = key
+        if event_id is None or timestamp is None or not self.all_events:
+            return
+        store = self.all_events
+        candidates = np.flatnonzero(
+            (store.ints("event_id") == event_id) & (store.timestamps == timestamp)
+        )
+        for store_row in candidates:
+            if store.value(int(store_row), "node") != node:
+                continue
+            row = self.events_model.find_store_row(int(store_row))
+            if row < 0:
+                return
+            self.events_model.fetch_until(row)
+            self.events_table.selectRow(row)
+            self.events_table.scrollTo(self.events_model.index(row, 0))
+            return
+
     def _clear_event_details(self):
         """Очищает панель деталей."""
         self.details_table.setRowCount(0)
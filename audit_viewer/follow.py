@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .identity import IdentityResolver
+from .parser import AuditEventAssembler, DEFAULT_REORDER_RECORDS, LogCheckpoint, parse_audit_line_bytes
+
+# Через сколько секунд "висящее" событие без EOE (USER_AUTH и т.п.)
+# считается завершённым, если новых record'ов не приходит
+FOLLOW_IDLE_FLUSH_SECONDS = 2.0
+
+# Сколько байт читать за один опрос (чтобы не подвесить GUI на большом приросте)
+FOLLOW_MAX_READ_BYTES = 16 * 1024 * 1024
+
+
+class AuditLogFollower:
+    """
+    Слежение за растущим журналом auditd (аналог tail -F).
+
+    Запоминает inode и смещение в байтах после последнего чтения и при каждом
+    poll() дочитывает только новые строки. Обрабатывает ротацию auditd
+    (max_log_file_action = ROTATE: audit.log → audit.log.1 и создание нового
+    audit.log) и усечение файла: старый файл дочитывается до конца через
+    уже открытый дескриптор, затем открывается новый с начала.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            offset: int = 0,
+            inode: Optional[int] = None,
+            idle_flush_seconds: float = FOLLOW_IDLE_FLUSH_SECONDS,
+            identities: Optional[IdentityResolver] = None,
+    ):
+        self.path = path
+        self.offset = offset
+        self.inode = inode
+        self.idle_flush_seconds = idle_flush_seconds
+
+        self._file = None
+        self._partial = b""  # недописанная последняя строка
+        self._eof = False
+        self._assembler = AuditEventAssembler(DEFAULT_REORDER_RECORDS, idle_flush_seconds, identities)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: LogCheckpoint, **kwargs) -> "AuditLogFollower":
+        """Следить за файлом с места, докуда его разобрал parse_audit_log_file_checkpoint()."""
+        return cls(checkpoint.path, offset=checkpoint.offset, inode=checkpoint.inode, **kwargs)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def at_eof(self) -> bool:
+        """Прочитано всё, что было в файле на момент последнего poll() (иначе упёрлись в FOLLOW_MAX_READ_BYTES)."""
+        return self._file is None or self._eof
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Читает новые строки и возвращает события, собранные с прошлого вызова."""
+        events: List[Dict[str, Any]] = []
+
+        if self._file is None:
+            if not os.path.exists(self.path):
+                return events
+            self._open()
+
+        events.extend(self._read_new())
+
+        if self._eof:
+            if os.fstat(self._file.fileno()).st_size < self.offset:
+                # усечение (copytruncate) — читаем тот же файл с начала
+                self._reopen()
+                events.extend(self._read_new())
+            else:
+                try:
+                    inode = os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    # момент ротации: старый файл уже переименован, новый ещё не создан
+                    inode = self.inode
+                if inode != self.inode:
+                    # ротация: старый файл дочитан до конца, переходим на новый
+                    self._reopen()
+                    events.extend(self._read_new())
+
+        events.extend(self._assembler.flush_older_than(time.time() - self.idle_flush_seconds))
+        return events
+
+    def _reopen(self):
+        self.close()
+        self._partial = b""
+        self.offset = 0
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        actual = os.fstat(self._file.fileno())
+        if self.inode is not None and actual.st_ino != self.inode:
+            # файл сменился, пока нас не было — читаем новый с начала
+            self.offset = 0
+        self.inode = actual.st_ino
+        self._file.seek(self.offset)
+
+    def _read_new(self) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+
+        chunk = self._file.read(FOLLOW_MAX_READ_BYTES)
+        self._eof = len(chunk) < FOLLOW_MAX_READ_BYTES
+        if not chunk:
+            return events
+        self.offset += len(chunk)
+
+        data = self._partial + chunk
+        lines = data.split(b"\n")
+        self._partial = lines.pop()  # после последнего \n — неполная строка
+
+        for line in lines:
+            rec = parse_audit_line_bytes(line)
+            if rec:
+                events.extend(self._assembler.feed(rec))
+
+        return events
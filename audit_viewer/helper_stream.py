@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional
+
+# Протокол helper → GUI: NDJSON, по одному сообщению (JSON-объекту) на строку.
+#
+#   {"type": "start", "total": <размер журнала в байтах>}
+#   {"type": "events", "events": [<событие>, ...], "done": <прочитано байт>}
+#   {"type": "done", "count": <всего событий>}
+#   {"type": "cancelled", "count": <отправлено событий>}
+#   {"type": "error", "error": "<код>", "message": "<текст>"}
+#
+# GUI → helper (stdin): строка CANCEL_COMMAND — прекратить разбор.
+#
+# Фоновый сборщик (collector) отвечает тем же потоком; total/done там в событиях,
+# в start добавлены session и reset (события отдаются с начала), в done — session
+# и next (seq для следующего запроса).
+MSG_START = "start"
+MSG_EVENTS = "events"
+MSG_DONE = "done"
+MSG_CANCELLED = "cancelled"
+MSG_ERROR = "error"
+
+CANCEL_COMMAND = b"cancel"
+
+# Пачка событий уходит, когда набралось столько событий или прошло столько секунд
+# с предыдущей — первые строки появляются в таблице сразу, а не после разбора всего файла
+STREAM_BATCH_EVENTS = 2000
+STREAM_BATCH_SECONDS = 0.25
+
+# Поля, которые не передаются: time вычисляется из timestamp на стороне GUI
+_SKIPPED_FIELDS = ("time",)
+
+
+def encode_message(msg: Dict[str, Any]) -> bytes:
+    """Одно сообщение протокола → строка NDJSON (компактный JSON + "\\n")."""
+    return json.dumps(msg, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def event_to_message_dict(ev) -> Dict[str, Any]:
+    data = ev.to_dict() if hasattr(ev, "to_dict") else dict(ev)
+    for name in _SKIPPED_FIELDS:
+        data.pop(name, None)
+    return data
+
+
+def write_event_stream(
+        out: BinaryIO,
+        events: Iterable[Any],
+        total: int,
+        position: Optional[Callable[[], int]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+        start_fields: Optional[Dict[str, Any]] = None,
+        done_fields: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Пишет события в out пачками (см. STREAM_BATCH_*) и завершает поток
+    сообщением done (или cancelled, если cancelled() вернул True).
+    cancelled() проверяется на каждом событии и по окончании events — источник,
+    который долго ничего не отдаёт (фильтр, под который мало что подходит),
+    должен сам прекращать чтение по cancelled() (см. iter_filtered_events()).
+    position() — сколько байт журнала уже прочитано (для прогресса);
+    без него ход считается в событиях (total — тогда их число).
+    start_fields/done_fields дописываются в сообщения start/done.
+    Возвращает число отправленных событий.
+    """
+    out.write(encode_message({"type": MSG_START, "total": total, **(start_fields or {})}))
+    out.flush()
+
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    last_flush = time.monotonic()
+
+    def send():
+        nonlocal batch, last_flush, count
+        done = position() if position is not None else count + len(batch)
+        out.write(encode_message({"type": MSG_EVENTS, "events": batch, "done": done}))
+        out.flush()
+        count += len(batch)
+        batch = []
+        last_flush = time.monotonic()
+
+    def cancel() -> int:
+        out.write(encode_message({"type": MSG_CANCELLED, "count": count}))
+        out.flush()
+        return count
+
+    for ev in events:
+        if cancelled is not None and cancelled():
+            return cancel()
+        batch.append(event_to_message_dict(ev))
+        if len(batch) >= STREAM_BATCH_EVENTS or time.monotonic() - last_flush >= STREAM_BATCH_SECONDS:
+            send()
+
+    # источник мог остановиться по cancelled(), не отдав больше ни одного события
+    if cancelled is not None and cancelled():
+        return cancel()
+    if batch:
+        send()
+    out.write(encode_message({"type": MSG_DONE, "count": count, **(done_fields or {})}))
+    out.flush()
+    return count
+
+
+class MessageDecoder:
+    """
+    Разбор потока NDJSON, приходящего произвольными кусками (readyRead у QProcess):
+    feed() возвращает сообщения из полностью пришедших строк, хвост без "\\n"
+    ждёт следующего куска.
+    """
+
+    def __init__(self):
+        self._partial = b""
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+
+        messages = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                # посторонний вывод (например, предупреждения интерпретатора) — пропускаем
+                continue
+            if isinstance(msg, dict):
+                messages.append(msg)
+        return messages
+
+    @property
+    def pending(self) -> bytes:
+        """Недочитанный хвост потока (непустой, если поток оборвался посреди строки)."""
+        return self._partial
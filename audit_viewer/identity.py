@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import grp
+import pwd
+from typing import Any, Dict, Mapping, Optional
+
+# Специальные значения для "неустановленного" auid/uid
+UNSET_ID_VALUES = {"-1", "4294967295"}
+
+# Поля record'ов с идентификаторами пользователей и групп
+USER_ID_FIELDS = frozenset(("auid", "uid", "euid", "suid", "fsuid", "ouid"))
+GROUP_ID_FIELDS = frozenset(("gid", "egid", "sgid", "fsgid", "ogid"))
+
+
+def read_id_table(path: str) -> Dict[int, str]:
+    """
+    Разбирает файл в формате /etc/passwd или /etc/group (name:x:id:...)
+    в словарь {id: name}. При повторе id побеждает первая запись — как у getpwuid.
+    """
+    table: Dict[int, str] = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(":")
+            if len(parts) < 3:
+                continue
+            try:
+                id_val = int(parts[2])
+            except ValueError:
+                continue
+            table.setdefault(id_val, parts[0])
+    return table
+
+
+class IdentityResolver:
+    """
+    Перевод uid/gid в имена с кэшем на всё время разбора.
+
+    По умолчанию имена берутся из системных баз (pwd/grp, т.е. через NSS —
+    на хостах с LDAP это может быть сетевой запрос), каждый id запрашивается
+    один раз; отсутствие имени тоже кэшируется.
+    Для журналов, снятых с другого хоста, можно загрузить снимок его
+    passwd/group (from_files()) — тогда системные базы не используются.
+
+    Объект сериализуется (pickle), поэтому передаётся в процессы параллельного разбора.
+    """
+
+    def __init__(self, users: Optional[Dict[int, str]] = None, groups: Optional[Dict[int, str]] = None):
+        # None — системные базы; dict — таблица из снимка
+        self.users = users
+        self.groups = groups
+
+        self._user_names: Dict[int, Optional[str]] = {}
+        self._group_names: Dict[int, Optional[str]] = {}
+        # готовые подписи resolve_user() по исходной строке auid/uid
+        self._user_labels: Dict[str, str] = {}
+
+    @classmethod
+    def from_files(cls, passwd_path: str, group_path: Optional[str] = None) -> "IdentityResolver":
+        """Резолвер по снимку passwd (и, если задан, group) другого хоста."""
+        users = read_id_table(passwd_path)
+        groups = read_id_table(group_path) if group_path else {}
+        return cls(users, groups)
+
+    @property
+    def is_snapshot(self) -> bool:
+        return self.users is not None
+
+    def clear_cache(self):
+        """Сбрасывает кэш (например, перед новой загрузкой — учётные записи могли измениться)."""
+        self._user_names.clear()
+        self._group_names.clear()
+        self._user_labels.clear()
+
+    def user_name(self, uid: int) -> Optional[str]:
+        try:
+            return self._user_names[uid]
+        except KeyError:
+            pass
+
+        if self.users is not None:
+            name = self.users.get(uid)
+        else:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except (KeyError, OverflowError):
+                name = None
+
+        self._user_names[uid] = name
+        return name
+
+    def group_name(self, gid: int) -> Optional[str]:
+        try:
+            return self._group_names[gid]
+        except KeyError:
+            pass
+
+        if self.groups is not None:
+            name = self.groups.get(gid)
+        else:
+            try:
+                name = grp.getgrgid(gid).gr_name
+            except (KeyError, OverflowError):
+                name = None
+
+        self._group_names[gid] = name
+        return name
+
+    def resolve_user(self, auid_str: Optional[str], uid_str: Optional[str]) -> str:
+        """
+        Превращает auid/uid из лога в человекочитаемое значение:
+
+        - приоритетно использует auid, если он валиден;
+        - иначе uid;
+        - корректно обрабатывает -1/4294967295 (unset).
+
+        Возвращает строку вида:
+            - "unset"
+            - "root (0)"
+            - "username (1000)"
+            - "1001" (если UID не найден)
+            - исходное значение, если его нельзя привести к int.
+        """
+        raw = auid_str or uid_str
+        if raw is None:
+            return "?"
+
+        raw = str(raw)
+        label = self._user_labels.get(raw)
+        if label is None:
+            label = self._user_labels[raw] = self._user_label(raw)
+        return label
+
+    def _user_label(self, raw: str) -> str:
+        # unset значения
+        if raw in UNSET_ID_VALUES:
+            return "unset"
+
+        # бывает вида "1000" или "1000 (ivan)" — отрежем всё после пробела
+        numeric_part = raw.split()[0]
+
+        try:
+            uid_val = int(numeric_part)
+        except ValueError:
+            # это уже не чистый uid, вернём как есть
+            return raw
+
+        # uid = 0 — root
+        if uid_val == 0:
+            return "root (0)"
+
+        name = self.user_name(uid_val)
+        if name is None:
+            return f"{uid_val}"
+        return f"{name} ({uid_val})"
+
+    def describe(self, field: str, value: Any, translations: Optional[Mapping] = None) -> str:
+        """
+        Значение поля details для показа: к uid/gid-полям (uid, euid, ogid, ...)
+        дописывается имя — "1000 (ivan)"; остальные поля — как есть.
+
+        translations — details того же события: если в нём есть перевод
+        ENRICHED (UID=, OGID=, ...), имя берётся оттуда, а не из учётных записей.
+        """
+        if field not in USER_ID_FIELDS and field not in GROUP_ID_FIELDS:
+            return str(value)
+
+        translated = translations.get(field.upper()) if translations is not None else None
+
+        if isinstance(value, list):
+            # несколько PATH: переводы идут в том же порядке, что и значения
+            if not (isinstance(translated, list) and len(translated) == len(value)):
+                translated = [None] * len(value)
+            return str([self._describe_id(field, v, t) for v, t in zip(value, translated)])
+
+        if isinstance(translated, list):
+            translated = None
+        return self._describe_id(field, value, translated)
+
+    def _describe_id(self, field: str, value: Any, name: Optional[str]) -> str:
+        text = str(value)
+        if name:
+            return f"{text} ({name})"
+        if text in UNSET_ID_VALUES:
+            return f"{text} (unset)"
+        try:
+            id_val = int(text)
+        except ValueError:
+            return text
+        lookup = self.user_name if field in USER_ID_FIELDS else self.group_name
+        name = lookup(id_val)
+        return f"{text} ({name})" if name is not None else text
+
+
+# Резолвер по умолчанию (системные базы) — для вызовов без явного резолвера
+default_identities = IdentityResolver()
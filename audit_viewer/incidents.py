@@ -1,17 +1,21 @@
 from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 import re
 
+import numpy as np
 
-def _parse_ts(ev: Dict[str, Any]) -> Optional[datetime]:
-    """Достаём datetime из события, если есть."""
+from .event import details_first
+from .store import EventView, store_rows
+
+
+def _parse_ts(ev: Dict[str, Any]) -> Optional[float]:
+    """Достаём unixtime из события, если есть (окна считаются в секундах, без datetime)."""
     ts = ev.get("timestamp")
     if ts is None:
         return None
     try:
-        return datetime.fromtimestamp(ts)
-    except Exception:
+        return float(ts)
+    except (TypeError, ValueError):
         return None
 
 
@@ -21,13 +25,9 @@ def _details_get_first(details: Dict[str, Any], key: str, default: Any = None) -
     - если там строка → возвращает строку;
     - если список → первый элемент;
     - если нет ключа → default.
+    Для EventDetails значение ищется без сборки всего details.
     """
-    val = details.get(key, default)
-    if isinstance(val, list):
-        if val:
-            return val[0]
-        return default
-    return val
+    return details_first(details, key, default)
 
 
 def _details_get_first_str(details: Dict[str, Any], key: str, default: str = "") -> str:
@@ -38,23 +38,62 @@ def _details_get_first_str(details: Dict[str, Any], key: str, default: str = "")
     return str(val)
 
 
+def _prefilter(events, event_types, success: Optional[bool] = None, mask_func=None) -> Iterable[Dict[str, Any]]:
+    """
+    Для колоночного хранилища (EventStore/EventView) заранее отбирает кандидатов
+    по типу события, success и (опционально) маске mask_func(store, rows) —
+    векторизованно, не собирая остальные события. Для обычного списка
+    возвращает его как есть. Полные проверки сценария выполняются после этого
+    в любом случае, так что результат не меняется.
+    """
+    target = store_rows(events)
+    if target is None:
+        return events
+    store, rows = target
+    rows = store.select(rows, event_types=event_types, success=success)
+    if mask_func is not None and len(rows):
+        rows = rows[mask_func(store, rows)]
+    return store.view(rows)
+
+
+def _with_rows(candidates):
+    """
+    Пары (номер, событие): для EventView номер — row id хранилища,
+    для списка — позиция в нём (номер однозначно задаёт событие результата).
+    """
+    if isinstance(candidates, EventView):
+        return zip(candidates.rows.tolist(), candidates)
+    return enumerate(candidates)
+
+
+def _result(events, numbers: List[int], found: List[Dict[str, Any]]):
+    """
+    Результат сценария: для хранилища — EventView найденных строк (таблица
+    инцидентов показывает их по row id), для списка — список событий.
+    """
+    target = store_rows(events)
+    if target is None:
+        return found
+    return target[0].view(np.asarray(numbers, dtype=np.int64))
+
+
 def find_ssh_bruteforce(
         events: List[Dict[str, Any]],
         min_failures: int = 5,
         window_minutes: int = 10,
-) -> List[Dict[str, Any]]:
+) -> Sequence[Dict[str, Any]]:
     """
     Сценарий 1: попытки подбора пароля по SSH.
 
     Ищем серии неуспешных логинов (USER_AUTH/USER_LOGIN, success=False)
     для одного пользователя или одного IP за короткий интервал времени.
     """
-    window = timedelta(minutes=window_minutes)
+    window = window_minutes * 60
 
     # Группируем неуспешные попытки по (user, addr)
-    buckets: Dict[Tuple[str, str], List[Tuple[datetime, Dict[str, Any]]]] = defaultdict(list)
+    buckets: Dict[Tuple[str, str], List[Tuple[float, int, Dict[str, Any]]]] = defaultdict(list)
 
-    for ev in events:
+    for number, ev in _with_rows(_prefilter(events, ("USER_AUTH", "USER_LOGIN"), success=False)):
         etype = ev.get("event_type")
         if etype not in ("USER_AUTH", "USER_LOGIN"):
             continue
@@ -85,18 +124,19 @@ def find_ssh_bruteforce(
         key = (user, addr)
 
         ts = _parse_ts(ev)
-        if not ts:
+        if ts is None:
             continue
 
-        buckets[key].append((ts, ev))
+        buckets[key].append((ts, number, ev))
 
     suspicious_events: List[Dict[str, Any]] = []
+    suspicious_numbers: List[int] = []
     seen_ids = set()
 
     for (user, addr), items in buckets.items():
         # сортируем по времени
         items.sort(key=lambda x: x[0])
-        times = [t for t, _ in items]
+        times = [item[0] for item in items]
 
         n = len(times)
         left = 0
@@ -108,13 +148,13 @@ def find_ssh_bruteforce(
             if right - left + 1 >= min_failures:
                 # добавляем все события из этого окна, без дублей
                 for i in range(left, right + 1):
-                    ev = items[i][1]
-                    ev_id = id(ev)
-                    if ev_id not in seen_ids:
-                        seen_ids.add(ev_id)
+                    _ts, number, ev = items[i]
+                    if number not in seen_ids:
+                        seen_ids.add(number)
                         suspicious_events.append(ev)
+                        suspicious_numbers.append(number)
 
-    return suspicious_events
+    return _result(events, suspicious_numbers, suspicious_events)
 
 
 CRITICAL_PATHS = [
@@ -126,7 +166,28 @@ CRITICAL_PATHS = [
 ]
 
 
-def find_critical_file_changes(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def touches_critical_path(details) -> bool:
+    """Есть ли среди путей details (name/path) критичный файл из CRITICAL_PATHS."""
+    details = details or {}
+
+    # name/path может быть строкой или списком (get() не собирает весь details)
+    path_val = details.get("name") or details.get("path")
+    if not path_val:
+        return False
+
+    if isinstance(path_val, list):
+        paths = [str(p) for p in path_val if p]
+    else:
+        paths = [str(path_val)]
+
+    for p in paths:
+        for critical in CRITICAL_PATHS:
+            if p == critical or p.startswith(critical + "."):
+                return True
+    return False
+
+
+def find_critical_file_changes(events: List[Dict[str, Any]]) -> Sequence[Dict[str, Any]]:
     """
     Сценарий 2: изменения критичных файлов.
 
@@ -134,8 +195,9 @@ def find_critical_file_changes(events: List[Dict[str, Any]]) -> List[Dict[str, A
     и операция прошла успешно.
     """
     result: List[Dict[str, Any]] = []
+    numbers: List[int] = []
 
-    for ev in events:
+    for number, ev in _with_rows(_prefilter(events, ("SYSCALL",), success=True)):
         etype = ev.get("event_type")
         if etype != "SYSCALL":
             continue
@@ -144,29 +206,11 @@ def find_critical_file_changes(events: List[Dict[str, Any]]) -> List[Dict[str, A
         if ev.get("success") is not True:
             continue
 
-        details = ev.get("details", {}) or {}
-
-        # name/path может быть строкой или списком
-        path_val = details.get("name") or details.get("path")
-        if not path_val:
-            continue
-
-        if isinstance(path_val, list):
-            paths = [str(p) for p in path_val if p]
-        else:
-            paths = [str(path_val)]
-
-        found = False
-        for p in paths:
-            for critical in CRITICAL_PATHS:
-                if p == critical or p.startswith(critical + "."):
-                    result.append(ev)
-                    found = True
-                    break
-            if found:
-                break
+        if touches_critical_path(ev.get("details", {})):
+            result.append(ev)
+            numbers.append(number)
 
-    return result
+    return _result(events, numbers, result)
 
 
 SERVICE_UIDS = {"33", "48", "80", "999"}  # можно вручную записать необходимые uid-ы
@@ -246,26 +290,50 @@ def _is_service_user(ev: Dict[str, Any], details: Dict[str, Any]) -> bool:
     return False
 
 
-def find_web_shell(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _maybe_shell_mask(store, rows) -> np.ndarray:
+    """
+    Строки, где может запускаться shell: exe/comm из списков оболочек
+    или пустые (тогда проверка идёт по details).
+    """
+    def codes(name, values):
+        pool = store.pools[name]
+        return [c for c in (pool.code_of(v) for v in values) if c is not None]
+
+    exe = store.codes("exe")[rows]
+    comm = store.codes("comm")[rows]
+    return (
+            np.isin(exe, codes("exe", SHELL_EXES) + codes("exe", [None, ""]))
+            | np.isin(comm, codes("comm", SHELL_NAMES) + codes("comm", [None, ""]))
+    )
+
+
+def find_web_shell(events: List[Dict[str, Any]]) -> Sequence[Dict[str, Any]]:
     """
     Сценарий 3: запуск интерактивного shell от имени сервисного пользователя
     (www-data/nginx/apache и т.п.) — типовой индикатор web-shell.
     """
     result: List[Dict[str, Any]] = []
+    numbers: List[int] = []
 
-    for ev in events:
+    for number, ev in _with_rows(_prefilter(events, ("SYSCALL",), mask_func=_maybe_shell_mask)):
         etype = ev.get("event_type")
         if etype != "SYSCALL":
             continue
 
         details = ev.get("details", {}) or {}
 
-        # syscall = execve или его номер (59)
-        syscall = ev.get("syscall") or _details_get_first_str(details, "syscall", "")
-        syscall_str = str(syscall)
+        # syscall = execve: по имени из ENRICHED (верно для любой архитектуры),
+        # иначе — execve или его номер (59, x86_64)
+        syscall_name = ev.get("syscall_name")
+        if syscall_name:
+            if syscall_name != "execve":
+                continue
+        else:
+            syscall = ev.get("syscall") or _details_get_first_str(details, "syscall", "")
+            syscall_str = str(syscall)
 
-        if syscall_str not in ("execve", "59"):
-            continue
+            if syscall_str not in ("execve", "59"):
+                continue
 
         # exe / comm: сначала summary, затем details
         exe = ev.get("exe") or _details_get_first_str(details, "exe", "")
@@ -285,5 +353,6 @@ def find_web_shell(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             continue
 
         result.append(ev)
+        numbers.append(number)
 
-    return result
+    return _result(events, numbers, result)
@@ -1,6 +1,7 @@
 from PyQt5 import QtWidgets, QtCore
 
-from .models import PlaceholderTableView, AuditEventsTableModel
+from .models import EventRowsModel, PlaceholderTableView
+from .store import EventView
 from .incidents import find_ssh_bruteforce, find_critical_file_changes, find_web_shell, CRITICAL_PATHS
 
 
@@ -35,6 +36,11 @@ class IncidentsTabMixin:
         # Таблица результатов
         self.incidents_table = PlaceholderTableView()
         self.incidents_table.setPlaceholderText("Выберите сценарий и загрузите события на вкладке 'События'.")
+        self.incidents_model = EventRowsModel(self.event_source, self)
+        self.incidents_table.setModel(self.incidents_model)
+        self.incidents_model.sort_requested.connect(self._request_sort_order)
+        self.incidents_table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.incidents_table.selectionModel().selectionChanged.connect(self._on_incident_selection_changed)
 
         # Панель деталей (как на вкладке событий, но отдельная)
         details_widget = QtWidgets.QWidget()
@@ -153,30 +159,19 @@ class IncidentsTabMixin:
         self._set_incident_results(incidents)
 
     def _set_incident_results(self, events):
-        """Сохраняет текущий список событий-инцидентов и обновляет таблицу на вкладке 'Инциденты'."""
+        """
+        Сохраняет текущие события-инциденты (EventView строк self.all_events)
+        и показывает их в таблице на вкладке 'Инциденты'.
+        """
         self.incident_events = events or []
-
-        model = AuditEventsTableModel(self.incident_events, self)
-        self.incidents_table.setModel(model)
-
-        header = self.incidents_table.horizontalHeader()
-        header.setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
-
-        # переподключаем обработчик выбора
-        selection_model = self.incidents_table.selectionModel()
-        selection_model.selectionChanged.connect(self._on_incident_selection_changed)
-
-        # очищаем детали
-        self._clear_incident_details()
+        self._update_incidents_view(self.incident_events)
 
     def _update_incidents_view(self, events):
-        """Обновляет только таблицу (для пустого состояния и т.п.)."""
+        """Обновляет только таблицу (для пустого состояния и т.п.): модель та же, меняются её строки."""
+        rows = events.rows if isinstance(events, EventView) else []
         self.incident_events = events or []
-        model = AuditEventsTableModel(self.incident_events, self)
-        self.incidents_table.setModel(model)
-        header = self.incidents_table.horizontalHeader()
-        header.setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
-        self._clear_incident_details()
+        if not self.incidents_table.show_rows(rows):
+            self._clear_incident_details()
 
     def _on_incident_selection_changed(self, selected, deselected):
         """Обновляет детали инцидента при выборе строки в таблице результатов."""
@@ -186,18 +181,19 @@ class IncidentsTabMixin:
             return
 
         row = indexes[0].row()
-        if not (0 <= row < len(self.incident_events)):
+        if not (0 <= row < self.incidents_model.rowCount()):
             self._clear_incident_details()
             return
 
-        event = self.incident_events[row]
+        # строки модели могут быть пересортированы — событие берём из неё, а не из incident_events
+        event = self.incidents_model.get_event(row)
         details = event.get("details", {})
 
         self.incident_details_table.setRowCount(len(details))
 
         for i, (field, value) in enumerate(details.items()):
             field_item = QtWidgets.QTableWidgetItem(str(field))
-            value_item = QtWidgets.QTableWidgetItem(str(value))
+            value_item = QtWidgets.QTableWidgetItem(self.identities.describe(field, value, details))
             self.incident_details_table.setItem(i, 0, field_item)
             self.incident_details_table.setItem(i, 1, value_item)
 
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+from typing import Callable, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Индекс перестраивается, когда после его построения дописано больше
+# max(INDEX_REBUILD_MIN_ROWS, size / INDEX_REBUILD_FRACTION) строк;
+# до тех пор дописанные строки (хвост) проверяются по колонкам
+INDEX_REBUILD_MIN_ROWS = 65536
+INDEX_REBUILD_FRACTION = 8
+
+# Отбор с возможностью отмены проверяет условия кусками по столько строк
+# (между кусками — проверка cancelled())
+FILTER_CHUNK_ROWS = 16384
+
+
+# Цена проверки условия (RowCondition.cost): select_rows() проверяет кандидатов
+# сначала дешёвыми условиями, дорогие достаются уже отсеянным строкам
+COST_INDEX = 0  # колонка с индексом (время, тип, пользователь, ключ, статус)
+COST_SCALAR = 1  # векторная проверка колонки без индекса
+COST_TEXT = 2  # проверка по строкам в Python: details, сырой текст, регулярные выражения
+
+
+class FilterCancelled(Exception):
+    """Отбор строк прерван: cancelled() вернул True (результат уже не нужен)."""
+
+
+class _Postings:
+    """
+    Инвертированный индекс одной колонки кодов: для каждого кода — row id
+    строк с этим кодом по возрастанию (срез одного массива, без копирования).
+    Коды сдвинуты на 1, чтобы "нет значения" (-1) тоже имело свой список.
+    """
+
+    def __init__(self, codes: np.ndarray):
+        shifted = codes.astype(np.int64) + 1
+        # устойчивая сортировка: внутри кода row id остаются по возрастанию
+        self.rows = np.argsort(shifted, kind="stable")
+        counts = np.bincount(shifted) if len(shifted) else np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    def _bounds(self, code: int):
+        i = code + 1
+        if not 0 <= i < len(self.offsets) - 1:
+            return 0, 0
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def count(self, codes: Iterable[int]) -> int:
+        total = 0
+        for code in codes:
+            lo, hi = self._bounds(code)
+            total += hi - lo
+        return total
+
+    def rows_for(self, codes: Iterable[int]) -> np.ndarray:
+        """Row id строк с одним из кодов (по возрастанию)."""
+        parts = [self.rows[lo:hi] for lo, hi in map(self._bounds, codes) if hi > lo]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0].copy()
+        return np.sort(np.concatenate(parts))
+
+
+class EventIndex:
+    """
+    Индексы хранилища событий для отбора строк без просмотра всех событий:
+        - списки row id по значению event_type, user, key и success;
+        - row id, упорядоченные по timestamp (интервал времени — двоичным
+          поиском по отсортированному массиву).
+
+    Строится один раз на набор событий и описывает строки [0, size);
+    строки, дописанные позже, select_rows() проверяет по колонкам.
+    """
+
+    CODE_COLUMNS = ("event_type", "user", "key")
+
+    def __init__(self, store):
+        self.size = len(store)
+        self._postings = {name: _Postings(store.codes(name)) for name in self.CODE_COLUMNS}
+        # success: -1 / 0 / 1 — как коды -1 / 0 / 1
+        self._postings["success"] = _Postings(store.success)
+
+        ts = store.timestamps
+        # NaN при сортировке уходят в конец — события без времени фильтр по времени пропускает
+        self._ts_order = np.argsort(ts, kind="stable")
+        self._ts_sorted = ts[self._ts_order]
+        self._n_timed = int(len(ts) - np.count_nonzero(np.isnan(ts)))
+
+    def postings(self, name: str) -> _Postings:
+        return self._postings[name]
+
+    def _time_bounds(self, from_ts: Optional[float], to_ts: Optional[float]):
+        timed = self._ts_sorted[:self._n_timed]
+        lo = 0 if from_ts is None else int(np.searchsorted(timed, from_ts, side="left"))
+        hi = self._n_timed if to_ts is None else int(np.searchsorted(timed, to_ts, side="right"))
+        return lo, max(lo, hi)
+
+    def time_count(self, from_ts: Optional[float], to_ts: Optional[float]) -> int:
+        lo, hi = self._time_bounds(from_ts, to_ts)
+        return hi - lo + (self.size - self._n_timed)
+
+    def time_rows(self, from_ts: Optional[float], to_ts: Optional[float]) -> np.ndarray:
+        """Row id событий из интервала [from_ts, to_ts] и событий без времени (по возрастанию)."""
+        lo, hi = self._time_bounds(from_ts, to_ts)
+        rows = np.concatenate([self._ts_order[lo:hi], self._ts_order[self._n_timed:]])
+        rows.sort()
+        return rows
+
+
+# --- условия отбора ---
+
+class RowCondition:
+    """
+    Одно условие отбора строк хранилища. Умеет:
+        estimate(store, index) — сколько строк даст индекс (для выбора ведущего условия);
+        index_rows(store, index) — строки [0, index.size), прошедшие условие, по возрастанию
+            (если exact_index ложно — лишь кандидаты, которые ещё надо проверить mask());
+        mask(store, rows) — проверку произвольных строк по колонкам;
+        implies(other) — следует ли из условия условие other (для сужения прежнего отбора).
+    cost — цена mask() на строку (COST_*): порядок проверки кандидатов.
+    """
+
+    exact_index = True
+    cost = COST_INDEX
+
+    def estimate(self, store, index: EventIndex) -> int:
+        raise NotImplementedError
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        raise NotImplementedError
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def implies(self, other: "RowCondition") -> bool:
+        """True, если любая строка, прошедшая это условие, проходит и other (False — неизвестно)."""
+        return False
+
+
+class TimeRange(RowCondition):
+    """timestamp в [from_ts, to_ts] (включительно); события без времени проходят."""
+
+    def __init__(self, from_ts: Optional[float] = None, to_ts: Optional[float] = None):
+        self.from_ts = from_ts
+        self.to_ts = to_ts
+
+    def estimate(self, store, index: EventIndex) -> int:
+        return index.time_count(self.from_ts, self.to_ts)
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        return index.time_rows(self.from_ts, self.to_ts)
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        ts = store.timestamps[rows]
+        mask = np.ones(len(rows), dtype=bool)
+        if self.from_ts is not None:
+            mask &= ts >= self.from_ts
+        if self.to_ts is not None:
+            mask &= ts <= self.to_ts
+        return mask | np.isnan(ts)
+
+    def implies(self, other: RowCondition) -> bool:
+        if not isinstance(other, TimeRange):
+            return False
+        from_ok = other.from_ts is None or (self.from_ts is not None and self.from_ts >= other.from_ts)
+        to_ok = other.to_ts is None or (self.to_ts is not None and self.to_ts <= other.to_ts)
+        return from_ok and to_ok
+
+
+class CodesIn(RowCondition):
+    """Строковое поле name имеет один из кодов codes (см. StringPool)."""
+
+    def __init__(self, name: str, codes: Sequence[int]):
+        self.name = name
+        self.codes = [int(c) for c in codes]
+
+    def estimate(self, store, index: EventIndex) -> int:
+        return index.postings(self.name).count(self.codes)
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        return index.postings(self.name).rows_for(self.codes)
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        if not self.codes:
+            return np.zeros(len(rows), dtype=bool)
+        return np.isin(store.codes(self.name)[rows], self.codes)
+
+    def implies(self, other: RowCondition) -> bool:
+        return isinstance(other, CodesIn) and other.name == self.name and set(self.codes) <= set(other.codes)
+
+
+class SuccessIn(RowCondition):
+    """success события — одно из values (-1 — неизвестно, 0 — ошибка, 1 — успех)."""
+
+    def __init__(self, values: Sequence[int]):
+        self.values = [int(v) for v in values]
+
+    def estimate(self, store, index: EventIndex) -> int:
+        return index.postings("success").count(self.values)
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        return index.postings("success").rows_for(self.values)
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        return np.isin(store.success[rows], self.values)
+
+    def implies(self, other: RowCondition) -> bool:
+        return isinstance(other, SuccessIn) and set(self.values) <= set(other.values)
+
+
+class AllOf(RowCondition):
+    """Все условия conds (для вложенных выражений; верхний уровень — список условий select_rows())."""
+
+    exact_index = False
+
+    def __init__(self, conds: List[RowCondition]):
+        self.conds = sorted(conds, key=lambda cond: cond.cost)
+        self.cost = max((cond.cost for cond in conds), default=COST_INDEX)
+
+    def _driver(self, store, index: EventIndex) -> RowCondition:
+        return min(self.conds, key=lambda cond: cond.estimate(store, index))
+
+    def estimate(self, store, index: EventIndex) -> int:
+        if not self.conds:
+            return index.size
+        return self._driver(store, index).estimate(store, index)
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        # кандидаты самого избирательного условия; проверка всех — в mask()
+        if not self.conds:
+            return np.arange(index.size, dtype=np.int64)
+        return self._driver(store, index).index_rows(store, index)
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(rows), dtype=bool)
+        for cond in self.conds:
+            todo = np.flatnonzero(mask)
+            if not len(todo):
+                break
+            mask[todo] = cond.mask(store, rows[todo])
+        return mask
+
+
+class AnyOf(RowCondition):
+    """Хотя бы одно из условий conds."""
+
+    def __init__(self, conds: List[RowCondition]):
+        self.conds = sorted(conds, key=lambda cond: cond.cost)
+        self.cost = max((cond.cost for cond in conds), default=COST_INDEX)
+        self.exact_index = all(cond.exact_index for cond in conds)
+
+    def estimate(self, store, index: EventIndex) -> int:
+        # объединение кандидатов; если хоть одно условие индексом не сужается — все строки
+        return min(index.size + 1, sum(cond.estimate(store, index) for cond in self.conds))
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        if any(cond.estimate(store, index) > index.size for cond in self.conds):
+            # условие без индекса (его кандидаты — все строки)
+            return np.arange(index.size, dtype=np.int64)
+        parts = [cond.index_rows(store, index) for cond in self.conds]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        hit = np.zeros(len(rows), dtype=bool)
+        for cond in self.conds:
+            todo = np.flatnonzero(~hit)
+            if not len(todo):
+                break
+            hit[todo] = cond.mask(store, rows[todo])
+        return hit
+
+
+class Not(RowCondition):
+    """Условие cond не выполняется (индексом не сужается)."""
+
+    exact_index = False
+
+    def __init__(self, cond: RowCondition):
+        self.cond = cond
+        self.cost = cond.cost
+
+    def estimate(self, store, index: EventIndex) -> int:
+        return index.size + 1
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        return np.arange(index.size, dtype=np.int64)
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        return ~self.cond.mask(store, rows)
+
+
+def filter_rows(
+        store,
+        rows: np.ndarray,
+        conditions: List[RowCondition],
+        cancelled: Optional[Callable[[], bool]] = None,
+) -> np.ndarray:
+    """
+    Строки из rows, прошедшие все условия, — проверкой по колонкам (порядок rows сохраняется).
+    cancelled — проверяется между кусками по FILTER_CHUNK_ROWS строк; если вернул True,
+    бросается FilterCancelled.
+    """
+    for cond in conditions:
+        if not len(rows):
+            break
+        if cancelled is None:
+            rows = rows[cond.mask(store, rows)]
+            continue
+        parts = []
+        for start in range(0, len(rows), FILTER_CHUNK_ROWS):
+            if cancelled():
+                raise FilterCancelled()
+            chunk = rows[start:start + FILTER_CHUNK_ROWS]
+            parts.append(chunk[cond.mask(store, chunk)])
+        rows = np.concatenate(parts)
+    return rows
+
+
+def select_rows(
+        store,
+        conditions: List[RowCondition],
+        cancelled: Optional[Callable[[], bool]] = None,
+) -> np.ndarray:
+    """
+    Row id всех событий хранилища, прошедших все условия (по возрастанию).
+
+    Кандидатов даёт самое избирательное по индексу условие, остальные
+    проверяются только на них — время пропорционально числу кандидатов,
+    а не размеру хранилища. cancelled — см. filter_rows().
+    """
+    n = len(store)
+    if not conditions:
+        return np.arange(n, dtype=np.int64)
+
+    index = store.index()
+    driver = min(conditions, key=lambda cond: cond.estimate(store, index))
+    rows = driver.index_rows(store, index)
+    # кандидатов ведущего условия (если индекс дал не точный ответ) проверяем наравне
+    # с остальными: сначала индексные и векторные условия, текст и регулярные выражения — последними
+    rest = [cond for cond in conditions if cond is not driver or not driver.exact_index]
+    rest.sort(key=lambda cond: cond.cost)
+    rows = filter_rows(store, rows, rest, cancelled)
+
+    if index.size < n:
+        # строки, дописанные после построения индекса
+        tail = filter_rows(store, np.arange(index.size, n, dtype=np.int64), conditions, cancelled)
+        rows = np.concatenate([rows, tail])
+    return rows
+
+
+def narrows(conditions: List[RowCondition], previous: List[RowCondition]) -> bool:
+    """Сужает ли отбор conditions отбор previous: каждое прежнее условие следует из какого-то нового."""
+    return all(any(cond is prev or cond.implies(prev) for cond in conditions) for prev in previous)
+
+
+def narrow_rows(
+        store,
+        rows: np.ndarray,
+        size: int,
+        conditions: List[RowCondition],
+        cancelled: Optional[Callable[[], bool]] = None,
+) -> np.ndarray:
+    """
+    То же, что select_rows(), когда известен результат rows более широкого
+    отбора (см. narrows()) по строкам [0, size): проверяются только его строки
+    и строки, дописанные после size. Время пропорционально len(rows).
+    """
+    rows = filter_rows(store, rows, conditions, cancelled)
+    n = len(store)
+    if size < n:
+        tail = filter_rows(store, np.arange(size, n, dtype=np.int64), conditions, cancelled)
+        rows = np.concatenate([rows, tail])
+    return rows
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PyQt5 import QtCore
+
+from .identity import IdentityResolver
+from .index import FilterCancelled, narrow_rows, select_rows
+from .parser import _is_gzip, parse_audit_log_file_checkpoint, parse_audit_log_files, parse_audit_log_tail
+from .rawtext import register_raw_file
+from .sortorder import column_order
+from .stats import critical_change_mask
+from .store import EventStore
+from .textindex import TrigramIndex
+
+# Не чаще, чем раз в столько секунд, сообщать GUI о ходе разбора
+LOAD_PROGRESS_INTERVAL = 0.1
+
+
+class LoadCancelled(Exception):
+    """Загрузка отменена пользователем (бросается из progress-колбэка разбора)."""
+
+
+class LoadResult:
+    """Результат загрузки: хранилище событий и контрольная точка для слежения (parser.LogCheckpoint) или None."""
+
+    def __init__(self, store: EventStore, checkpoint=None):
+        self.store = store
+        self.checkpoint = checkpoint
+
+
+class LogLoadWorker(QtCore.QObject):
+    """
+    Разбор файлов журнала в отдельном потоке (QThread): GUI остаётся отзывчивым,
+    ход разбора приходит сигналом progress, результат — finished.
+
+    Сначала разбирается хвост самого свежего несжатого файла (parse_audit_log_tail)
+    и сигналом preview отдаются самые новые события — их можно смотреть,
+    пока идёт полный разбор.
+
+    Внутри parse_audit_log_file(s) (большие файлы — пулом процессов); хранилище
+    EventStore тоже строится здесь, а не в GUI-потоке.
+    """
+
+    # прочитано байт, всего байт, собрано событий (int64 — файлы бывают больше 2 ГБ)
+    progress = QtCore.pyqtSignal("qint64", "qint64", "qint64")
+    preview = QtCore.pyqtSignal(object)  # EventStore с самыми новыми событиями
+    finished = QtCore.pyqtSignal(object)  # LoadResult
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, paths: List[str], workers: int = 1, identities: Optional[IdentityResolver] = None):
+        super().__init__()
+        self.paths = list(paths)
+        self.workers = workers
+        self.identities = identities
+        self.total_bytes = 0
+
+        self._cancel_requested = False
+        self._last_report = 0.0
+
+    def cancel(self):
+        """Просит прервать разбор (вызывается из GUI-потока; разбор остановится на ближайшем отчёте)."""
+        self._cancel_requested = True
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            result = self._load()
+        except LoadCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(result)
+
+    def _load(self) -> LoadResult:
+        self.total_bytes = sum(os.path.getsize(path) for path in self.paths)
+
+        preview_path = self._preview_path()
+        if preview_path is not None:
+            events = parse_audit_log_tail(
+                preview_path, file_id=register_raw_file(preview_path), identities=self.identities,
+            )
+            self._check_cancel()
+            if events:
+                self.preview.emit(EventStore(reversed(events)))
+
+        checkpoint = None
+        if len(self.paths) == 1:
+            # докуда разобран файл — с этого места продолжит режим слежения
+            events, checkpoint = parse_audit_log_file_checkpoint(
+                self.paths[0], workers=self.workers, identities=self.identities, progress=self._report,
+            )
+        else:
+            events = parse_audit_log_files(
+                self.paths, workers=self.workers, identities=self.identities, progress=self._report,
+            )
+
+        self._check_cancel()
+        # в хранилище события лежат от старых к новым
+        store = EventStore(reversed(events))
+        # индексы фильтров строятся здесь же, а не при первом применении фильтров в GUI
+        store.index()
+        # и маска критичных изменений для вкладки 'Статистика' (details проверяются в Python)
+        critical_change_mask(store)
+        return LoadResult(store, checkpoint)
+
+    def _preview_path(self) -> Optional[str]:
+        """Самый свежий несжатый файл набора (в него дописывает auditd) или None."""
+        plain = [path for path in self.paths if not _is_gzip(path)]
+        if not plain:
+            return None
+        return max(plain, key=os.path.getmtime)
+
+    def _check_cancel(self):
+        if self._cancel_requested:
+            raise LoadCancelled()
+
+    def _report(self, done_bytes: int, events: int):
+        self._check_cancel()
+        now = time.monotonic()
+        if now - self._last_report >= LOAD_PROGRESS_INTERVAL or done_bytes >= self.total_bytes:
+            self._last_report = now
+            self.progress.emit(done_bytes, self.total_bytes, events)
+
+
+class TextIndexWorker(QtCore.QObject):
+    """Построение индекса триграмм (TrigramIndex) для текстового поиска в отдельном потоке."""
+
+    finished = QtCore.pyqtSignal(object, object)  # хранилище, TrigramIndex (None — отменено)
+
+    def __init__(self, store: EventStore):
+        super().__init__()
+        self.store = store
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            index = TrigramIndex.build(self.store, cancelled=lambda: self._cancel_requested)
+        except Exception:
+            # без индекса поиск работает полным перебором
+            index = None
+        self.finished.emit(self.store, index)
+
+
+class SortOrderWorker(QtCore.QObject):
+    """Перестановка строк хранилища по колонке таблицы (sortorder.column_order()) в отдельном потоке."""
+
+    finished = QtCore.pyqtSignal(object, str, object)  # хранилище, колонка, перестановка (None — ошибка)
+
+    def __init__(self, store: EventStore, name: str):
+        super().__init__()
+        self.store = store
+        self.name = name
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        try:
+            order = column_order(self.store, self.name)
+        except Exception:
+            # таблица отсортируется без перестановки — по ключам своих строк
+            order = None
+        self.finished.emit(self.store, self.name, order)
+
+
+class FilterJob:
+    """
+    Отбор строк хранилища по условиям фильтров (index.RowCondition).
+    base — (rows, size) прежнего отбора, если новые условия его сужают
+    (index.narrows()): тогда проверяются только его строки.
+
+    После run(): rows — row id прошедших строк по возрастанию,
+    size — сколько первых строк хранилища учтено (в режиме слежения
+    строки могут дописываться, пока идёт отбор).
+    """
+
+    def __init__(self, store: EventStore, conditions, base: Optional[Tuple] = None):
+        self.store = store
+        self.conditions = conditions
+        self.base = base
+        self.generation = 0
+
+        self.rows = None
+        self.size = 0
+
+    def run(self, cancelled=None):
+        size = len(self.store)
+        if self.base is None:
+            rows = select_rows(self.store, self.conditions, cancelled)
+        else:
+            rows = narrow_rows(self.store, *self.base, self.conditions, cancelled)
+        # строки, дописанные во время отбора, в результат не входят
+        self.rows = rows[:int(np.searchsorted(rows, size))]
+        self.size = size
+
+
+class FilterWorker(QtCore.QObject):
+    """
+    Отбор событий по фильтрам в отдельном потоке (живой фильтр при вводе).
+    Задания приходят через submit() из GUI-потока; каждое новое задание
+    отменяет предыдущие — устаревшее прерывается на ближайшей проверке
+    (см. index.filter_rows()) и результата не даёт.
+    """
+
+    requested = QtCore.pyqtSignal(object)  # FilterJob (внутренний: GUI-поток → поток отбора)
+    finished = QtCore.pyqtSignal(object)  # выполненный FilterJob
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        # номер последнего задания; меняется из GUI-потока, читается потоком отбора
+        self.generation = 0
+        self.requested.connect(self._run)
+
+    def submit(self, job: FilterJob):
+        self.generation += 1
+        job.generation = self.generation
+        self.requested.emit(job)
+
+    def cancel(self):
+        """Отменяет текущее и ожидающие задания."""
+        self.generation += 1
+
+    def is_current(self, job: FilterJob) -> bool:
+        """Задание — последнее отправленное и не отменено (проверяется в GUI-потоке по finished)."""
+        return job.generation == self.generation
+
+    @QtCore.pyqtSlot(object)
+    def _run(self, job: FilterJob):
+        def cancelled():
+            return job.generation != self.generation
+
+        if cancelled():
+            return
+        try:
+            job.run(cancelled)
+        except FilterCancelled:
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(job)
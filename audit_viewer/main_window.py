@@ -1,21 +1,94 @@
-from PyQt5 import QtWidgets
+from PyQt5 import QtWidgets, QtCore, QtNetwork
 from pathlib import Path
-import sys, json, subprocess
+import os, sys, json, time
 
-from .parser import parse_audit_log_file
+import numpy as np
+
+from .parser import find_audit_log_files, event_sort_key
+from .collector import (
+    CMD_EVENTS, CollectorCheckpoint, CollectorFollower, collector_is_running, collector_shutdown,
+    collector_socket_path,
+)
+from .event_filter import follow_filter
+from .follow import AuditLogFollower
+from .helper_stream import (
+    CANCEL_COMMAND, MSG_CANCELLED, MSG_DONE, MSG_ERROR, MSG_EVENTS, MSG_START, MessageDecoder, encode_message,
+)
+from .identity import IdentityResolver
+from .loader import LogLoadWorker, SortOrderWorker, TextIndexWorker
+from .models import EventStoreModel
+from .rawtext import retain_raw_files
+from .store import EventStore
 
 from .events_tab import EventsTabMixin
 from .incidents_tab import IncidentsTabMixin
 from .stats_tab import StatsTabMixin
 
 
+# как часто опрашивать журнал в режиме слежения
+FOLLOW_POLL_INTERVAL_MS = 1000
+
+# как часто дописывать в таблицу события, пришедшие от helper'а
+HELPER_FLUSH_INTERVAL_MS = 250
+# сколько ждать выхода helper'а после команды отмены, прежде чем завершить pkexec
+HELPER_CANCEL_TIMEOUT_MS = 2000
+# сколько ждать появления сокета фонового сборщика после запуска (включая ввод пароля)
+COLLECTOR_START_TIMEOUT_MS = 120000
+COLLECTOR_START_POLL_MS = 250
+
+
 class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, StatsTabMixin):
     def __init__(self):
         super().__init__()
 
-        self.all_events = []
+        self.all_events = EventStore()
+        # модель колонок текущего хранилища: таблицы вкладок показывают её строки через EventRowsModel
+        self.event_source = EventStoreModel(self.all_events, self)
         self.incident_events = []
 
+        # перевод uid/gid в имена: системные учётные записи или снимок passwd/group
+        self.identities = IdentityResolver()
+
+        # режим слежения за журналом: путь + os.stat на момент разбора
+        self.log_checkpoint = None
+        self.follower = None
+        self.follow_timer = QtCore.QTimer(self)
+        self.follow_timer.setInterval(FOLLOW_POLL_INTERVAL_MS)
+        self.follow_timer.timeout.connect(self._poll_follow)
+        # запрос слежения к фоновому сборщику, ответ на который ещё не пришёл (QLocalSocket)
+        self.follow_socket = None
+
+        # фоновый разбор файлов журнала (LogLoadWorker в QThread)
+        self.load_thread = None
+        self.load_worker = None
+        self._load_paths = []
+        self._load_started = 0.0
+        self._load_first_rows = None
+
+        # фоновое построение индекса текстового поиска (TextIndexWorker в QThread)
+        self.text_index_thread = None
+        self.text_index_worker = None
+        # перестановка строк по колонке для сортировки таблиц (SortOrderWorker в QThread)
+        self.sort_order_thread = None
+        self.sort_order_worker = None
+        self._sort_order_next = None
+
+        # загрузка системного журнала через helper (pkexec) или фоновый сборщик: поток событий NDJSON
+        self.helper_process = None
+        self.collector_socket = None
+        self._collector_request_cp = None
+        # идёт дозапрос новых событий у сборщика: они дописываются, набор не перестраивается
+        self._helper_delta = False
+        self._helper_filter = None
+        self._collector_start_timer = None
+        self._helper_decoder = None
+        self._helper_pending = []
+        self._helper_result = None
+        self._helper_cancel_requested = False
+        self.helper_flush_timer = QtCore.QTimer(self)
+        self.helper_flush_timer.setInterval(HELPER_FLUSH_INTERVAL_MS)
+        self.helper_flush_timer.timeout.connect(self._flush_helper_events)
+
         self.setWindowTitle("Linux Audit Viewer")
         self.resize(1200, 800)
 
@@ -32,8 +105,24 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
         self._create_menu()
         self._create_status_bar()
 
-    def _set_events(self, events):
-        self.all_events = events or []
+    def _set_events(self, events, preliminary: bool = False):
+        """
+        Делает events текущим набором событий. events — EventStore или список
+        событий от новых к старым (как возвращает parse_audit_log_file()).
+        preliminary=True — предварительный набор во время загрузки: вкладка
+        'Статистика' не пересчитывается, индекс текстового поиска не строится.
+        """
+        if not isinstance(events, EventStore):
+            # в хранилище события лежат от старых к новым — новые дописываются в конец
+            events = EventStore(reversed(events or []))
+        if not preliminary and self.load_worker is None:
+            # файлы прежних наборов (в т.ч. удалённые ротацией) больше не держим открытыми;
+            # пока идёт разбор, он регистрирует свои файлы — тогда не трогаем
+            retain_raw_files(events.raw_files)
+        self.all_events = events
+        self.event_source.set_store(events)
+        # результаты сценариев относились к прежнему набору
+        self.incidents_list.setCurrentRow(-1)
 
         if not self.all_events:
             self.apply_filter_btn.setEnabled(False)
@@ -49,7 +138,7 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
         self.incidents_list.setEnabled(True)
 
         # --- обновляем список пользователей ---
-        users = sorted({ev.get("user") for ev in self.all_events if ev.get("user")})
+        users = sorted(u for u in self.all_events.pools["user"].values if u)
         self.user_combo.blockSignals(True)
         self.user_combo.clear()
         self.user_combo.addItem("Любой")
@@ -58,7 +147,7 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
         self.user_combo.blockSignals(False)
 
         # --- обновляем список типов событий ---
-        types = sorted({ev.get("event_type") for ev in self.all_events if ev.get("event_type")})
+        types = sorted(t for t in self.all_events.pools["event_type"].values if t)
         self.type_combo.blockSignals(True)
         self.type_combo.clear()
         self.type_combo.addItem("Любой")
@@ -72,88 +161,611 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
         # применяем фильтры к новому набору
         self._apply_filters()
 
+        if preliminary:
+            return
+
         # --- вкладка 'Статистика' ---
         self._update_stats_controls_state()
         self._update_stats_time_filters_from_events()
         self._recalculate_stats()
 
+        self._start_text_index()
+
+    def _start_text_index(self):
+        """Строит в фоне индекс триграмм для поля 'Поиск по тексту' (до готовности поиск — перебором)."""
+        self._stop_text_index()
+        store = self.all_events
+        if store.text_index is not None and store.text_index.size == len(store):
+            return
+
+        worker = TextIndexWorker(store)
+        thread = QtCore.QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self._on_text_index_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        self.text_index_thread = thread
+        self.text_index_worker = worker
+        thread.start()
+
+    def _stop_text_index(self):
+        """Прерывает построение индекса (отмена проверяется каждые несколько тысяч строк)."""
+        if self.text_index_worker is None:
+            return
+        self.text_index_worker.cancel()
+        self.text_index_thread.quit()
+        self.text_index_thread.wait()
+        self.text_index_worker = None
+        self.text_index_thread = None
+
+    def _on_text_index_finished(self, store, text_index):
+        if self.text_index_worker is not None and self.text_index_worker.store is store:
+            self.text_index_worker = None
+            self.text_index_thread = None
+        # набор мог смениться, пока строился индекс
+        if text_index is None or store is not self.all_events:
+            return
+        store.text_index = text_index
+
+    def _request_sort_order(self, name: str):
+        """
+        Таблице нужна перестановка по колонке name (EventRowsModel.sort_requested):
+        считает её в фоне; пока считается одна колонка, следующая ждёт очереди.
+        """
+        worker = self.sort_order_worker
+        if worker is not None:
+            if worker.name != name or worker.store is not self.all_events:
+                self._sort_order_next = name
+            return
+        self._sort_order_next = None
+
+        worker = SortOrderWorker(self.all_events, name)
+        thread = QtCore.QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(self._on_sort_order_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        self.sort_order_thread = thread
+        self.sort_order_worker = worker
+        self.statusBar().showMessage("Сортировка...")
+        thread.start()
+
+    def _stop_sort_order(self):
+        """Дожидается текущей перестановки (argsort не прерывается) и забывает очередь."""
+        self._sort_order_next = None
+        if self.sort_order_worker is None:
+            return
+        self.sort_order_thread.quit()
+        self.sort_order_thread.wait()
+        self.sort_order_worker = None
+        self.sort_order_thread = None
+
+    def _on_sort_order_finished(self, store, name, order):
+        self.sort_order_worker = None
+        self.sort_order_thread = None
+        # набор мог смениться, пока считалась перестановка
+        if store is not self.all_events:
+            if self._sort_order_next is not None:
+                self._request_sort_order(self._sort_order_next)
+            return
+        if order is not None:
+            store.sort_orders.add(name, order)
+        self.statusBar().clearMessage()
+        for model in (self.events_model, self.incidents_model):
+            model.finish_sort(name)
+
+        queued = self._sort_order_next
+        if queued is not None and store.sort_orders.order(queued) is None:
+            self._request_sort_order(queued)
+        else:
+            self._sort_order_next = None
+
+    def _append_events(self, events):
+        """
+        Дописывает новые события (режим слежения) в хранилище all_events
+        и в начало текущей модели таблицы, не перестраивая их.
+        """
+        if not events:
+            return
+
+        self._extend_events(events)
+        self.statusBar().showMessage(
+            f"Слежение: +{len(events)} событий, всего {len(self.all_events)}"
+        )
+
+    def _extend_events(self, events):
+        """Дописывает события, более новые, чем уже загруженные, без перестройки таблицы."""
+        if not events:
+            return
+
+        if not self.all_events:
+            events.sort(key=event_sort_key, reverse=True)
+            # при загрузке через helper статистика пересчитывается по окончании (_finish_helper_load)
+            self._set_events(events, preliminary=self._helper_load_active())
+            return
+
+        prev_range = self.all_events.time_range()
+        first_new_row = len(self.all_events)
+        events.sort(key=event_sort_key)
+        self.event_source.extend(events)
+        self._add_filter_choices()
+
+        # если пользователь не сужал верхнюю границу времени — сдвигаем её вслед за журналом
+        new_range = self.all_events.time_range()
+        to_ts = self.to_datetime.dateTime().toSecsSinceEpoch()
+        if prev_range is not None and new_range is not None and to_ts > prev_range[1]:
+            to_dt = QtCore.QDateTime.fromSecsSinceEpoch(int(new_range[1])).addSecs(1)
+            self.to_datetime.blockSignals(True)
+            self.to_datetime.setDateTime(to_dt)
+            self.to_datetime.blockSignals(False)
+            self._auto_time_range = (self._auto_time_range[0], to_dt.toSecsSinceEpoch())
+
+        # новые строки — в конце хранилища; в таблицу идут от новых к старым (или по её сортировке)
+        new_rows = np.arange(len(self.all_events) - 1, first_new_row - 1, -1, dtype=np.int64)
+        self.events_model.add_rows(self._filter_rows(new_rows))
+
+    def _set_follow_available(self, checkpoint):
+        """Запоминает, за каким файлом можно следить (None — слежение недоступно)."""
+        self.log_checkpoint = checkpoint
+        self.follow_action.setEnabled(checkpoint is not None)
+        if self.follow_action.isChecked():
+            if checkpoint is None:
+                self.follow_action.setChecked(False)  # toggled → _toggle_follow(False)
+            else:
+                # перезапускаем слежение с новой контрольной точки
+                self._toggle_follow(True)
+
+    def _toggle_follow(self, checked: bool):
+        """Включает/выключает слежение за загруженным файлом журнала."""
+        self.follow_timer.stop()
+        self._abort_follow_request()
+        if self.follower is not None:
+            self.follower.close()
+            self.follower = None
+
+        if not checked or self.log_checkpoint is None:
+            return
+
+        if isinstance(self.log_checkpoint, CollectorCheckpoint):
+            # системный журнал: новые события отдаёт фоновый сборщик
+            self.follower = CollectorFollower.from_checkpoint(self.log_checkpoint)
+            self.follow_timer.start()
+            self.statusBar().showMessage("Слежение за системным журналом через фоновый сборщик")
+            return
+
+        self.follower = AuditLogFollower.from_checkpoint(self.log_checkpoint, identities=self.identities)
+        self.follow_timer.start()
+        self.statusBar().showMessage(f"Слежение за журналом: {self.log_checkpoint.path}")
+
+    def _poll_follow(self):
+        if self.follower is None:
+            return
+        if isinstance(self.follower, CollectorFollower):
+            self._request_collector_follow()
+            return
+        try:
+            events = self.follower.poll()
+        except OSError as e:
+            self._stop_follow(e)
+            return
+        self._append_events(events)
+
+    def _stop_follow(self, error):
+        self.follow_action.setChecked(False)
+        self.statusBar().showMessage(f"Слежение остановлено: {error}")
+
+    def _request_collector_follow(self):
+        """
+        Запрашивает у сборщика новые события, не блокируя GUI: ответ собирается
+        по readyRead и разбирается, когда сборщик закроет соединение. Пока
+        ответа нет (сборщик, например, ещё дочитывает журнал), новые запросы
+        по таймеру не отправляются.
+        """
+        if self.follow_socket is not None:
+            return
+        follower = self.follower
+        decoder = MessageDecoder()
+        messages = []
+        sock = QtNetwork.QLocalSocket(self)
+
+        def read():
+            if sock.isOpen():
+                messages.extend(decoder.feed(bytes(sock.readAll())))
+
+        def finish(error=None):
+            if self.follow_socket is not sock:
+                return
+            read()
+            self.follow_socket = None
+            sock.deleteLater()
+            if self.follower is not follower:
+                return  # слежение выключили или перезапустили
+            try:
+                if error is not None:
+                    raise OSError(error)
+                events = follower.handle_response(messages)
+            except OSError as e:
+                self._stop_follow(e)
+                return
+            self._append_events(events)
+
+        def on_error(error):
+            # закрытие соединения сборщиком после ответа — штатное завершение (disconnected)
+            if error != QtNetwork.QLocalSocket.PeerClosedError:
+                finish(sock.errorString())
+
+        sock.readyRead.connect(read)
+        sock.disconnected.connect(finish)
+        sock.errorOccurred.connect(on_error)
+        sock.connected.connect(lambda: sock.write(encode_message(follower.request())))
+        self.follow_socket = sock
+        sock.connectToServer(follower.checkpoint.socket_path)
+
+    def _abort_follow_request(self):
+        """Отменяет запрос слежения к сборщику (его события пришли бы повторно при дозапросе)."""
+        sock = self.follow_socket
+        if sock is None:
+            return
+        self.follow_socket = None
+        sock.abort()
+        sock.deleteLater()
+
     def _load_data_from_file(self, path: str):
         """
         Загружает события из указанного файла журнала auditd (офлайн-режим).
         """
-        try:
-            events = parse_audit_log_file(path)
-        except Exception as e:
+        self._load_data_from_files([path])
+
+    def _load_data_from_files(self, paths):
+        """
+        Загружает набор файлов журнала (audit.log, audit.log.1..N, .gz):
+        файлы разбираются параллельно и сливаются по времени без дублей.
+
+        Разбор идёт в фоновом потоке (LogLoadWorker): ход показывается в строке
+        состояния, загрузку можно отменить, результат приходит в _on_file_load_finished().
+        Самые новые события показываются сразу (_on_file_load_preview()).
+        """
+        if self._load_active():
+            self.statusBar().showMessage("Дождитесь окончания или отмените текущую загрузку")
+            return
+
+        # учётные записи могли измениться с прошлой загрузки
+        self.identities.clear_cache()
+        # набор заменяется файлами целиком — условий отбора прошлой загрузки у него нет
+        self._helper_filter = None
+
+        worker = LogLoadWorker(paths, workers=os.cpu_count() or 1, identities=self.identities)
+        thread = QtCore.QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_file_load_progress)
+        worker.preview.connect(self._on_file_load_preview)
+        worker.finished.connect(self._on_file_load_finished)
+        worker.failed.connect(self._on_file_load_failed)
+        worker.cancelled.connect(self._on_file_load_cancelled)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        self.load_thread = thread
+        self.load_worker = worker
+        self._load_paths = list(paths)
+        self._load_started = time.monotonic()
+        self._load_first_rows = None
+
+        # пока идёт загрузка, слежение за прежним файлом приостановлено
+        self.follow_timer.stop()
+
+        self._show_load_progress(True)
+        self.statusBar().showMessage("Разбор журнала...")
+        thread.start()
+
+    def _load_active(self) -> bool:
+        return self.load_worker is not None or self._helper_load_active()
+
+    def _on_file_load_progress(self, done_bytes, total_bytes, events):
+        if total_bytes:
+            self.load_progress.setRange(0, 1000)
+            self.load_progress.setValue(min(1000, done_bytes * 1000 // total_bytes))
+        elapsed = max(time.monotonic() - self._load_started, 1e-6)
+        self.statusBar().showMessage(
+            f"Разбор журнала: {done_bytes / 2**20:.0f} из {total_bytes / 2**20:.0f} МБ, "
+            f"{events} событий ({events / elapsed:.0f} событий/с)"
+        )
+
+    def _on_file_load_preview(self, store):
+        """Самые новые события, пока идёт полный разбор: таблицу уже можно смотреть."""
+        if self.load_worker is None or self.load_worker.cancel_requested:
+            return
+        self._set_events(store, preliminary=True)
+        self._load_first_rows = time.monotonic() - self._load_started
+
+    def _resume_follow_after_load(self):
+        """Загрузка не завершилась: слежение за прежним файлом возобновляется, если таблица не заменялась."""
+        self._set_follow_available(None if self._load_first_rows is not None else self.log_checkpoint)
+
+    def _end_file_load(self):
+        self.load_worker = None
+        self.load_thread = None
+        self._show_load_progress(False)
+
+    def _on_file_load_cancelled(self):
+        self._end_file_load()
+        self._resume_follow_after_load()
+        if self._load_first_rows is not None:
+            self.statusBar().showMessage(
+                f"Загрузка журнала отменена: показаны только самые новые события ({len(self.all_events)})"
+            )
+        else:
+            self.statusBar().showMessage("Загрузка журнала отменена")
+
+    def _on_file_load_failed(self, message: str):
+        paths = self._load_paths
+        self._end_file_load()
+        self._resume_follow_after_load()
+        if len(paths) == 1:
             QtWidgets.QMessageBox.warning(
                 self,
                 "Ошибка",
-                f"Не удалось прочитать или распарсить файл:\n{path}\n\n{e}",
+                f"Не удалось прочитать или распарсить файл:\n{paths[0]}\n\n{message}",
             )
             self.statusBar().showMessage("Ошибка при загрузке файла журнала")
-            return
-
-        if not events:
-            QtWidgets.QMessageBox.information(
+        else:
+            QtWidgets.QMessageBox.warning(
                 self,
-                "Информация",
-                f"В файле {path} не найдено ни одного события."
+                "Ошибка",
+                f"Не удалось прочитать или распарсить файлы журнала:\n{message}",
             )
-            self.statusBar().showMessage("Файл журнала не содержит событий")
+            self.statusBar().showMessage("Ошибка при загрузке файлов журнала")
+
+    def _on_file_load_finished(self, result):
+        paths = self._load_paths
+        elapsed = time.monotonic() - self._load_started
+        self._end_file_load()
+
+        events = result.store
+        # слежение возможно только за одним файлом
+        checkpoint = result.checkpoint
+
+        if not events:
+            if len(paths) == 1:
+                QtWidgets.QMessageBox.information(
+                    self,
+                    "Информация",
+                    f"В файле {paths[0]} не найдено ни одного события."
+                )
+                self.statusBar().showMessage("Файл журнала не содержит событий")
+            else:
+                QtWidgets.QMessageBox.information(
+                    self,
+                    "Информация",
+                    "В выбранных файлах не найдено ни одного события."
+                )
+                self.statusBar().showMessage("Файлы журнала не содержат событий")
             # Пустой список — обновим таблицу, покажется плейсхолдер
             self._set_events([])
+            self._set_follow_available(checkpoint)
             return
 
+        # выделенное в предварительной таблице событие остаётся выделенным
+        selected = self._selected_event_key()
         self._set_events(events)
-        self.statusBar().showMessage(f"Загружено событий из файла: {path} ({len(events)})")
+        if selected is not None:
+            self._select_event_by_key(selected)
+        self._set_follow_available(checkpoint)
+
+        first_rows = ""
+        if self._load_first_rows is not None:
+            first_rows = f", первые события через {self._load_first_rows:.1f} с"
+        if len(paths) == 1:
+            self.statusBar().showMessage(
+                f"Загружено событий из файла: {paths[0]} ({len(events)}) за {elapsed:.1f} с{first_rows}"
+            )
+        else:
+            self.statusBar().showMessage(
+                f"Загружено событий из {len(paths)} файлов: {len(events)} за {elapsed:.1f} с{first_rows}"
+            )
+
+    def _cancel_load(self):
+        """Кнопка "Отмена" в строке состояния: прерывает текущую загрузку."""
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+            self.statusBar().showMessage("Загрузка журнала: отмена...")
+            return
+        self._cancel_helper_load()
 
     def _open_log_file_dialog(self):
         """
-        Открывает диалог выбора файла журнала auditd и загружает выбранный файл.
+        Открывает диалог выбора файлов журнала auditd и загружает выбранные файлы.
         """
-        dlg = QtWidgets.QFileDialog(self, "Выберите файл журнала аудита")
-        dlg.setFileMode(QtWidgets.QFileDialog.ExistingFile)
+        dlg = QtWidgets.QFileDialog(self, "Выберите файлы журнала аудита")
+        dlg.setFileMode(QtWidgets.QFileDialog.ExistingFiles)
         dlg.setNameFilters([
-            "Логи auditd (*.log)",
+            "Логи auditd (*.log *.log.* *.gz)",
             "Все файлы (*)",
         ])
 
         if dlg.exec_():
             selected_files = dlg.selectedFiles()
             if selected_files:
-                path = selected_files[0]
-                self._load_data_from_file(path)
+                self._load_data_from_files(selected_files)
+
+    def _open_log_dir_dialog(self):
+        """
+        Открывает диалог выбора каталога и загружает из него весь набор ротации
+        audit.log, audit.log.1 … audit.log.N (в т.ч. .gz).
+        """
+        directory = QtWidgets.QFileDialog.getExistingDirectory(self, "Выберите каталог с журналами аудита")
+        if not directory:
+            return
+
+        paths = find_audit_log_files(directory)
+        if not paths:
+            QtWidgets.QMessageBox.information(
+                self,
+                "Информация",
+                f"В каталоге {directory} нет файлов журнала audit.log*."
+            )
+            return
+
+        self._load_data_from_files(paths)
+
+    def _open_identity_snapshot_dialog(self):
+        """
+        Загружает снимок passwd (и group из того же каталога, если он есть)
+        с хоста, где снят журнал: uid/gid будут переводиться в имена по нему.
+        """
+        passwd_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Выберите файл passwd с хоста журнала", "", "passwd (passwd*);;Все файлы (*)"
+        )
+        if not passwd_path:
+            return
+
+        group_path = os.path.join(os.path.dirname(passwd_path), "group")
+        if not os.path.isfile(group_path):
+            group_path = None
+
+        try:
+            self.identities = IdentityResolver.from_files(passwd_path, group_path)
+        except (OSError, UnicodeError) as e:
+            QtWidgets.QMessageBox.warning(
+                self,
+                "Ошибка",
+                f"Не удалось прочитать снимок учётных записей:\n{passwd_path}\n\n{e}",
+            )
+            return
+
+        self.system_identities_action.setEnabled(True)
+        self.statusBar().showMessage(
+            f"Учётные записи из снимка: {passwd_path}"
+            + (f" + {group_path}" if group_path else "")
+            + " (применяется при следующей загрузке журнала)"
+        )
+
+    def _use_system_identities(self):
+        """Возвращает перевод uid/gid по учётным записям этой системы."""
+        self.identities = IdentityResolver()
+        self.system_identities_action.setEnabled(False)
+        self.statusBar().showMessage(
+            "Учётные записи этой системы (применяется при следующей загрузке журнала)"
+        )
 
     def _load_data_with_pkexec(self):
+        """Загружает весь системный журнал (с правами root)."""
+        self._load_system_log(None)
+
+    def _load_filtered_data_with_pkexec(self):
+        """
+        Загружает из системного журнала только события, проходящие фильтры панели
+        (время, тип, пользователь, ключ): отбор выполняет helper/сборщик,
+        остальные события не разбираются и не передаются.
+        """
+        self._load_system_log(self._pushdown_filter())
+
+    def _load_system_log(self, event_filter):
         """
         Запускает helper через pkexec для чтения /var/log/audit/audit.log с правами root.
+
+        Helper отдаёт события потоком NDJSON (см. helper_stream) по мере разбора:
+        они дописываются в таблицу пачками, не дожидаясь конца файла,
+        а загрузку можно прервать кнопкой в строке состояния.
+        event_filter — EventFilter для отбора на стороне helper'а (None — все события).
         """
+        if self._load_active():
+            return
+
+        filter_dict = event_filter.to_dict() if event_filter is not None and not event_filter.is_empty else None
+        self._helper_filter = filter_dict
+
+        if self.collector_action.isChecked():
+            self._load_data_from_collector(filter_dict)
+            return
+
+        if filter_dict is None:
+            cmd = self._helper_command()
+        else:
+            cmd = self._helper_command("--filter", json.dumps(filter_dict))
+
+        # прежний набор событий заменяется загружаемым
+        self._set_follow_available(None)
+        self._set_events([])
+        self._start_helper_stream()
+
+        process = QtCore.QProcess(self)
+        process.setProgram(cmd[0])
+        process.setArguments(cmd[1:])
+        process.readyReadStandardOutput.connect(self._on_helper_output)
+        process.finished.connect(self._on_helper_finished)
+        process.errorOccurred.connect(self._on_helper_error)
+        self.helper_process = process
+
+        self.statusBar().showMessage("Загрузка системного журнала: ожидание авторизации pkexec...")
+        process.start()
+
+    def _helper_command(self, *args):
+        """Команда запуска helper'а через pkexec."""
         HELPER_FLAG = "--run-helper"
 
         if getattr(sys, "frozen", False):
             # Режим PyInstaller (onefile): sys.executable — это бинарник приложения
             app_path = Path(sys.executable).resolve()
-            cmd = ["pkexec", str(app_path), HELPER_FLAG]
-        else:
-            # Режим разработки: запускаем main.py через текущий интерпретатор
-            project_root = Path(__file__).resolve().parent.parent
-            entry_path = project_root / "main.py"
-            python_exe = sys.executable
-            cmd = ["pkexec", python_exe, str(entry_path), HELPER_FLAG]
+            return ["pkexec", str(app_path), HELPER_FLAG, *args]
 
-        try:
-            output = subprocess.check_output(
-                cmd,
-                stderr=subprocess.STDOUT,
-                text=True,
-            )
-        except subprocess.CalledProcessError as e:
-            QtWidgets.QMessageBox.warning(
-                self,
-                "Ошибка",
-                f"Не удалось выполнить helper:\n{e.output}",
-            )
+        # Режим разработки: запускаем main.py через текущий интерпретатор
+        project_root = Path(__file__).resolve().parent.parent
+        entry_path = project_root / "main.py"
+        python_exe = sys.executable
+        return ["pkexec", python_exe, str(entry_path), HELPER_FLAG, *args]
+
+    def _helper_load_active(self) -> bool:
+        return (
+            self.helper_process is not None
+            or self.collector_socket is not None
+            or self._collector_start_timer is not None
+        )
+
+    def _start_helper_stream(self):
+        """Общая подготовка к приёму потока событий (от helper'а или сборщика)."""
+        self._helper_decoder = MessageDecoder()
+        self._helper_pending = []
+        self._helper_result = None
+        self._helper_cancel_requested = False
+        self._helper_delta = False
+        self._show_load_progress(True)
+        self.helper_flush_timer.start()
+
+    # --- фоновый сборщик (helper --serve) ---
+
+    def _load_data_from_collector(self, filter_dict=None):
+        """
+        Загрузка системного журнала через фоновый сборщик: если он уже запущен,
+        пароль не нужен, а при повторной загрузке (с теми же условиями отбора)
+        приходят только новые события.
+        """
+        socket_path = collector_socket_path()
+
+        # докуда события уже получены (у слежения — самая свежая отметка)
+        checkpoint = self.log_checkpoint
+        if isinstance(self.follower, CollectorFollower):
+            checkpoint = self.follower.checkpoint
+        if not (isinstance(checkpoint, CollectorCheckpoint) and checkpoint.socket_path == socket_path
+                and checkpoint.filter == filter_dict and self.all_events):
+            checkpoint = None
+
+        if collector_is_running(socket_path):
+            self._query_collector(socket_path, checkpoint, filter_dict)
             return
-        except FileNotFoundError:
+
+        # сборщик не запущен — запускаем его (pkexec спросит пароль) и ждём сокет
+        cmd = self._helper_command("--serve")
+        if not QtCore.QProcess.startDetached(cmd[0], cmd[1:]):
             QtWidgets.QMessageBox.warning(
                 self,
                 "Ошибка",
@@ -161,39 +773,337 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
             )
             return
 
-        try:
-            data = json.loads(output)
-        except json.JSONDecodeError:
+        self.statusBar().showMessage("Запуск фонового сборщика: ожидание авторизации pkexec...")
+        self._show_load_progress(True)
+        timer = QtCore.QTimer(self)
+        timer.setInterval(COLLECTOR_START_POLL_MS)
+        timer.setProperty("waited_ms", 0)
+
+        def check():
+            waited = timer.property("waited_ms") + COLLECTOR_START_POLL_MS
+            timer.setProperty("waited_ms", waited)
+            if collector_is_running(socket_path):
+                self._stop_collector_start_wait()
+                self._query_collector(socket_path, None, filter_dict)
+            elif waited >= COLLECTOR_START_TIMEOUT_MS:
+                self._stop_collector_start_wait()
+                self.statusBar().showMessage("Фоновый сборщик не запустился")
+
+        timer.timeout.connect(check)
+        self._collector_start_timer = timer
+        timer.start()
+
+    def _check_collector_running(self):
+        """
+        Отмечает пункт фонового сборщика, если он уже запущен (остался с прошлого
+        сеанса). Подключение — асинхронное (QLocalSocket), запуск окна его не ждёт.
+        """
+        sock = QtNetwork.QLocalSocket(self)
+
+        def connected():
+            sock.abort()
+            sock.deleteLater()
+            self.collector_action.setChecked(True)
+
+        def failed(_error):
+            sock.deleteLater()
+
+        sock.connected.connect(connected)
+        sock.errorOccurred.connect(failed)
+        sock.connectToServer(collector_socket_path())
+
+    def _stop_collector_start_wait(self):
+        if self._collector_start_timer is not None:
+            self._collector_start_timer.stop()
+            self._collector_start_timer.deleteLater()
+            self._collector_start_timer = None
+        self._show_load_progress(False)
+
+    def _query_collector(self, socket_path: str, checkpoint, filter_dict=None):
+        """
+        Запрашивает у сборщика события (все или после checkpoint; filter_dict —
+        условия отбора) и принимает их потоком.
+        """
+        if checkpoint is None:
+            self._set_follow_available(None)
+            self._set_events([])
+        else:
+            # слежение не должно дозапрашивать те же события параллельно
+            self.follow_timer.stop()
+            self._abort_follow_request()
+
+        self._collector_request_cp = checkpoint
+        self._start_helper_stream()
+        self._helper_delta = checkpoint is not None
+
+        request = {"cmd": CMD_EVENTS}
+        if checkpoint is not None:
+            request.update(since=checkpoint.next, session=checkpoint.session)
+            filter_dict = follow_filter(filter_dict)
+        if filter_dict is not None:
+            request["filter"] = filter_dict
+
+        sock = QtNetwork.QLocalSocket(self)
+        sock.setProperty("socket_path", socket_path)
+        sock.readyRead.connect(self._on_helper_output)
+        sock.disconnected.connect(self._on_collector_finished)
+        sock.errorOccurred.connect(self._on_collector_error)
+        sock.connected.connect(lambda: sock.write(encode_message(request)))
+        self.collector_socket = sock
+
+        self.statusBar().showMessage("Загрузка системного журнала из фонового сборщика...")
+        sock.connectToServer(socket_path)
+
+    def _on_collector_error(self, error):
+        # закрытие соединения сборщиком после ответа — штатное завершение
+        if error != QtNetwork.QLocalSocket.PeerClosedError:
+            self._on_collector_finished()
+
+    def _on_collector_finished(self):
+        sock = self.collector_socket
+        if sock is None:
+            return
+        self._on_helper_output()
+        socket_path = sock.property("socket_path")
+        self.collector_socket = None
+        sock.deleteLater()
+        self._finish_helper_load()
+
+        result = self._helper_result or {}
+        result_type = result.get("type")
+        requested = self._collector_request_cp
+        count = len(self.all_events)
+
+        if result_type != MSG_DONE:
+            # без полного ответа неизвестно, докуда получены события — слежение отключаем
+            self._set_follow_available(None)
+            if self._helper_cancel_requested:
+                self.statusBar().showMessage(f"Загрузка системного журнала прервана: загружено {count} событий")
+            elif result_type == MSG_ERROR:
+                QtWidgets.QMessageBox.warning(
+                    self,
+                    "Ошибка",
+                    f"Фоновый сборщик сообщил об ошибке: {result.get('error')}\n{result.get('message', '')}"
+                )
+                self.statusBar().showMessage("Ошибка при загрузке системного журнала")
+            else:
+                self.statusBar().showMessage("Связь с фоновым сборщиком потеряна")
+            return
+
+        self._set_follow_available(CollectorCheckpoint(
+            socket_path, result.get("session"), result.get("next", 0), self._helper_filter,
+        ))
+        if requested is not None and requested.session == result.get("session"):
+            self.statusBar().showMessage(
+                f"Системный журнал обновлён: +{result.get('count', 0)} событий, всего {count}"
+            )
+        else:
+            self.statusBar().showMessage(
+                f"Загружено событий из фонового сборщика: {count}" + self._helper_filter_note()
+            )
+
+    def _toggle_collector(self, checked: bool):
+        """Выключение режима останавливает фоновый сборщик (включение — запуск при загрузке)."""
+        if checked:
+            return
+        if isinstance(self.log_checkpoint, CollectorCheckpoint):
+            self._set_follow_available(None)
+        socket_path = collector_socket_path()
+        if collector_is_running(socket_path):
+            try:
+                collector_shutdown(socket_path)
+            except OSError as e:
+                self.statusBar().showMessage(f"Не удалось остановить фоновый сборщик: {e}")
+                return
+            self.statusBar().showMessage("Фоновый сборщик остановлен")
+
+    def _cancel_helper_load(self):
+        """Прерывает загрузку: уже полученные события остаются."""
+        if self._collector_start_timer is not None:
+            self._stop_collector_start_wait()
+            self.statusBar().showMessage("Запуск фонового сборщика отменён")
+            return
+
+        if self.collector_socket is not None:
+            self._helper_cancel_requested = True
+            self.collector_socket.abort()
+            self._on_collector_finished()
+            return
+
+        process = self.helper_process
+        if process is None or self._helper_cancel_requested:
+            return
+        self._helper_cancel_requested = True
+        self.statusBar().showMessage("Загрузка системного журнала: отмена...")
+
+        # helper работает от root — сигнал ему не послать, просим завершиться через stdin
+        process.write(CANCEL_COMMAND + b"\n")
+        # пока идёт запрос пароля, pkexec ещё можно завершить
+        QtCore.QTimer.singleShot(
+            HELPER_CANCEL_TIMEOUT_MS,
+            lambda: process.kill() if self.helper_process is process else None,
+        )
+
+    def _on_helper_output(self):
+        if self.helper_process is not None:
+            data = bytes(self.helper_process.readAllStandardOutput())
+        elif self.collector_socket is not None:
+            data = bytes(self.collector_socket.readAll())
+        else:
+            return
+        for msg in self._helper_decoder.feed(data):
+            self._handle_helper_message(msg)
+
+    def _handle_helper_message(self, msg):
+        msg_type = msg.get("type")
+        if msg_type == MSG_EVENTS:
+            self._helper_pending.extend(msg.get("events") or [])
+            total = self.load_progress.property("total_bytes") or 0
+            if total:
+                self.load_progress.setValue(min(1000, int(msg.get("done", 0) * 1000 // total)))
+            if not self.all_events:
+                # первая пачка показывается сразу, не дожидаясь таймера
+                self._flush_helper_events()
+        elif msg_type == MSG_START:
+            if msg.get("reset") and self.all_events:
+                # сборщик перезапущен — дозапрос невозможен, он отдаёт всё заново
+                self._helper_delta = False
+                self._set_events([])
+            total = msg.get("total") or 0
+            self.load_progress.setProperty("total_bytes", total)
+            if total:
+                self.load_progress.setRange(0, 1000)
+                self.load_progress.setValue(0)
+        elif msg_type in (MSG_DONE, MSG_CANCELLED, MSG_ERROR):
+            self._helper_result = msg
+
+    def _flush_helper_events(self):
+        """Дописывает в таблицу события, пришедшие с прошлого срабатывания таймера."""
+        if self._helper_pending:
+            events, self._helper_pending = self._helper_pending, []
+            self._extend_events(events)
+
+        if self._helper_load_active() and not self._helper_cancel_requested:
+            loaded = len(self.all_events) + len(self._helper_pending)
+            if loaded:
+                self.statusBar().showMessage(f"Загрузка системного журнала (root): {loaded} событий...")
+
+    def _on_helper_error(self, error):
+        if error != QtCore.QProcess.FailedToStart:
+            return  # остальные случаи завершатся через finished
+        self._finish_helper_load()
+        QtWidgets.QMessageBox.warning(
+            self,
+            "Ошибка",
+            "pkexec не найден. Установите polkit или используйте офлайн-режим."
+        )
+        self.statusBar().showMessage("Не удалось запустить helper")
+
+    def _on_helper_finished(self, exit_code, exit_status):
+        process = self.helper_process
+        if process is None:
+            return
+        self._on_helper_output()
+        stderr = bytes(process.readAllStandardError()).decode("utf-8", errors="replace").strip()
+        self._finish_helper_load()
+
+        result = self._helper_result or {}
+        result_type = result.get("type")
+        count = len(self.all_events)
+
+        if result_type == MSG_ERROR:
             QtWidgets.QMessageBox.warning(
                 self,
                 "Ошибка",
-                "Helper вернул некорректный JSON."
+                f"Helper сообщил об ошибке: {result.get('error')}\n{result.get('message', '')}"
             )
+            self.statusBar().showMessage("Ошибка при загрузке системного журнала")
             return
 
-        if "error" in data:
+        if result_type == MSG_CANCELLED or (self._helper_cancel_requested and result_type != MSG_DONE):
+            self.statusBar().showMessage(f"Загрузка системного журнала прервана: загружено {count} событий")
+            return
+
+        if result_type != MSG_DONE:
+            # pkexec отказал в доступе или helper завершился аварийно
             QtWidgets.QMessageBox.warning(
                 self,
                 "Ошибка",
-                f"Helper сообщил об ошибке: {data.get('error')}\n{data.get('message', '')}"
+                f"Не удалось выполнить helper (код {exit_code}):\n{stderr}",
             )
+            self.statusBar().showMessage("Ошибка при загрузке системного журнала")
             return
 
-        events = data.get("events", [])
-        if not events:
+        if not count:
             QtWidgets.QMessageBox.information(
                 self,
                 "Информация",
                 "В журнале не найдено событий."
             )
-            self._set_events([])
             return
 
-        self._set_events(events)
         self.statusBar().showMessage(
-            f"Загружено событий из системного журнала (root): {len(events)}"
+            f"Загружено событий из системного журнала (root): {count}" + self._helper_filter_note()
         )
 
+    def _helper_filter_note(self) -> str:
+        return " (по фильтрам панели)" if self._helper_filter else ""
+
+    def _finish_helper_load(self):
+        """
+        Забирает оставшиеся события и пересчитывает фильтры/статистику по всему набору.
+        Новые события дозапроса у сборщика только дописываются (_extend_events),
+        как в режиме слежения: набор, индексы и статистика не перестраиваются.
+        """
+        self.helper_flush_timer.stop()
+        if self.helper_process is not None:
+            self.helper_process.deleteLater()
+            self.helper_process = None
+        self._show_load_progress(False)
+
+        if self._helper_pending:
+            events, self._helper_pending = self._helper_pending, []
+            self._extend_events(events)
+        if self._helper_delta:
+            self._helper_delta = False
+            return
+        if self.all_events:
+            store = self.all_events
+            # пачки сортируются по отдельности, а запоздавшие события (USER_AUTH/USER_LOGIN
+            # без EOE выходят из окна переупорядочивания позже соседей) приходят в следующих —
+            # по окончании потока ставим все строки по времени
+            order = store.time_order()
+            if order is not None:
+                store = store.take(order)
+            self._set_events(store)
+
+    def _show_load_progress(self, visible: bool):
+        if visible:
+            self.load_progress.setRange(0, 0)  # пока размер неизвестен — "бегущая" полоса
+            self.load_progress.setProperty("total_bytes", 0)
+        self.load_progress.setVisible(visible)
+        self.load_cancel_btn.setVisible(visible)
+
+    def closeEvent(self, event):
+        self.follow_timer.stop()
+        self._abort_follow_request()
+        self._stop_live_filter()
+        self._stop_text_index()
+        self._stop_sort_order()
+        if self.load_worker is not None:
+            thread = self.load_thread
+            self.load_worker.cancel()
+            thread.quit()
+            thread.wait()
+        if self.collector_socket is not None:
+            self._cancel_helper_load()
+        if self.helper_process is not None:
+            process = self.helper_process
+            self._cancel_helper_load()
+            if not process.waitForFinished(HELPER_CANCEL_TIMEOUT_MS):
+                process.kill()
+        super().closeEvent(event)
+
     def _create_tabs(self):
         self.events_tab = QtWidgets.QWidget()
         self._init_events_tab()
@@ -223,11 +1133,47 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
         open_file_action.triggered.connect(self._open_log_file_dialog)
         file_menu.addAction(open_file_action)
 
+        # --- Набор ротации из каталога (audit.log, audit.log.1..N, .gz) ---
+        open_dir_action = QtWidgets.QAction("Открыть каталог журналов...", self)
+        open_dir_action.triggered.connect(self._open_log_dir_dialog)
+        file_menu.addAction(open_dir_action)
+
         # --- Уже существующий пункт: загрузить системный журнал (root) ---
         load_root_action = QtWidgets.QAction("Загрузить системный журнал (root)", self)
         load_root_action.triggered.connect(self._load_data_with_pkexec)
         file_menu.addAction(load_root_action)
 
+        # --- То же, но отбор по фильтрам панели выполняется при чтении журнала ---
+        load_root_filtered_action = QtWidgets.QAction("Загрузить системный журнал (root) по фильтрам", self)
+        load_root_filtered_action.triggered.connect(self._load_filtered_data_with_pkexec)
+        file_menu.addAction(load_root_filtered_action)
+
+        # --- Фоновый сборщик: helper остаётся работать и отдаёт только новые события ---
+        self.collector_action = QtWidgets.QAction("Фоновый сборщик системного журнала (root)", self)
+        self.collector_action.setCheckable(True)
+        self.collector_action.toggled.connect(self._toggle_collector)
+        file_menu.addAction(self.collector_action)
+        self._check_collector_running()
+
+        # --- Слежение за дописываемым файлом журнала ---
+        self.follow_action = QtWidgets.QAction("Следить за изменениями журнала", self)
+        self.follow_action.setCheckable(True)
+        self.follow_action.setEnabled(False)
+        self.follow_action.toggled.connect(self._toggle_follow)
+        file_menu.addAction(self.follow_action)
+
+        file_menu.addSeparator()
+
+        # --- Учётные записи для перевода uid/gid в имена ---
+        identity_snapshot_action = QtWidgets.QAction("Учётные записи из снимка passwd/group...", self)
+        identity_snapshot_action.triggered.connect(self._open_identity_snapshot_dialog)
+        file_menu.addAction(identity_snapshot_action)
+
+        self.system_identities_action = QtWidgets.QAction("Учётные записи этой системы", self)
+        self.system_identities_action.setEnabled(False)
+        self.system_identities_action.triggered.connect(self._use_system_identities)
+        file_menu.addAction(self.system_identities_action)
+
         file_menu.addSeparator()
 
         exit_action = QtWidgets.QAction("Выход", self)
@@ -243,6 +1189,18 @@ class MainWindow(QtWidgets.QMainWindow, EventsTabMixin, IncidentsTabMixin, Stats
         status_bar = self.statusBar()
         status_bar.showMessage("Готово")  # простой текст внизу окна
 
+        # ход загрузки (в промилле от размера журнала) и её отмена
+        self.load_progress = QtWidgets.QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setTextVisible(False)
+        self.load_progress.setVisible(False)
+        status_bar.addPermanentWidget(self.load_progress)
+
+        self.load_cancel_btn = QtWidgets.QPushButton("Отмена")
+        self.load_cancel_btn.setVisible(False)
+        self.load_cancel_btn.clicked.connect(self._cancel_load)
+        status_bar.addPermanentWidget(self.load_cancel_btn)
+
     def _show_about_dialog(self):
         QtWidgets.QMessageBox.information(
             self,
@@ -1,5 +1,17 @@
+import numpy as np
 from PyQt5 import QtCore, QtWidgets, QtGui
 
+from .sortorder import sort_keys, sorted_rows
+from .store import EventStore
+
+# Сколько строк модель отдаёт представлению за раз (canFetchMore/fetchMore):
+# таблица строится по первым строкам, остальные подгружаются при прокрутке
+FETCH_BATCH_ROWS = 1000
+
+# Таблица от стольких строк сортируется по перестановке колонки (sortorder.SortOrders):
+# если её ещё нет, модель просит посчитать её в фоне (sort_requested) и сортирует по готовности
+SORT_BACKGROUND_MIN_ROWS = 100000
+
 
 class PlaceholderTableView(QtWidgets.QTableView):
     """QTableView, которая показывает текст, когда нет данных."""
@@ -33,9 +45,50 @@ class PlaceholderTableView(QtWidgets.QTableView):
         rect = self.viewport().rect()
         painter.drawText(rect, QtCore.Qt.AlignCenter, self._placeholder_text)
 
+    def show_rows(self, rows) -> bool:
+        """
+        Заменяет строки модели EventRowsModel на rows (row id). Выделенное событие
+        остаётся выделенным; если оно было видно — на том же месте экрана,
+        иначе наверху остаётся прежняя верхняя строка (если она есть в rows).
+        Возвращает True, если выделение сохранилось.
+        """
+        model = self.model()
+        selection_model = self.selectionModel()
+        selected = selection_model.selectedRows() if selection_model is not None else []
+        selected_row = model.store_row(selected[0].row()) if selected else -1
+
+        # опорная строка прокрутки и её смещение от верхней видимой строки
+        top = self.rowAt(0)
+        bottom = self.rowAt(self.viewport().height() - 1)
+        if selected and top >= 0 and top <= selected[0].row() and (bottom < 0 or selected[0].row() <= bottom):
+            anchor, offset = selected_row, selected[0].row() - top
+        else:
+            anchor, offset = model.store_row(top), 0
+
+        model.set_rows(rows)
+
+        kept = False
+        if selected_row >= 0:
+            row = model.find_store_row(selected_row)
+            if row >= 0:
+                model.fetch_until(row)
+                self.selectRow(row)
+                kept = True
+        if anchor >= 0:
+            row = model.find_store_row(anchor)
+            if row >= 0:
+                model.fetch_until(row)
+                self.scrollTo(model.index(max(row - offset, 0), 0), QtWidgets.QAbstractItemView.PositionAtTop)
+        return kept
 
-class AuditEventsTableModel(QtCore.QAbstractTableModel):
-    """Модель для таблицы событий auditd."""
+
+class EventStoreModel(QtCore.QAbstractTableModel):
+    """
+    Модель-источник для таблиц событий: все события хранилища EventStore,
+    строка модели — row id. Одна на окно: смена набора событий — set_store(),
+    новые события режима слежения — extend(). Таблицы показывают не её, а
+    EventRowsModel — свой набор row id поверх неё.
+    """
 
     COLUMNS = [
         "time",  # Время
@@ -57,14 +110,30 @@ class AuditEventsTableModel(QtCore.QAbstractTableModel):
         "Ключ",
     ]
 
-    def __init__(self, events=None, parent=None):
+    def __init__(self, store: EventStore, parent=None):
         super().__init__(parent)
-        self._events = events or []
+        self.store = store
+
+    def set_store(self, store: EventStore):
+        self.beginResetModel()
+        self.store = store
+        self.endResetModel()
+
+    def extend(self, events):
+        """Дописывает события в конец хранилища (row id уже показанных событий не меняются)."""
+        if not events:
+            return
+        first = len(self.store)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(events) - 1)
+        self.store.extend(events)
+        self.endInsertRows()
 
     # Обязательные методы модели:
 
     def rowCount(self, parent=QtCore.QModelIndex()) -> int:
-        return len(self._events)
+        if parent.isValid():
+            return 0
+        return len(self.store)
 
     def columnCount(self, parent=QtCore.QModelIndex()) -> int:
         return len(self.COLUMNS)
@@ -72,11 +141,14 @@ class AuditEventsTableModel(QtCore.QAbstractTableModel):
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if not index.isValid():
             return None
+        return self.row_data(index.row(), index.column(), role)
 
+    def row_data(self, store_row: int, column: int, role=QtCore.Qt.DisplayRole):
+        """data() для строки хранилища store_row (EventRowsModel зовёт напрямую, без QModelIndex)."""
         if role == QtCore.Qt.DisplayRole:
-            event = self._events[index.row()]
-            col_key = self.COLUMNS[index.column()]
-            value = event.get(col_key, "")
+            col_key = self.COLUMNS[column]
+            # колоночное хранилище: берём одно поле, не собирая событие целиком
+            value = self.store.value(store_row, col_key)
             # Приводим bool success к "yes"/"no" для красоты
             if col_key == "success":
                 return "yes" if value else "no"
@@ -91,38 +163,282 @@ class AuditEventsTableModel(QtCore.QAbstractTableModel):
                 return self.HEADERS[section]
         return super().headerData(section, orientation, role)
 
+
+class EventRowsModel(QtCore.QAbstractProxyModel):
+    """
+    Таблица событий: строки источника EventStoreModel в заданном порядке —
+    только массив row id (как EventView). Фильтрация (set_rows()) и сортировка
+    меняют массив, а не модель, поэтому представление остаётся подключённым
+    к тому же объекту со своей selectionModel.
+
+    Сортировка большой таблицы ждёт перестановку колонки из фонового потока:
+    модель сообщает sort_requested(колонка), а владелец окна по готовности
+    перестановки вызывает finish_sort(). Выбранная в заголовке сортировка
+    запоминается: новые наборы строк (set_rows()) упорядочиваются так же,
+    а новые события (add_rows()) встают на свои места.
+
+    Строки отдаются представлению порциями по FETCH_BATCH_ROWS: rowCount() —
+    сколько уже показано, остальные QTableView запрашивает через fetchMore()
+    при прокрутке к концу. Поэтому смена набора событий не зависит от его размера.
+    """
+
+    sort_requested = QtCore.pyqtSignal(str)  # имя колонки, для которой нужна перестановка
+
+    def __init__(self, source: EventStoreModel, parent=None):
+        super().__init__(parent)
+        self._rows = np.zeros(0, dtype=np.int64)
+        # сколько первых строк _rows уже отдано представлению
+        self._loaded = 0
+        # (column, order) сортировки, ждущей перестановку колонки, или None
+        self._pending_sort = None
+        # (column, order) выбранной сортировки; None — порядок, в котором строки переданы (от новых к старым)
+        self._sort = None
+        self.setSourceModel(source)
+        # новый набор событий в источнике — прежние row id ничего не значат
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._on_source_reset)
+
+    def _on_source_reset(self):
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._loaded = 0
+        self._pending_sort = None
+        self.endResetModel()
+
+    @property
+    def store(self) -> EventStore:
+        return self.sourceModel().store
+
+    @property
+    def rows(self) -> np.ndarray:
+        """row id строк таблицы (по порядку строк)."""
+        return self._rows
+
+    def set_rows(self, rows):
+        """
+        Заменяет набор строк таблицы (row id хранилища источника) и упорядочивает
+        его по выбранной сортировке; если для этого нужна перестановка колонки,
+        строки показываются как есть, а сортировка ждёт её (sort_requested).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        wait_for = None
+        if self._sort is not None:
+            column, order = self._sort
+            name = self._column_name(column)
+            if self._needs_sort_order(name, rows):
+                wait_for = name
+            else:
+                rows = sorted_rows(self.store, rows, name, reverse=(order == QtCore.Qt.DescendingOrder))
+
+        self.beginResetModel()
+        self._rows = rows
+        self._loaded = min(len(self._rows), FETCH_BATCH_ROWS)
+        self._pending_sort = None
+        self.endResetModel()
+
+        if wait_for is not None:
+            self._pending_sort = self._sort
+            self.sort_requested.emit(wait_for)
+
+    # Обязательные методы модели:
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._loaded
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not (0 <= row < self._loaded and 0 <= column < self.columnCount()):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QtCore.QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or proxy_index.row() >= self._loaded:
+            return QtCore.QModelIndex()
+        return self.sourceModel().index(int(self._rows[proxy_index.row()]), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QtCore.QModelIndex()
+        row = self.find_store_row(source_index.row())
+        if row < 0 or row >= self._loaded:
+            return QtCore.QModelIndex()
+        return self.index(row, source_index.column())
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        return self.sourceModel().row_data(int(self._rows[index.row()]), index.column(), role)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        # номера строк таблицы, а не row id
+        return QtCore.QAbstractItemModel.headerData(self, section, orientation, role)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        return self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        self._fetch(self._loaded + FETCH_BATCH_ROWS)
+
+    def _fetch(self, count: int):
+        """Показывает первые count строк (одной вставкой)."""
+        count = min(count, len(self._rows))
+        if count <= self._loaded:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._loaded, count - 1)
+        self._loaded = count
+        self.endInsertRows()
+
+    def total_rows(self) -> int:
+        """Сколько всего строк в наборе (включая ещё не показанные представлению)."""
+        return len(self._rows)
+
+    def fetch_until(self, row: int):
+        """Отдаёт представлению строки вплоть до row (например, чтобы выделить её)."""
+        if row >= self._loaded:
+            # до конца порции, в которую попадает row
+            self._fetch((row // FETCH_BATCH_ROWS + 1) * FETCH_BATCH_ROWS)
+
     # Удобный метод, чтобы забирать целое событие по номеру строки
     def get_event(self, row: int) -> dict:
-        if 0 <= row < len(self._events):
-            return self._events[row]
+        if 0 <= row < self._loaded:
+            return self.store.row(int(self._rows[row]))
         return {}
 
+    def store_row(self, row: int) -> int:
+        """row id события в строке row таблицы или -1."""
+        if 0 <= row < self._loaded:
+            return int(self._rows[row])
+        return -1
+
+    def find_store_row(self, store_row: int) -> int:
+        """Номер строки таблицы с событием row id store_row или -1."""
+        hits = np.flatnonzero(self._rows == store_row)
+        return int(hits[0]) if len(hits) else -1
+
+    def add_rows(self, rows):
+        """
+        Добавляет row id новых событий (режим слежения, дозагрузка), не сбрасывая
+        модель: представление сохраняет выделение и прокрутку. Без сортировки
+        по колонке строки (от новых к старым) встают в начало таблицы, иначе —
+        на свои места по сортировке. Row id новых событий больше прежних.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        if self._sort is None:
+            positions = np.zeros(len(rows), dtype=np.int64)
+        else:
+            column, order = self._sort
+            name = self._column_name(column)
+            reverse = order == QtCore.Qt.DescendingOrder
+            rows = sorted_rows(self.store, rows, name, reverse=reverse)
+            keys = sort_keys(self.store, name, self._rows)
+            new_keys = sort_keys(self.store, name, rows)
+            # при равных ключах строки упорядочены по row id — новые идут после прежних
+            # (по убыванию — перед ними)
+            if reverse:
+                positions = len(keys) - np.searchsorted(keys[::-1], new_keys, side="right")
+            else:
+                positions = np.searchsorted(keys, new_keys, side="right")
+        self._insert_rows(rows, positions)
+
+    def _insert_rows(self, rows: np.ndarray, positions: np.ndarray):
+        """
+        Вставляет rows перед строками positions (неубывающие номера в текущем _rows).
+        Попавшие в показанные строки вставляются с уведомлением представления
+        (по одной вставке на место), остальные ждут fetchMore().
+        """
+        if self._loaded == len(self._rows):
+            shown = len(rows)
+        else:
+            shown = int(np.count_nonzero(positions < self._loaded))
+
+        done = 0
+        for position, count in zip(*np.unique(positions[:shown], return_counts=True)):
+            at = int(position) + done
+            count = int(count)
+            self.beginInsertRows(QtCore.QModelIndex(), at, at + count - 1)
+            self._rows = np.insert(self._rows, at, rows[done:done + count])
+            self._loaded += count
+            self.endInsertRows()
+            done += count
+        if shown < len(rows):
+            self._rows = np.insert(self._rows, positions[shown:] + shown, rows[shown:])
+
+    def _column_name(self, column: int) -> str:
+        return self.sourceModel().COLUMNS[column]
+
+    def _needs_sort_order(self, name: str, rows) -> bool:
+        """Сортировка rows по колонке name слишком долгая для GUI-потока без готовой перестановки."""
+        return self.store.sort_orders.order(name) is None and len(rows) >= SORT_BACKGROUND_MIN_ROWS
+
     def sort(self, column, order=QtCore.Qt.AscendingOrder):
-        """Сортировка данных по выбранной колонке."""
-        if not (0 <= column < len(self.COLUMNS)):
+        """
+        Сортировка по колонке: переставляется только массив row id (по готовой
+        перестановке колонки или по типизированным ключам своих строк).
+        """
+        if not (0 <= column < len(self.sourceModel().COLUMNS)):
+            return
+        self._sort = (column, order)
+        name = self._column_name(column)
+
+        if self._needs_sort_order(name, self._rows):
+            # сортировать миллионы строк в GUI-потоке не будем — ждём перестановку
+            self._pending_sort = (column, order)
+            self.sort_requested.emit(name)
             return
+        self._sort_rows(column, order)
+
+    def _sort_rows(self, column: int, order):
+        self._pending_sort = None
+        name = self._column_name(column)
+        rows = sorted_rows(self.store, self._rows, name, reverse=(order == QtCore.Qt.DescendingOrder))
 
-        col_key = self.COLUMNS[column]
-        reverse = (order == QtCore.Qt.DescendingOrder)
+        # выделение и текущая строка остаются на тех же событиях; событие могло
+        # уехать за показанные строки — до перестановки показываем строки до конца
+        # его порции (число строк внутри layoutChanged меняться не должно)
+        persistent_rows = [self.store_row(index.row()) for index in self.persistentIndexList()]
+        positions = np.flatnonzero(np.isin(rows, [r for r in persistent_rows if r >= 0]))
+        if len(positions):
+            self.fetch_until(int(positions[-1]))
 
         # уведомляем представление, что сейчас будет перестановка
         self.layoutAboutToBeChanged.emit()
 
-        # для времени лучше сортировать по timestamp, если он есть
-        if col_key == "time":
-            def key_func(ev):
-                ts = ev.get("timestamp")
-                if ts is None:
-                    return 0
-                return ts
-        else:
-            def key_func(ev):
-                val = ev.get(col_key)
-                if val is None:
-                    return ""
-                return str(val)
+        persistent = self.persistentIndexList()
+        persistent_rows = [self.store_row(index.row()) for index in persistent]
+        self._rows = rows
 
-        self._events.sort(key=key_func, reverse=reverse)
+        if persistent:
+            new_rows = {store_row: self.find_store_row(store_row) for store_row in set(persistent_rows) if store_row >= 0}
+            new_indexes = []
+            for index, store_row in zip(persistent, persistent_rows):
+                row = new_rows.get(store_row, -1)
+                new_indexes.append(self.index(row, index.column()) if 0 <= row < self._loaded else QtCore.QModelIndex())
+            self.changePersistentIndexList(persistent, new_indexes)
 
         # сообщаем, что данные переставлены
         self.layoutChanged.emit()
+
+    def finish_sort(self, name: str):
+        """
+        Перестановка колонки name готова (или не получилась — тогда сортировка
+        идёт по ключам строк): выполняет ждавшую её сортировку.
+        """
+        if self._pending_sort is None:
+            return
+        column, order = self._pending_sort
+        if self._column_name(column) == name:
+            self._sort_rows(column, order)
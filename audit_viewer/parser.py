@@ -1,20 +1,152 @@
 from __future__ import annotations
 
+import gzip
+import heapq
+import mmap
+import multiprocessing
+import os
 import re
-from datetime import datetime
-from collections import Counter
-import pwd
-from typing import Any, Dict, List, Optional, Tuple
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import OrderedDict
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .event import AuditEvent, EventDetails
+from .identity import UNSET_ID_VALUES, IdentityResolver, default_identities
+from .rawtext import register_raw_file
+from .timefmt import format_timestamp
 
 # Специальные значения для "неустановленного" auid
-UNSET_AUID_VALUES = {"-1", "4294967295"}
+UNSET_AUID_VALUES = UNSET_ID_VALUES
+
+# Окно переупорядочивания при потоковой сборке событий (см. AuditEventAssembler):
+# record'ы одного события auditd пишет подряд, так что окна с запасом хватает
+DEFAULT_REORDER_RECORDS = 10000
+DEFAULT_REORDER_SECONDS = 60.0
+
+# Параллельный разбор: кусков на процесс и минимальный размер файла,
+# с которого запуск пула процессов окупается
+PARALLEL_CHUNKS_PER_WORKER = 4
+PARALLEL_MIN_FILE_SIZE = 16 * 1024 * 1024
+
+# Как часто (в байтах файла) сообщать о ходе разбора (параметр progress)
+PROGRESS_STEP_BYTES = 4 * 1024 * 1024
+_PROGRESS_STEP_LINES = 16384
+
+# Поиск смещения по времени (find_time_offset): точность и сколько строк
+# после точки деления просматривать в поисках заголовка record'а
+TIME_SEEK_MIN_BYTES = 64 * 1024
+TIME_SEEK_MAX_LINES = 16
+
+# Предварительный разбор хвоста файла (parse_audit_log_tail): сколько байт с конца
+# и сколько первых record'ов диапазона считать началом событий из-за его границы
+PREVIEW_TAIL_BYTES = 1024 * 1024
+PREVIEW_HEAD_RECORDS = 256
+
+# Имя журнала auditd; файлы ротации — audit.log.1 … audit.log.N(.gz)
+AUDIT_LOG_BASENAME = "audit.log"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# log_format = ENRICHED: после полей record'а через \x1d идут переводы
+# (AUID="root" UID="root" SYSCALL=openat ARCH=x86_64 ...), сделанные auditd на исходном хосте
+ENRICHED_SEPARATOR = "\x1d"
+_ENRICHED_SEPARATOR_BYTES = b"\x1d"
 
 # --- Регулярные выражения для разбора строк журнала auditd ---
 AUDIT_LINE_RE = re.compile(
     r'^type=(?P<type>\S+)\s+msg=audit\((?P<ts>[\d\.]+):(?P<eid>\d+)\):\s*(?P<data>.*)$'
 )
+# Прежнее выражение для полей key=value; оставлено как эталон поведения
+# (tokenize_fields() даёт тот же результат). На длинных "словах" без '='
+# (например, hex после незакрытой кавычки) оно квадратичное: каждая позиция
+# внутри слова пробуется как начало ключа.
 FIELD_RE = re.compile(r'([A-Za-z0-9_]+)=(".*?"|\S+)')
 
+# Лексема токенизатора полей. Ключ может начинаться только в начале "слова"
+# (lookbehind), поэтому каждое слово просматривается один раз — линейное время.
+# Значение в "..." отдаётся без кавычек, иначе — всё до пробела.
+_FIELD_TOKEN_RE = re.compile(r'(?<![A-Za-z0-9_])([A-Za-z0-9_]+)=(?:"([^"\n]*)"|(\S+))')
+
+# То же самое для разбора на уровне bytes (mmap-чтение, см. parse_audit_line_bytes).
+# В bytes-шаблонах \s — только ASCII-пробелы, а str-версия считает пробелом ещё
+# и разделители \x1c-\x1f (в т.ч. \x1d из log_format=ENRICHED) — добавляем их явно.
+_WS_BYTES = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+AUDIT_HEADER_BYTES_RE = re.compile(
+    rb'type=([^\s\x1c-\x1f]+)[\s\x1c-\x1f]+msg=audit\(([\d.]+):(\d+)\):[\s\x1c-\x1f]*'
+)
+_FIELD_TOKEN_BYTES_RE = re.compile(
+    rb'(?<![A-Za-z0-9_])([A-Za-z0-9_]+)=(?:"([^"\n]*)"|([^\s\x1c-\x1f]+))'
+)
+
+# имена полей повторяются из строки в строку — декодируем (и интернируем) каждое один раз
+_FIELD_NAME_CACHE: Dict[bytes, str] = {}
+
+
+def tokenize_fields(data: str) -> Dict[str, str]:
+    """
+    Разбирает область данных record'а (всё после "msg=audit(...):")
+    в словарь полей за один линейный проход.
+
+    Правила (совпадают с прежним разбором через FIELD_RE):
+        - key="значение с пробелами" → кавычки снимаются;
+        - key='...' → снимаются парные одинарные кавычки;
+        - висящая одинарная кавычка в конце (res=failed' из msg='...'
+          записей USER_*) отбрасывается;
+        - вложенная полезная нагрузка msg='op=... acct="root" res=...'
+          раскладывается на отдельные поля, сам msg получает "'op=...";
+        - при повторе ключа побеждает последнее значение.
+    """
+    fields: Dict[str, str] = {}
+    for key, quoted, plain in _FIELD_TOKEN_RE.findall(data):
+        if plain:
+            # у значения без кавычек закрывающей " быть не может (иначе сработала
+            # бы альтернатива "..."), поэтому обрабатываем только '
+            if plain[-1] == "'":
+                if len(plain) >= 2 and plain[0] == "'":
+                    plain = plain[1:-1]
+                else:
+                    plain = plain[:-1]
+            fields[sys.intern(key)] = plain
+        else:
+            fields[sys.intern(key)] = quoted
+    return fields
+
+
+def _split_enriched(data: str) -> Tuple[Dict[str, str], Optional[Dict[str, str]]]:
+    """
+    Поля record'а и (если есть) секция переводов ENRICHED отдельно.
+    Переводы остаются и в полях (в details они видны как раньше — AUID, UID, ...).
+    """
+    sep = data.find(ENRICHED_SEPARATOR)
+    if sep < 0:
+        return tokenize_fields(data), None
+    fields = tokenize_fields(data[:sep])
+    enriched = tokenize_fields(data[sep + 1:])
+    fields.update(enriched)
+    return fields, enriched
+
+
+def _tokenize_fields_bytes(line: bytes, pos: int, endpos: Optional[int] = None) -> Dict[str, str]:
+    """tokenize_fields() для bytes: разбирает line[pos:endpos], декодируя только ключи и значения."""
+    fields: Dict[str, str] = {}
+    if endpos is None:
+        endpos = len(line)
+    for key_b, quoted, plain in _FIELD_TOKEN_BYTES_RE.findall(line, pos, endpos):
+        key = _FIELD_NAME_CACHE.get(key_b)
+        if key is None:
+            key = _FIELD_NAME_CACHE[key_b] = sys.intern(key_b.decode("ascii"))
+
+        if plain:
+            if plain[-1] == 0x27:  # '
+                if len(plain) >= 2 and plain[0] == 0x27:
+                    plain = plain[1:-1]
+                else:
+                    plain = plain[:-1]
+            fields[key] = plain.decode("utf-8", errors="ignore")
+        else:
+            fields[key] = quoted.decode("utf-8", errors="ignore")
+    return fields
+
 
 def parse_audit_line(line: str):
     line = line.strip()
@@ -40,86 +172,206 @@ def parse_audit_line(line: str):
     except ValueError:
         event_id = None
 
-    fields = {}
-    for fm in FIELD_RE.finditer(data):
-        key = fm.group(1)
-        value = fm.group(2)
+    fields, enriched = _split_enriched(data)
 
-        # 1) убираем парные кавычки "..." или '...'
-        if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
-            value = value[1:-1]
-        else:
-            # 2) типичный артефакт: res=failed'
-            #    убираем висящую одинокую кавычку в конце
-            if value.endswith("'"):
-                value = value[:-1]
-
-        fields[key] = value
-
-    return {
+    rec = {
         "type": rec_type,
         "timestamp": timestamp,
         "event_id": event_id,
         "fields": fields,
         "raw": line,
     }
+    if enriched:
+        rec["enriched"] = enriched
+    return rec
+
+
+def parse_audit_line_bytes(line: bytes):
+    """
+    Аналог parse_audit_line() для строки в виде bytes (без декодирования всей строки
+    и регулярок над str). Результат совпадает с parse_audit_line(line.decode()).
+    """
+    line = line.strip(_WS_BYTES)
+    rec = _parse_stripped_line_bytes(line)
+    if rec:
+        rec["raw"] = line.decode("utf-8", errors="ignore")
+    return rec
+
+
+def _parse_stripped_line_bytes(line: bytes):
+    """Разбор уже обрезанной строки без сырого текста (его добавляет вызывающий)."""
+    if not line:
+        return None
+
+    m = AUDIT_HEADER_BYTES_RE.match(line)
+    if not m:
+        return None
+
+    try:
+        timestamp = float(m.group(2))
+    except ValueError:
+        timestamp = None
+
+    try:
+        event_id = int(m.group(3))
+    except ValueError:
+        event_id = None
+
+    start = m.end()
+    sep = line.find(_ENRICHED_SEPARATOR_BYTES, start)
+    if sep < 0:
+        fields = _tokenize_fields_bytes(line, start)
+        enriched = None
+    else:
+        fields = _tokenize_fields_bytes(line, start, sep)
+        enriched = _tokenize_fields_bytes(line, sep + 1)
+        fields.update(enriched)
+
+    rec = {
+        "type": m.group(1).decode("utf-8", errors="ignore"),
+        "timestamp": timestamp,
+        "event_id": event_id,
+        "fields": fields,
+    }
+    if enriched:
+        rec["enriched"] = enriched
+    return rec
+
+
+def iter_audit_records_mmap(
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        file_id: Optional[int] = None,
+        progress: Optional[Callable[[int], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Читает record'ы из файла через mmap, разбирая строки прямо на bytes.
+    start/end — диапазон байт (для параллельного разбора), start должен
+    указывать на начало строки.
 
+    Если задан file_id (см. rawtext.register_raw_file), сырой текст строки
+    не декодируется: record получает "span" = (file_id, offset, length)
+    вместо "raw".
 
-def format_timestamp(ts: float) -> str:
-    """Преобразует unixtime в строку 'YYYY-MM-DD HH:MM:SS'."""
+    progress(done) вызывается примерно каждые PROGRESS_STEP_BYTES с числом
+    прочитанных байт диапазона.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if end is None or end > size:
+            end = size
+        if start >= end:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = start
+            find = mm.find
+            next_report = start + PROGRESS_STEP_BYTES if progress is not None else end
+            while pos < end:
+                if pos >= next_report:
+                    progress(pos - start)
+                    next_report = pos + PROGRESS_STEP_BYTES
+                nl = find(b"\n", pos, end)
+                if nl < 0:
+                    nl = end
+                if file_id is None:
+                    rec = parse_audit_line_bytes(mm[pos:nl])
+                else:
+                    line = mm[pos:nl]
+                    stripped = line.strip(_WS_BYTES)
+                    rec = _parse_stripped_line_bytes(stripped)
+                    if rec:
+                        offset = pos
+                        if len(stripped) != len(line):
+                            offset += len(line) - len(line.lstrip(_WS_BYTES))
+                        rec["span"] = (file_id, offset, len(stripped))
+                pos = nl + 1
+                if rec:
+                    yield rec
+
+
+def line_timestamp_bytes(line: bytes) -> Optional[float]:
+    """Timestamp строки журнала по одному заголовку, без разбора полей (None — не record)."""
+    m = AUDIT_HEADER_BYTES_RE.match(line.lstrip(_WS_BYTES))
+    if not m:
+        return None
     try:
-        dt = datetime.fromtimestamp(ts)
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except Exception:
-        return ""
+        return float(m.group(2))
+    except ValueError:
+        return None
+
+
+def find_time_offset(f: IO[bytes], ts: float) -> int:
+    """
+    Смещение начала строки, с которой стоит читать открытый журнал f, чтобы не
+    пропустить record'ы с timestamp >= ts: двоичный поиск по байтам (auditd пишет
+    record'ы по времени). Порядок в журнале лишь примерный, поэтому вызывающий
+    передаёт ts с запасом (см. DEFAULT_REORDER_SECONDS).
+    """
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        return 0
+
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lo, hi = 0, size  # lo — всегда начало строки, до него все record'ы старше ts
+        while hi - lo > TIME_SEEK_MIN_BYTES:
+            mid = (lo + hi) // 2
+            nl = mm.find(b"\n", mid, hi)
+            line_ts = _first_timestamp_from(mm, nl + 1, hi) if nl >= 0 else None
+            if line_ts is not None and line_ts < ts:
+                lo = nl + 1
+            else:
+                # record не найден или уже не старше ts — ищем левее (сдвиг влево безопасен)
+                hi = mid
+        return lo
+
+
+def _first_timestamp_from(mm: mmap.mmap, pos: int, end: int) -> Optional[float]:
+    """Timestamp первого record'а в [pos, end), просматривая не больше TIME_SEEK_MAX_LINES строк."""
+    for _ in range(TIME_SEEK_MAX_LINES):
+        if pos >= end:
+            return None
+        nl = mm.find(b"\n", pos, end)
+        if nl < 0:
+            nl = end
+        ts = line_timestamp_bytes(mm[pos:nl])
+        if ts is not None:
+            return ts
+        pos = nl + 1
+    return None
 
 
 def resolve_user(auid_str: Optional[str], uid_str: Optional[str]) -> str:
     """
-    Превращает auid/uid из лога в человекочитаемое значение:
+    Превращает auid/uid из лога в человекочитаемое значение
+    ("unset", "root (0)", "username (1000)", "1001", ...) через системные базы.
+    Имена кэшируются, см. IdentityResolver.resolve_user().
+    """
+    return default_identities.resolve_user(auid_str, uid_str)
 
-    - приоритетно использует auid, если он валиден;
-    - иначе uid;
-    - пытается получить имя пользователя через pwd.getpwuid;
-    - корректно обрабатывает -1/4294967295 (unset).
 
-    Возвращает строку вида:
-        - "unset"
-        - "root (0)"
-        - "username (1000)"
-        - "1001" (если UID не найден в системе)
-        - исходное значение, если его нельзя привести к int.
+def _enriched_user(auid_str: Optional[str], uid_str: Optional[str], enriched: Dict[str, str]) -> Optional[str]:
+    """
+    Пользователь по переводам ENRICHED (AUID=/UID=) в том же виде, что и
+    resolve_user(): "name (uid)". None — перевода нет, нужен обычный поиск.
     """
     raw = auid_str or uid_str
     if raw is None:
-        return "?"
-
+        return None
     raw = str(raw)
-
-    # unset значения
     if raw in UNSET_AUID_VALUES:
         return "unset"
 
-    # бывает вида "1000" или "1000 (ivan)" — отрежем всё после пробела
-    numeric_part = raw.split()[0]
+    name = enriched.get("AUID") if auid_str else enriched.get("UID")
+    if not name or name in ("unset", "?"):
+        return None
 
     try:
-        uid_val = int(numeric_part)
+        uid_val = int(raw.split()[0])
     except ValueError:
-        # это уже не чистый uid, вернём как есть
-        return raw
-
-    # uid = 0 — root
-    if uid_val == 0:
-        return "root (0)"
-
-    # пытаемся найти имя пользователя
-    try:
-        pw = pwd.getpwuid(uid_val)
-        return f"{pw.pw_name} ({uid_val})"
-    except KeyError:
-        # нет такого uid в системе
-        return f"{uid_val}"
+        return None
+    return f"{name} ({uid_val})"
 
 
 def _merge_fields_to_details(event_records: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -129,6 +381,9 @@ def _merge_fields_to_details(event_records: List[Dict[str, Any]]) -> Dict[str, A
     Если ключ встречается несколько раз (например, несколько PATH/name),
     значения агрегируются в список. Это важно для корректного анализа
     изменений нескольких файлов в рамках одного события.
+
+    build_event_summary() делает то же самое лениво (EventDetails);
+    эта функция — эталон сборки целиком.
     """
     details: Dict[str, Any] = {}
 
@@ -169,15 +424,38 @@ def _choose_main_record(event_records: List[Dict[str, Any]]) -> Dict[str, Any]:
     return event_records[0]
 
 
-def build_event_summary(event_records: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def _merge_adjacent_spans(spans: Iterable[Tuple[int, int, int]]) -> Tuple[Tuple[int, int, int], ...]:
+    """
+    Склеивает участки соседних строк (разделённых ровно одним "\n") в один:
+    record'ы события обычно идут подряд, и текст такого участка совпадает
+    с "\n".join() строк, а хранить нужно одну тройку вместо нескольких.
+    """
+    merged: List[Tuple[int, int, int]] = []
+    for span in spans:
+        if merged:
+            file_id, offset, length = merged[-1]
+            if span[0] == file_id and span[1] == offset + length + 1:
+                merged[-1] = (file_id, offset, length + 1 + span[2])
+                continue
+        merged.append(span)
+    return tuple(merged)
+
+
+def build_event_summary(
+        event_records: List[Dict[str, Any]],
+        identities: Optional[IdentityResolver] = None,
+) -> Optional[AuditEvent]:
     """
     На основе списка record'ов (одного события) строит краткую сводку
     для таблицы и details/raw для нижней панели.
+    identities — резолвер uid → имя (по умолчанию — системные базы с кэшем).
 
-    Возвращает dict:
+    Возвращает AuditEvent (читается как dict с ключами):
         {
-            "time": ...,
+            "time": ...,  # строка из timestamp, форматируется при обращении
             "timestamp": ...,
+            "event_id": ...,
+            "node": ...,
             "user": ...,
             "event_type": ...,
             "comm": ...,
@@ -185,6 +463,8 @@ def build_event_summary(event_records: List[Dict[str, Any]]) -> Optional[Dict[st
             "pid": ...,
             "ppid": ...,
             "syscall": ...,
+            "syscall_name": ...,  # из ENRICHED (SYSCALL=), иначе None
+            "arch": ...,          # из ENRICHED (ARCH=), иначе None
             "exit": ...,
             "cwd": ...,
             "success": bool | None,
@@ -192,6 +472,9 @@ def build_event_summary(event_records: List[Dict[str, Any]]) -> Optional[Dict[st
             "details": { ... },
             "raw": "строки лога\n..."
         }
+
+    Если record'ы прочитаны со span'ами (iter_audit_records_mmap с file_id),
+    текст не копируется в событие — оно получает raw_spans.
     """
     if not event_records:
         return None
@@ -203,16 +486,20 @@ def build_event_summary(event_records: List[Dict[str, Any]]) -> Optional[Dict[st
             if ts is None or rec["timestamp"] < ts:
                 ts = rec["timestamp"]
 
-    time_str = format_timestamp(ts) if ts is not None else ""
-
     # выбираем основной record
     main_rec = _choose_main_record(event_records)
     f = main_rec["fields"]
 
+    # переводы log_format=ENRICHED сделаны на исходном хосте — им доверяем
+    # больше, чем локальным учётным записям, и не тратим время на поиск
+    enriched = main_rec.get("enriched")
+
     # пользователь
     auid = f.get("auid")
     uid = f.get("uid")
-    user = resolve_user(auid, uid)
+    user = _enriched_user(auid, uid, enriched) if enriched else None
+    if user is None:
+        user = (identities or default_identities).resolve_user(auid, uid)
 
     event_type = main_rec["type"]
     comm = f.get("comm", "")
@@ -222,6 +509,8 @@ def build_event_summary(event_records: List[Dict[str, Any]]) -> Optional[Dict[st
     pid = f.get("pid")
     ppid = f.get("ppid")
     syscall = f.get("syscall")
+    syscall_name = enriched.get("SYSCALL") if enriched else None
+    arch = enriched.get("ARCH") if enriched else None
     exit_code = f.get("exit")
     cwd = f.get("cwd")
     tty = f.get("tty")
@@ -248,117 +537,724 @@ def build_event_summary(event_records: List[Dict[str, Any]]) -> Optional[Dict[st
                 success = False
         # если нет ни success, ни res — оставляем None
 
-    # Собираем детали (с учётом повторяющихся ключей)
-    details = _merge_fields_to_details(event_records)
-
-    raw_lines = [rec["raw"] for rec in event_records]
-    raw_text = "\n".join(raw_lines)
+    # Детали (с учётом повторяющихся ключей) собираются при первом обращении
+    details = EventDetails([rec["fields"] for rec in event_records])
 
-    return {
-        "time": time_str,
-        "timestamp": ts,
-        "user": user,
-        "event_type": event_type,
-        "comm": comm,
-        "exe": exe,
-        "pid": pid,
-        "ppid": ppid,
-        "syscall": syscall,
-        "exit": exit_code,
-        "cwd": cwd,
-        "tty": tty,
-        "acct": acct,
-        "addr": addr,
-        "hostname": hostname,
-        "success": success,
-        "key": key,
-        "details": details,
-        "raw": raw_text,
-    }
+    raw_text = None
+    raw_spans = None
+    if all("span" in rec for rec in event_records):
+        raw_spans = _merge_adjacent_spans(rec["span"] for rec in event_records)
+    else:
+        raw_text = "\n".join(rec["raw"] for rec in event_records)
+
+    return AuditEvent(
+        timestamp=ts,
+        event_id=main_rec["event_id"],
+        node=f.get("node"),
+        user=user,
+        event_type=event_type,
+        comm=comm,
+        exe=exe,
+        pid=pid,
+        ppid=ppid,
+        syscall=syscall,
+        syscall_name=syscall_name,
+        arch=arch,
+        exit=exit_code,
+        cwd=cwd,
+        tty=tty,
+        acct=acct,
+        addr=addr,
+        hostname=hostname,
+        success=success,
+        key=key,
+        details=details,
+        raw=raw_text,
+        raw_spans=raw_spans,
+    )
+
+
+def _event_key(rec: Dict[str, Any]) -> Tuple[Optional[str], int, int]:
+    """
+    Ключ группировки record'ов в событие: (node, event_id, ts_bucket)
+        node      — поле node=... (если есть, для многомашинной агрегации)
+        event_id  — идентификатор события из audit(...)
+        ts_bucket — секунда таймстампа (для снижения риска коллизий)
+    """
+    ts = rec["timestamp"]
+    node = rec["fields"].get("node")
+    ts_bucket = int(ts) if ts is not None else 0
+    return (node, rec["event_id"], ts_bucket)
 
 
-def parse_audit_log_file(path: str) -> List[Dict[str, Any]]:
+class AuditEventAssembler:
     """
-    Разбирает файл журнала auditd и возвращает список событий
-    в нормализованном виде (подходящем для GUI, сценариев инцидентов и статистики).
+    Потоковая сборка record'ов в события.
 
-    Каждое событие — это dict, возвращаемый build_event_summary().
+    auditd пишет record'ы одного события подряд и завершает многострочные
+    события записью EOE, поэтому держать в памяти весь файл не нужно:
+    событие отдаётся сразу по приходу EOE, а события без EOE
+    (USER_AUTH, USER_LOGIN и т.п.) — когда выходят за окно переупорядочивания:
+        - reorder_records — сколько record'ов прочитано с момента появления события;
+        - reorder_seconds — насколько его timestamp отстал от самого свежего.
+
+    Объём памяти определяется окном, а не размером файла.
     """
-    # ключ: (node, event_id, ts_bucket)
-    #   node      — поле node=... (если есть)
-    #   event_id  — идентификатор события из audit(...)
-    #   ts_bucket — секунда таймстампа (для снижения риска коллизий)
-    events_by_id: Dict[Tuple[Optional[str], int, int], Dict[str, Any]] = {}
 
-    total_lines = 0
-    matched_lines = 0
-    skipped_no_match = 0
-    skipped_no_event_id = 0
-    type_counter: Counter[str] = Counter()
+    def __init__(
+            self,
+            reorder_records: int = DEFAULT_REORDER_RECORDS,
+            reorder_seconds: float = DEFAULT_REORDER_SECONDS,
+            identities: Optional[IdentityResolver] = None,
+    ):
+        self.reorder_records = reorder_records
+        self.reorder_seconds = reorder_seconds
+        self.identities = identities
+
+        # порядок вставки = порядок появления событий, голова — самое старое
+        self._pending: "OrderedDict[Tuple[Optional[str], int, int], Dict[str, Any]]" = OrderedDict()
+        self._seq = 0
+        self._max_ts: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def feed(self, rec: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Добавляет record и возвращает список событий, готовых к выдаче."""
+        ready: List[Dict[str, Any]] = []
+
+        if rec["event_id"] is None:
+            return ready
+
+        self._seq += 1
+        ts = rec["timestamp"]
+        if ts is not None and (self._max_ts is None or ts > self._max_ts):
+            self._max_ts = ts
+
+        key = _event_key(rec)
+        bucket = self._pending.get(key)
+
+        if rec["type"] == "EOE":
+            if bucket is not None:
+                bucket["records"].append(rec)
+                del self._pending[key]
+                self._emit(bucket, ready)
+            else:
+                self._lone_eoe(key, rec)
+        else:
+            if bucket is None:
+                bucket = {"records": [], "timestamp": ts, "seq": self._seq}
+                self._pending[key] = bucket
+            bucket["records"].append(rec)
+            # timestamp события — минимальный ненулевой ts среди record'ов
+            if ts is not None:
+                if bucket["timestamp"] is None or ts < bucket["timestamp"]:
+                    bucket["timestamp"] = ts
 
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            total_lines += 1
+        self._expire(ready)
+        return ready
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Отдаёт все незавершённые события (конец файла)."""
+        ready: List[Dict[str, Any]] = []
+        while self._pending:
+            _, bucket = self._pending.popitem(last=False)
+            self._emit(bucket, ready)
+        return ready
+
+    def flush_older_than(self, ts: float) -> List[Dict[str, Any]]:
+        """
+        Отдаёт незавершённые события с timestamp старше ts.
+        Нужно в режиме слежения, когда новые record'ы приходят редко
+        и окно переупорядочивания само не сдвигается.
+        """
+        ready: List[Dict[str, Any]] = []
+        for key in [k for k, b in self._pending.items()
+                    if b["timestamp"] is not None and b["timestamp"] < ts]:
+            self._emit(self._pending.pop(key), ready)
+        return ready
+
+    def _expire(self, ready: List[Dict[str, Any]]):
+        """Выталкивает события, вышедшие за окно переупорядочивания."""
+        while self._pending:
+            bucket = next(iter(self._pending.values()))
+            too_old_by_records = self._seq - bucket["seq"] >= self.reorder_records
+            too_old_by_time = (
+                    self._max_ts is not None
+                    and bucket["timestamp"] is not None
+                    and self._max_ts - bucket["timestamp"] > self.reorder_seconds
+            )
+            if not (too_old_by_records or too_old_by_time):
+                break
+            self._pending.popitem(last=False)
+            self._emit(bucket, ready)
+
+    def _emit(self, bucket: Dict[str, Any], ready: List[Dict[str, Any]]):
+        ev = build_event_summary(bucket["records"], self.identities)
+        if ev:
+            ready.append(ev)
+
+    def _lone_eoe(self, key: Tuple[Optional[str], int, int], rec: Dict[str, Any]):
+        """EOE без открытого события (оно уже отдано по окну) информации не несёт."""
+
+
+def iter_audit_records(lines: Iterable[Union[str, bytes]]) -> Iterator[Dict[str, Any]]:
+    """Разбирает поток строк (str или bytes) в record'ы, пропуская нераспознанные."""
+    for line in lines:
+        if isinstance(line, bytes):
+            rec = parse_audit_line_bytes(line)
+        else:
             rec = parse_audit_line(line)
-            if not rec:
-                skipped_no_match += 1
-                continue
+        if rec:
+            yield rec
 
-            matched_lines += 1
-            type_counter[rec["type"]] += 1
 
-            eid = rec["event_id"]
-            ts = rec["timestamp"]
-            if eid is None:
-                skipped_no_event_id += 1
-                continue
+def _iter_events_from_records(
+        records: Iterable[Dict[str, Any]],
+        reorder_records: int,
+        reorder_seconds: float,
+        identities: Optional[IdentityResolver] = None,
+) -> Iterator[Dict[str, Any]]:
+    assembler = AuditEventAssembler(reorder_records, reorder_seconds, identities)
 
-            fields = rec.get("fields", {})
-            node = fields.get("node")  # для многомашинной агрегации
+    for rec in records:
+        yield from assembler.feed(rec)
 
-            ts_bucket = int(ts) if ts is not None else 0
-            key = (node, eid, ts_bucket)
+    yield from assembler.flush()
 
-            bucket = events_by_id.get(key)
-            if bucket is None:
-                bucket = {"records": [], "timestamp": ts}
-                events_by_id[key] = bucket
 
-            bucket["records"].append(rec)
-            # timestamp события — минимальный ненулевой ts среди record'ов
-            if ts is not None:
-                if bucket["timestamp"] is None or ts < bucket["timestamp"]:
-                    bucket["timestamp"] = ts
+def _iter_lines_with_progress(f, progress: Callable[[int], None]) -> Iterator[bytes]:
+    """Строки сжатого файла f (GzipFile) с отчётом о прочитанных байтах сжатого файла."""
+    for i, line in enumerate(f, 1):
+        if not i % _PROGRESS_STEP_LINES:
+            progress(f.fileobj.tell())
+        yield line
+
+
+def _is_gzip(path: str) -> bool:
+    """Архивы ротации (audit.log.N.gz) распознаём по сигнатуре, а не только по имени."""
+    with open(path, "rb") as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def iter_audit_events(
+        source: Union[str, "os.PathLike[str]", IO],
+        reorder_records: int = DEFAULT_REORDER_RECORDS,
+        reorder_seconds: float = DEFAULT_REORDER_SECONDS,
+        file_id: Optional[int] = None,
+        identities: Optional[IdentityResolver] = None,
+        progress: Optional[Callable[[int], None]] = None,
+        end: Optional[int] = None,
+) -> Iterator[AuditEvent]:
+    """
+    Генератор событий журнала auditd.
+
+    source — путь к файлу (в т.ч. сжатому gzip) или уже открытый поток
+    (текстовый или бинарный).
+    file_id — id файла source в rawtext.raw_log_files: события несжатого файла
+    тогда ссылаются на свои строки (raw_spans), а не хранят их текст.
+    identities — резолвер uid → имя (например, по снимку passwd другого хоста).
+    progress(done) — ход чтения файла source в байтах (для gzip — сжатых);
+    исключение из progress прерывает разбор.
+    end — читать несжатый файл только до этого смещения (начала строки).
+    События (результат build_event_summary()) отдаются по мере готовности:
+    по записи EOE или при выходе за окно переупорядочивания
+    (см. AuditEventAssembler), поэтому порядок выдачи — примерно по времени
+    завершения события, а не отсортированный.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if _is_gzip(path):
+            with gzip.open(path, "rb") as f:
+                lines = f if progress is None else _iter_lines_with_progress(f, progress)
+                yield from _iter_events_from_records(
+                    iter_audit_records(lines), reorder_records, reorder_seconds, identities,
+                )
+            return
+        records = iter_audit_records_mmap(path, end=end, file_id=file_id, progress=progress)
+    else:
+        records = iter_audit_records(source)
+    yield from _iter_events_from_records(records, reorder_records, reorder_seconds, identities)
+
+
+class _ChunkAssembler(AuditEventAssembler):
+    """
+    Сборщик для одного куска файла при параллельном разборе.
+
+    События, начавшиеся в первых reorder_records record'ах куска, могли начаться
+    ещё в предыдущем куске, поэтому они не собираются, а откладываются в head.
+    Незавершённые к концу куска события остаются в pending (tail).
+    Склейку head/tail соседних кусков делает _stitch_chunks().
+    """
+
+    def __init__(self, reorder_records: int, reorder_seconds: float, identities: Optional[IdentityResolver] = None):
+        super().__init__(reorder_records, reorder_seconds, identities)
+        self.events: List[Dict[str, Any]] = []
+        self.head: List[Tuple[Tuple[Optional[str], int, int], Dict[str, Any]]] = []
+
+    def _emit(self, bucket: Dict[str, Any], ready: List[Dict[str, Any]]):
+        if bucket["seq"] <= self.reorder_records:
+            key = _event_key(bucket["records"][0])
+            self.head.append((key, bucket))
+            return
+        super()._emit(bucket, ready)
+
+    def _lone_eoe(self, key: Tuple[Optional[str], int, int], rec: Dict[str, Any]):
+        # EOE в начале куска может закрывать событие из предыдущего куска
+        if self._seq <= self.reorder_records:
+            self.head.append((key, {"records": [rec], "timestamp": rec["timestamp"], "seq": self._seq}))
+
+    def tail(self) -> List[Tuple[Tuple[Optional[str], int, int], Dict[str, Any]]]:
+        return list(self._pending.items())
+
+    @property
+    def records(self) -> int:
+        """Сколько record'ов куска прошло через сборщик (для сквозной нумерации при склейке)."""
+        return self._seq
+
+    @property
+    def max_ts(self) -> Optional[float]:
+        return self._max_ts
+
+
+def _split_byte_ranges(path: str, n_chunks: int, size: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Делит первые size байт файла (по умолчанию — весь) на n_chunks диапазонов, выровненных по границам строк."""
+    if size is None:
+        size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    n_chunks = max(1, min(n_chunks, size))
+    step = size // n_chunks
+    bounds = [0]
+
+    with open(path, "rb") as f:
+        for i in range(1, n_chunks):
+            pos = max(i * step, bounds[-1])
+            if pos >= size:
+                break
+            f.seek(pos)
+            f.readline()  # дочитываем до конца текущей строки
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _parse_chunk(
+        path: str,
+        start: int,
+        end: int,
+        reorder_records: int,
+        reorder_seconds: float,
+        file_id: Optional[int] = None,
+        identities: Optional[IdentityResolver] = None,
+):
+    """Разбирает диапазон байт [start, end) в отдельном процессе."""
+    assembler = _ChunkAssembler(reorder_records, reorder_seconds, identities)
+
+    for rec in iter_audit_records_mmap(path, start, end, file_id):
+        assembler.events.extend(assembler.feed(rec))
+
+    return assembler.events, assembler.head, assembler.tail(), assembler.records, assembler.max_ts
+
+
+def _join_buckets(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    """Record'ы одного события из двух кусков (first — более ранний)."""
+    timestamps = [b["timestamp"] for b in (first, second) if b.get("timestamp") is not None]
+    return {
+        "records": first["records"] + second["records"],
+        "timestamp": min(timestamps) if timestamps else None,
+        "seq": first["seq"],
+    }
+
 
-    # Преобразуем во flat-список событий
+def _stitch_chunks(
+        chunk_results,
+        identities: Optional[IdentityResolver] = None,
+        reorder_records: int = DEFAULT_REORDER_RECORDS,
+        reorder_seconds: float = DEFAULT_REORDER_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    Склеивает результаты кусков: события, разрезанные границами кусков,
+    собираются из tail предыдущих и head следующего куска. Незавершённое
+    событие ждёт продолжения и через несколько кусков (они бывают короче
+    события), пока не выйдет за окно переупорядочивания — как в AuditEventAssembler
+    при последовательном разборе.
+    """
     events: List[Dict[str, Any]] = []
-    for key, bucket in events_by_id.items():
-        event_records = bucket["records"]
-        ev = build_event_summary(event_records)
+    # незавершённые события прошлых кусков; seq — сквозной номер record'а в файле
+    carry: "OrderedDict[Tuple[Optional[str], int, int], Dict[str, Any]]" = OrderedDict()
+    offset = 0
+    max_ts: Optional[float] = None
+
+    def emit(bucket):
+        ev = build_event_summary(bucket["records"], identities)
         if ev:
             events.append(ev)
 
-    # сортируем события по времени (от новых к старым)
-    events.sort(key=lambda e: e.get("timestamp") or 0.0, reverse=True)
+    for chunk_events, head, tail, n_records, chunk_max_ts in chunk_results:
+        events.extend(chunk_events)
+
+        for key, bucket in head:
+            prev = carry.pop(key, None)
+            if prev is not None:
+                bucket = _join_buckets(prev, bucket)
+            elif bucket["records"][0]["type"] == "EOE":
+                # одинокий EOE, событие которого не попало в tail
+                continue
+            emit(bucket)
+
+        tail = OrderedDict((key, dict(bucket, seq=bucket["seq"] + offset)) for key, bucket in tail)
+        offset += n_records
+        if chunk_max_ts is not None and (max_ts is None or chunk_max_ts > max_ts):
+            max_ts = chunk_max_ts
+
+        pending: "OrderedDict[Tuple[Optional[str], int, int], Dict[str, Any]]" = OrderedDict()
+        for key, bucket in carry.items():
+            continued = tail.pop(key, None)
+            if continued is not None:
+                # событие длиннее куска: началось раньше и не закончилось в этом куске
+                pending[key] = _join_buckets(bucket, continued)
+            elif offset - bucket["seq"] >= reorder_records or (
+                    max_ts is not None and bucket["timestamp"] is not None
+                    and max_ts - bucket["timestamp"] > reorder_seconds):
+                # вышло за окно переупорядочивания — продолжения уже не будет
+                emit(bucket)
+            else:
+                pending[key] = bucket
+        pending.update(tail)
+        carry = pending
 
-    # при необходимости можно раскомментировать отладочную статистику:
-    # print(f"[parser] file: {path}")
-    # print(f"[parser] total lines          : {total_lines}")
-    # print(f"[parser] matched audit lines  : {matched_lines}")
-    # print(f"[parser] skipped (no match)   : {skipped_no_match}")
-    # print(f"[parser] skipped (no event_id): {skipped_no_event_id}")
-    # print(f"[parser] resulting events     : {len(events)}")
-    # print("[parser] top types:")
-    # for t, cnt in type_counter.most_common(10):
-    #     print(f"  {t:20s} {cnt}")
+    for bucket in carry.values():
+        ev = build_event_summary(bucket["records"], identities)
+        if ev:
+            events.append(ev)
 
     return events
 
 
+def _parse_audit_log_file_parallel(
+        path: str,
+        workers: int,
+        file_id: Optional[int],
+        identities: IdentityResolver,
+        progress: Optional[Callable[[int, int], None]] = None,
+        end: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    ranges = _split_byte_ranges(path, workers * PARALLEL_CHUNKS_PER_WORKER, end)
+
+    # spawn, а не fork: вызов идёт из GUI-процесса с потоками Qt
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [
+            pool.submit(
+                _parse_chunk, path, start, end,
+                DEFAULT_REORDER_RECORDS, DEFAULT_REORDER_SECONDS, file_id, identities,
+            )
+            for start, end in ranges
+        ]
+        try:
+            if progress is not None:
+                # ход — по завершённым кускам
+                sizes = {fut: end - start for fut, (start, end) in zip(futures, ranges)}
+                done_bytes = done_events = 0
+                for fut in as_completed(futures):
+                    done_bytes += sizes[fut]
+                    done_events += len(fut.result()[0])
+                    progress(done_bytes, done_events)
+            chunk_results = [fut.result() for fut in futures]
+        except BaseException:
+            # прерывание (в т.ч. из progress): ещё не начатые куски не разбираем
+            for fut in futures:
+                fut.cancel()
+            raise
+
+    return _stitch_chunks(chunk_results, identities, DEFAULT_REORDER_RECORDS, DEFAULT_REORDER_SECONDS)
+
+
+def parse_audit_log_tail(
+        path: str,
+        nbytes: int = PREVIEW_TAIL_BYTES,
+        file_id: Optional[int] = None,
+        identities: Optional[IdentityResolver] = None,
+) -> List[AuditEvent]:
+    """
+    Самые новые события несжатого файла: разбираются только последние nbytes
+    (с начала строки), чтобы показать их до окончания полного разбора.
+
+    События из первых PREVIEW_HEAD_RECORDS record'ов диапазона отбрасываются —
+    их начало могло остаться до границы, — поэтому результат предварительный:
+    полный разбор даёт те же события и более старые. От новых к старым.
+    """
+    size = os.path.getsize(path)
+    if size <= nbytes:
+        events = list(iter_audit_events(path, file_id=file_id, identities=identities))
+    else:
+        with open(path, "rb") as f:
+            f.seek(size - nbytes)
+            f.readline()  # дочитываем до конца текущей строки
+            start = f.tell()
+
+        assembler = _ChunkAssembler(PREVIEW_HEAD_RECORDS, DEFAULT_REORDER_SECONDS, identities)
+        for rec in iter_audit_records_mmap(path, start, size, file_id):
+            assembler.events.extend(assembler.feed(rec))
+        assembler.events.extend(assembler.flush())
+        events = assembler.events
+
+    events.sort(key=event_sort_key, reverse=True)
+    return events
+
+
+def event_sort_key(ev: Dict[str, Any]):
+    """Ключ сортировки событий по времени (event_id — для одинаковых timestamp)."""
+    return (ev.get("timestamp") or 0.0, ev.get("event_id") or 0)
+
+
+def _raw_file_id(path: str) -> Optional[int]:
+    """file_id для ссылок на сырой текст; у gzip-архивов смещений нет — текст хранится в событиях."""
+    if _is_gzip(path):
+        return None
+    return register_raw_file(path)
+
+
+def parse_audit_log_file(
+        path: str,
+        workers: int = 1,
+        file_id: Optional[int] = None,
+        identities: Optional[IdentityResolver] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        end: Optional[int] = None,
+) -> List[AuditEvent]:
+    """
+    Разбирает файл журнала auditd и возвращает список событий
+    в нормализованном виде (подходящем для GUI, сценариев инцидентов и статистики).
+
+    Каждое событие — AuditEvent, возвращаемый build_event_summary().
+    Тонкая обёртка над iter_audit_events(), собирающая события в список.
+
+    workers > 1 — параллельный разбор: файл делится на диапазоны байт
+    по границам строк, куски разбираются в ProcessPoolExecutor, события
+    на стыках кусков склеиваются. Результат совпадает с последовательным
+    разбором. Для небольших файлов всегда используется последовательный путь.
+
+    Сырой текст событий не хранится, а читается из файла по запросу (raw_spans);
+    file_id передаётся, если файл уже зарегистрирован в rawtext вызывающим процессом.
+
+    identities — резолвер uid → имя; по умолчанию на разбор создаётся новый
+    (системные базы, каждый uid запрашивается один раз).
+
+    progress(done_bytes, events) — ход разбора: байт файла и событий собрано;
+    исключение из progress прерывает разбор (так загрузку отменяет GUI).
+
+    end — разобрать несжатый файл только до этого смещения (см.
+    parse_audit_log_file_checkpoint()); строки после него не читаются.
+    """
+    if file_id is None:
+        file_id = _raw_file_id(path)
+    if identities is None:
+        identities = IdentityResolver()
+
+    gzipped = _is_gzip(path)
+    size = os.path.getsize(path)
+    if end is not None and not gzipped:
+        size = min(size, end)
+    else:
+        end = None
+    if workers > 1 and size >= PARALLEL_MIN_FILE_SIZE and not gzipped:
+        events = _parse_audit_log_file_parallel(path, workers, file_id, identities, progress, size)
+    elif progress is None:
+        events = list(iter_audit_events(path, file_id=file_id, identities=identities, end=end))
+    else:
+        events = []
+        events.extend(iter_audit_events(
+            path, file_id=file_id, identities=identities,
+            progress=lambda done: progress(done, len(events)), end=end,
+        ))
+        progress(size, len(events))
+
+    # сортируем события по времени (от новых к старым),
+    # event_id — чтобы порядок не зависел от порядка сборки
+    events.sort(key=event_sort_key, reverse=True)
+
+    return events
+
+
+class LogCheckpoint(NamedTuple):
+    """
+    Докуда разобран журнал (для слежения, follow.AuditLogFollower): inode файла
+    и смещение сразу после последней разобранной строки.
+    """
+    path: str
+    inode: int
+    offset: int
+
+
+def _complete_lines_end(f: IO[bytes], size: int) -> int:
+    """Смещение после последнего \n в первых size байтах файла (недописанная строка не входит)."""
+    if size == 0:
+        return 0
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.rfind(b"\n", 0, min(size, len(mm))) + 1
+
+
+def parse_audit_log_file_checkpoint(
+        path: str,
+        workers: int = 1,
+        file_id: Optional[int] = None,
+        identities: Optional[IdentityResolver] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[List[AuditEvent], LogCheckpoint]:
+    """
+    parse_audit_log_file() и контрольная точка для слежения за файлом.
+
+    Граница разбора берётся один раз, до разбора, по fstat того же дескриптора:
+    конец последней полной строки. Разбор дальше неё не читает, и checkpoint
+    указывает ровно туда — строки, дописанные auditd во время разбора
+    (и недописанная последняя), достаются слежению, а не приходят дважды.
+    У сжатого файла роста нет: checkpoint — его конец.
+    """
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if f.read(2) == GZIP_MAGIC:
+            end = st.st_size
+        else:
+            end = _complete_lines_end(f, st.st_size)
+    events = parse_audit_log_file(
+        path, workers=workers, file_id=file_id, identities=identities, progress=progress, end=end,
+    )
+    return events, LogCheckpoint(path, st.st_ino, end)
+
+
+def find_audit_log_files(directory: str) -> List[str]:
+    """
+    Возвращает файлы набора ротации в каталоге: audit.log, audit.log.1 … audit.log.N,
+    в т.ч. сжатые (audit.log.N.gz, audit.log-20240101.gz от logrotate).
+    """
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.startswith(AUDIT_LOG_BASENAME) and os.path.isfile(path):
+            paths.append(path)
+    return paths
+
+
+def _dedup_key(ev: Dict[str, Any]):
+    return (ev.get("node"), ev.get("event_id"), ev.get("timestamp"))
+
+
+def merge_sorted_events(event_lists: Iterable[List[AuditEvent]]) -> List[AuditEvent]:
+    """
+    Сливает списки событий, каждый из которых уже отсортирован от новых к старым,
+    без пересортировки всего набора (heapq.merge). Совпадающие события
+    из перекрывающихся архивов отбрасываются по ключу (node, event_id, timestamp).
+    """
+    result: List[AuditEvent] = []
+
+    # дубли имеют одинаковый ключ сортировки, поэтому идут в одной группе
+    # с равным (timestamp, event_id) — достаточно помнить только её
+    group_sort_key = None
+    group_seen: Dict[Any, int] = {}
+
+    for ev in heapq.merge(*event_lists, key=event_sort_key, reverse=True):
+        sort_key = event_sort_key(ev)
+        if sort_key != group_sort_key:
+            group_sort_key = sort_key
+            group_seen = {}
+
+        key = _dedup_key(ev)
+        idx = group_seen.get(key)
+        if idx is None:
+            group_seen[key] = len(result)
+            result.append(ev)
+        elif ev.raw_size() > result[idx].raw_size():
+            # событие, разрезанное ротацией, в другом файле может быть полнее
+            result[idx] = ev
+
+    return result
+
+
+def parse_audit_log_files(
+        paths: List[str],
+        workers: int = 1,
+        identities: Optional[IdentityResolver] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+) -> List[AuditEvent]:
+    """
+    Разбирает набор файлов журнала (например, audit.log + audit.log.1..N + .gz)
+    и возвращает единый список событий от новых к старым.
+
+    Файлы разбираются параллельно (по файлу на процесс), затем
+    отсортированные списки сливаются по времени с удалением дублей.
+    progress — как у parse_audit_log_file(), байты считаются по всем файлам.
+    """
+    if len(paths) == 1:
+        return parse_audit_log_file(paths[0], workers=workers, identities=identities, progress=progress)
+
+    if identities is None:
+        identities = IdentityResolver()
+
+    # файлы регистрируются здесь: file_id должны ссылаться на реестр этого процесса
+    file_ids = [_raw_file_id(path) for path in paths]
+
+    if workers > 1:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=ctx) as pool:
+            futures = [
+                pool.submit(parse_audit_log_file, path, 1, file_id, identities)
+                for path, file_id in zip(paths, file_ids)
+            ]
+            try:
+                if progress is not None:
+                    # ход — по разобранным файлам
+                    sizes = {fut: os.path.getsize(path) for fut, path in zip(futures, paths)}
+                    done_bytes = done_events = 0
+                    for fut in as_completed(futures):
+                        done_bytes += sizes[fut]
+                        done_events += len(fut.result())
+                        progress(done_bytes, done_events)
+                event_lists = [fut.result() for fut in futures]
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+    else:
+        event_lists = []
+        done_bytes = done_events = 0
+        for path, file_id in zip(paths, file_ids):
+            file_progress = None
+            if progress is not None:
+                file_progress = (lambda b, n, base=(done_bytes, done_events): progress(base[0] + b, base[1] + n))
+            event_lists.append(parse_audit_log_file(
+                path, file_id=file_id, identities=identities, progress=file_progress,
+            ))
+            done_bytes += os.path.getsize(path)
+            done_events += len(event_lists[-1])
+
+    return merge_sorted_events(event_lists)
+
+
 __all__ = [
+    "tokenize_fields",
     "parse_audit_line",
+    "parse_audit_line_bytes",
+    "iter_audit_records",
+    "iter_audit_records_mmap",
+    "line_timestamp_bytes",
+    "find_time_offset",
     "format_timestamp",
     "resolve_user",
     "build_event_summary",
+    "AuditEventAssembler",
+    "iter_audit_events",
     "parse_audit_log_file",
+    "parse_audit_log_files",
+    "parse_audit_log_tail",
+    "find_audit_log_files",
+    "merge_sorted_events",
+    "event_sort_key",
 ]
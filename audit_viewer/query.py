@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .index import (
+    COST_INDEX, COST_SCALAR, COST_TEXT, AllOf, AnyOf, EventIndex, Not, RowCondition, SuccessIn, TimeRange,
+)
+from .store import MISSING_INT, SUCCESS_UNKNOWN, EventStore
+from .textindex import TextContains, TextRegex
+
+# Язык запросов строки 'Запрос' вкладки 'События аудита':
+#
+#     type=SYSCALL and (exe~/bash$/ or key=web_shell) and pid=1234 and details.name^=/etc/
+#
+# Условие — поле, оператор, значение:
+#     =, !=        равно / не равно;
+#     ~, !~        подходит / не подходит под регулярное выражение (/.../ или в кавычках);
+#     ^=, $=, *=   начинается с / заканчивается на / содержит;
+#     <, <=, >, >= сравнение чисел (pid, exit, ...) и времени (time>="2024-01-01 10:00").
+# Поля — колонки события (type, user, comm, exe, key, pid, ...), details.<ключ> —
+# любое поле record'ов события, text — текст поиска (команда, файл, сырой лог;
+# без учёта регистра). Слово без оператора ищется как подстрока текста.
+# Значение с пробелом, скобкой или начинающееся с оператора — в кавычках: user="a b", key="=x".
+# Условия соединяются and (можно опустить), or, not и скобками.
+
+# Псевдонимы полей запроса -> имена полей события
+FIELD_ALIASES = {
+    "type": "event_type",
+    "id": "event_id",
+    "raw": "text",
+}
+
+COMPARE_OPS = ("<", "<=", ">", ">=")
+
+# Операторы в порядке разбора: двухсимвольные раньше односимвольных
+_OPERATORS = ("!=", "!~", "^=", "$=", "*=", "<=", ">=", "=", "~", "<", ">")
+_KEYWORDS = ("and", "or", "not")
+_FIELD_RE = re.compile(r"[A-Za-z_][\w.\-]*")
+# Конец слова без кавычек: пробел или скобка
+_WORD_END = frozenset(" \t\r\n()")
+
+_SUCCESS_VALUES = {
+    "yes": 1, "true": 1, "1": 1, "success": 1,
+    "no": 0, "false": 0, "0": 0, "failed": 0,
+    "unknown": SUCCESS_UNKNOWN, "none": SUCCESS_UNKNOWN,
+}
+
+
+class QueryError(ValueError):
+    """Ошибка в тексте запроса; pos — позиция (с 0)."""
+
+    def __init__(self, message: str, pos: int):
+        super().__init__(f"{message} (позиция {pos + 1})")
+        self.pos = pos
+
+
+# --- условия по полям ---
+
+def _value_predicate(op: str, value: str, pattern: Optional["re.Pattern"] = None) -> Callable[[str], bool]:
+    """Проверка одного строкового значения поля (для словаря колонки и для details)."""
+    if op == "=":
+        return lambda v: v == value
+    if op == "^=":
+        return lambda v: v.startswith(value)
+    if op == "$=":
+        return lambda v: v.endswith(value)
+    if op == "*=":
+        return lambda v: value in v
+    if op == "~":
+        search = pattern.search
+        return lambda v: search(v) is not None
+    # сравнение: значения, которые не числа, не проходят
+    number = float(value)
+    compare = {"<": number.__gt__, "<=": number.__ge__, ">": number.__lt__, ">=": number.__le__}[op]
+
+    def predicate(v):
+        try:
+            return compare(float(v))
+        except ValueError:
+            return False
+    return predicate
+
+
+class ValueMatch(RowCondition):
+    """
+    Строковая колонка name (см. EventStore.STRING_COLUMNS), значение которой
+    проходит predicate: predicate проверяется по словарю значений, а не по событиям.
+    Для колонок с индексом (EventIndex.CODE_COLUMNS) кандидаты — из индекса.
+    """
+
+    def __init__(self, name: str, predicate: Callable[[str], bool]):
+        self.name = name
+        self.predicate = predicate
+        indexed = name in EventIndex.CODE_COLUMNS
+        self.exact_index = indexed
+        self.cost = COST_INDEX if indexed else COST_SCALAR
+        # (словарь, его размер, коды): словарь растёт в режиме слежения
+        self._codes = None
+
+    def codes(self, store) -> np.ndarray:
+        pool = store.pools[self.name]
+        cached = self._codes
+        if cached is None or cached[0] is not pool or cached[1] != len(pool):
+            cached = self._codes = (pool, len(pool), pool.codes_where(self.predicate))
+        return cached[2]
+
+    def estimate(self, store, index: EventIndex) -> int:
+        if not self.exact_index:
+            return index.size + 1
+        return index.postings(self.name).count(self.codes(store).tolist())
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        if not self.exact_index:
+            return np.arange(index.size, dtype=np.int64)
+        return index.postings(self.name).rows_for(self.codes(store).tolist())
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        codes = self.codes(store)
+        if not len(codes):
+            return np.zeros(len(rows), dtype=bool)
+        return np.isin(store.codes(self.name)[rows], codes)
+
+
+class IntMatch(RowCondition):
+    """
+    Целочисленная колонка name (pid, exit, ...): сравнение с числом — векторно,
+    остальные операторы — predicate по различным значениям среди проверяемых строк.
+    """
+
+    exact_index = False
+    cost = COST_SCALAR
+
+    def __init__(self, name: str, op: str, number: Optional[int], predicate: Callable[[str], bool]):
+        self.name = name
+        self.op = op
+        self.number = number
+        self.predicate = predicate
+
+    def estimate(self, store, index: EventIndex) -> int:
+        return index.size + 1
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        return np.arange(index.size, dtype=np.int64)
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        values = store.ints(self.name)[rows]
+        present = values != MISSING_INT
+        number = self.number
+        if number is not None and self.op in ("=", "<", "<=", ">", ">="):
+            compare = {
+                "=": np.equal, "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+            }[self.op]
+            return present & compare(values, number)
+        uniques, inverse = np.unique(values, return_inverse=True)
+        ok = np.array([u != MISSING_INT and self.predicate(str(u)) for u in uniques.tolist()], dtype=bool)
+        return ok[inverse] if len(ok) else np.zeros(len(rows), dtype=bool)
+
+
+class DetailsMatch(RowCondition):
+    """Поле key в details события (любое из значений, если их несколько) проходит predicate."""
+
+    exact_index = False
+    cost = COST_TEXT
+
+    def __init__(self, key: str, predicate: Callable[[str], bool]):
+        self.key = key
+        self.predicate = predicate
+
+    def estimate(self, store, index: EventIndex) -> int:
+        return index.size + 1
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        return np.arange(index.size, dtype=np.int64)
+
+    def _matches(self, details) -> bool:
+        value = details.get(self.key) if details is not None else None
+        if value is None:
+            return False
+        if isinstance(value, list):
+            return any(v is not None and self.predicate(str(v)) for v in value)
+        return self.predicate(str(value))
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        details = store.objects("details")
+        matches = self._matches
+        return np.fromiter((matches(details[r]) for r in rows.tolist()), dtype=bool, count=len(rows))
+
+
+# --- разбор ---
+
+def _parse_time(value: str, pos: int) -> float:
+    """Время в запросе: секунды Unix или дата/время в ISO-формате (местное время)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise QueryError(f"не удалось разобрать время: {value}", pos) from None
+
+
+def _int_value(value: str) -> Optional[int]:
+    """
+    Целое в запросе: десятичное (ведущие нули допустимы: pid>010 — это 10)
+    или с префиксом 0x / 0o / 0b.
+    """
+    digits = value.lstrip("+-")
+    base = 0 if digits[:2].lower() in ("0x", "0o", "0b") else 10
+    try:
+        return int(value, base)
+    except ValueError:
+        return None
+
+
+class _Parser:
+    """Разбор запроса рекурсивным спуском сразу в условия (index.RowCondition)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        # глубина вложенности скобок в текущей позиции
+        self.depth = 0
+
+    # --- лексика ---
+
+    def _skip_spaces(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def _at_end(self) -> bool:
+        self._skip_spaces()
+        return self.pos >= len(self.text)
+
+    def _peek(self) -> str:
+        self._skip_spaces()
+        return self.text[self.pos] if self.pos < len(self.text) else ""
+
+    def _peek_keyword(self) -> Optional[str]:
+        self._skip_spaces()
+        for word in _KEYWORDS:
+            end = self.pos + len(word)
+            if (self.text[self.pos:end].lower() == word
+                    and (end >= len(self.text) or self.text[end] in _WORD_END)):
+                return word
+        return None
+
+    def _take_keyword(self, word: str) -> bool:
+        if self._peek_keyword() == word:
+            self.pos += len(word)
+            return True
+        return False
+
+    def _read_delimited(self, quote: str) -> str:
+        """Строка до закрывающего quote (\\ экранирует quote и \\); открывающий уже прочитан."""
+        start = self.pos - 1
+        out = []
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            self.pos += 1
+            if ch == "\\" and self.pos < len(self.text) and self.text[self.pos] in (quote, "\\"):
+                # в регулярном выражении \\ остаётся экранированием самого выражения
+                if quote == "/" and self.text[self.pos] == "\\":
+                    out.append("\\")
+                out.append(self.text[self.pos])
+                self.pos += 1
+                continue
+            if ch == quote:
+                return "".join(out)
+            out.append(ch)
+        raise QueryError(f"нет закрывающего {quote}", start)
+
+    def _read_value(self, regex: bool = False, operand: bool = False) -> str:
+        """
+        Значение: в кавычках ('...', "...", для regex и /.../) или слово до пробела
+        или скобки. operand — значение после оператора: слово, начинающееся
+        с оператора (pid=>1), — почти наверняка опечатка, а не значение ">1".
+        """
+        self._skip_spaces()
+        start = self.pos
+        ch = self.text[self.pos] if self.pos < len(self.text) else ""
+        if ch in ("'", '"') or (regex and ch == "/"):
+            self.pos += 1
+            return self._read_delimited(ch)
+        while self.pos < len(self.text) and self.text[self.pos] not in _WORD_END:
+            self.pos += 1
+        if self.pos == start:
+            raise QueryError("ожидалось значение", start)
+        value = self.text[start:self.pos]
+        if operand:
+            for op in _OPERATORS:
+                if value.startswith(op):
+                    raise QueryError(f"значение начинается с оператора {op} (заключите его в кавычки)", start)
+        return value
+
+    # --- грамматика ---
+
+    def parse(self) -> List[RowCondition]:
+        if self._at_end():
+            return []
+        cond = self._or()
+        if not self._at_end():
+            if self._peek() == ")":
+                raise QueryError("лишняя закрывающая скобка", self.pos)
+            raise QueryError(f"лишний символ: {self.text[self.pos]}", self.pos)
+        # верхний уровень — список условий and: ведущее из них выберет select_rows()
+        return list(cond.conds) if isinstance(cond, AllOf) else [cond]
+
+    def _or(self) -> RowCondition:
+        parts = [self._and()]
+        while self._take_keyword("or"):
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else AnyOf(parts)
+
+    def _and(self) -> RowCondition:
+        # and можно не писать: "sshd user=root" == "sshd and user=root"
+        conds = [self._unary()]
+        while True:
+            if self._take_keyword("and"):
+                conds.append(self._unary())
+            elif not self._at_end() and self._peek() != ")" and self._peek_keyword() != "or":
+                conds.append(self._unary())
+            else:
+                break
+        return conds[0] if len(conds) == 1 else AllOf(conds)
+
+    def _unary(self) -> RowCondition:
+        if self._at_end():
+            raise QueryError("запрос оборвался", self.pos)
+        if self._take_keyword("not"):
+            return Not(self._unary())
+        if self._peek() == "(":
+            start = self.pos
+            self.pos += 1
+            self.depth += 1
+            cond = self._or()
+            if self._peek() != ")":
+                raise QueryError("нет закрывающей скобки", start)
+            self.pos += 1
+            self.depth -= 1
+            return cond
+        if self._peek() == ")":
+            # "()" или "(a or )": скобка закрывает группу, в которой не хватает условия
+            if self.depth:
+                raise QueryError("ожидалось условие", self.pos)
+            raise QueryError("лишняя закрывающая скобка", self.pos)
+        if self._peek_keyword() is not None:
+            raise QueryError(f"ожидалось условие перед {self._peek_keyword()}", self.pos)
+        return self._term()
+
+    def _term(self) -> RowCondition:
+        start = self.pos
+        m = _FIELD_RE.match(self.text, self.pos)
+        if m is not None:
+            after = m.end()
+            for op in _OPERATORS:
+                if self.text.startswith(op, after):
+                    self.pos = after + len(op)
+                    value = self._read_value(regex=op in ("~", "!~"), operand=True)
+                    return _field_condition(m.group(0), op, value, start)
+        # слово без оператора — подстрока текста события
+        return TextContains(self._read_value())
+
+
+def _field_condition(field: str, op: str, value: str, pos: int) -> RowCondition:
+    """Условие "поле оператор значение"."""
+    if op in ("!=", "!~"):
+        return Not(_field_condition(field, "=" if op == "!=" else "~", value, pos))
+
+    name = FIELD_ALIASES.get(field.lower(), field.lower())
+
+    if name.startswith("details."):
+        return DetailsMatch(field[len("details."):], _predicate(op, value, pos))
+
+    if name == "text":
+        if op == "~":
+            return TextRegex(_compile_regex(value, pos).pattern)
+        if op in ("=", "*="):
+            return TextContains(value)
+        raise QueryError(f"для text допустимы только *= и ~, а не {op}", pos)
+
+    if name in ("time", "timestamp"):
+        if op not in COMPARE_OPS:
+            raise QueryError(f"время сравнивается только операторами {', '.join(COMPARE_OPS)}", pos)
+        ts = _parse_time(value, pos)
+        if op == "<":
+            return TimeRange(None, float(np.nextafter(ts, -np.inf)))
+        if op == "<=":
+            return TimeRange(None, ts)
+        if op == ">":
+            return TimeRange(float(np.nextafter(ts, np.inf)), None)
+        return TimeRange(ts, None)
+
+    if name == "success":
+        code = _SUCCESS_VALUES.get(value.lower())
+        if op != "=" or code is None:
+            raise QueryError("статус задаётся как success=yes|no|unknown", pos)
+        return SuccessIn([code])
+
+    if name == "syscall" and _int_value(value) is None and op in ("=", "^=", "$=", "*=", "~"):
+        # syscall=openat — по имени системного вызова
+        name = "syscall_name"
+
+    if name in EventStore.STRING_COLUMNS:
+        return ValueMatch(name, _predicate(op, value, pos))
+    if name in EventStore.INT_COLUMNS:
+        number = _int_value(value)
+        if op in COMPARE_OPS and number is None:
+            raise QueryError(f"{field} сравнивается с числом, а не с {value}", pos)
+        return IntMatch(name, op, number, _predicate(op, value, pos))
+    raise QueryError(f"неизвестное поле: {field}", pos)
+
+
+def _compile_regex(value: str, pos: int) -> "re.Pattern":
+    try:
+        return re.compile(value)
+    except re.error as e:
+        raise QueryError(f"ошибка в регулярном выражении ({e})", pos) from None
+
+
+def _predicate(op: str, value: str, pos: int) -> Callable[[str], bool]:
+    if op in COMPARE_OPS:
+        try:
+            float(value)
+        except ValueError:
+            raise QueryError(f"оператор {op} сравнивает с числом, а не с {value}", pos) from None
+    pattern = _compile_regex(value, pos) if op == "~" else None
+    return _value_predicate(op, value, pattern)
+
+
+def parse_query(text: str) -> List[RowCondition]:
+    """
+    Разбирает запрос в список условий, которые должны выполняться все
+    (верхний уровень — and). Порядок их проверки выбирает index.select_rows():
+    сначала индексы, затем векторные проверки колонок, текст и регулярные
+    выражения — последними. При ошибке бросает QueryError.
+    """
+    return _Parser(text).parse()
+
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Сколько последних просмотренных событий держать с уже прочитанным текстом
+RAW_CACHE_SIZE = 128
+
+# Сколько первых байт файла запоминать при регистрации, чтобы заметить,
+# что файл усечён и записан заново (copytruncate)
+RAW_HEAD_BYTES = 256
+
+# Участок журнала с одним record'ом: (file_id, смещение, длина в байтах)
+RawSpan = Tuple[int, int, int]
+
+
+class _MappedLogFile:
+    """
+    Файл журнала, открытый на всё время работы с его событиями.
+
+    Дескриптор держим открытым, поэтому переименование при ротации
+    (audit.log → audit.log.1) не мешает дочитывать текст. mmap создаётся
+    при первом обращении и пересоздаётся, если файл с тех пор дописан.
+
+    Ротация через copytruncate усекает тот же inode, и файл затем снова
+    растёт: смещения событий указывают уже на чужие строки. Такой файл
+    помечается устаревшим (stale) и текст по нему больше не читается ("",
+    а не неверный текст): если размер стал меньше, чем был при прошлом
+    обращении, или начало файла не совпадает с запомненным при регистрации.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        st = os.fstat(self._file.fileno())
+        self.inode = st.st_ino
+        self._size = st.st_size
+        self._head = os.pread(self._file.fileno(), RAW_HEAD_BYTES, 0)
+        self._mm: Optional[mmap.mmap] = None
+        self.stale = False
+
+    def mapped(self, end: int) -> Optional[mmap.mmap]:
+        """mmap, покрывающий байты [0, end), или None, если файл с тех пор усечён или переписан."""
+        if self.stale:
+            return None
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self._size:
+            # copytruncate: прежние смещения недействительны, даже когда файл снова дорастёт
+            self._mark_stale()
+            return None
+        self._size = size
+        # обращение к mmap за концом файла — SIGBUS
+        if end > size:
+            return None
+        if self._mm is None or end > len(self._mm):
+            if self._mm is not None:
+                self._mm.close()
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._head) < RAW_HEAD_BYTES and len(self._mm) > len(self._head):
+                # при регистрации файл был короче — запоминаем начало, пока оно наше
+                if self._mm[:len(self._head)] == self._head:
+                    self._head = self._mm[:RAW_HEAD_BYTES]
+        if self._mm[:len(self._head)] != self._head:
+            # усечён и дописан заново между обращениями
+            self._mark_stale()
+            return None
+        return self._mm
+
+    def _mark_stale(self):
+        self.stale = True
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    @property
+    def unlinked(self) -> bool:
+        """Файл удалён с диска (logrotate, num_logs auditd): место занято, пока открыт дескриптор."""
+        return os.fstat(self._file.fileno()).st_nlink == 0
+
+    def read(self, offset: int, length: int) -> bytes:
+        mm = self.mapped(offset + length)
+        if mm is None:
+            return b""
+        return mm[offset:offset + length]
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+class RawLogFiles:
+    """
+    Реестр файлов журнала, на которые ссылаются события.
+
+    Вместо сырого текста событие хранит raw_spans — участки файла
+    (file_id, offset, length) своих record'ов; текст читается через mmap
+    только когда нужен (выбор строки в таблице). Последние прочитанные
+    тексты кэшируются (LRU на cache_size событий).
+    Чтение потокобезопасно (фоновый сборщик отдаёт события из нескольких потоков).
+
+    Файл держится открытым, пока на него ссылаются события: после замены
+    набора событий (загрузка другого файла, перезагрузка) файлы, на которые
+    новый набор не ссылается, закрываются (retain()). Текст по file_id
+    закрытого файла — "".
+    """
+
+    def __init__(self, cache_size: int = RAW_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._files: List[Optional[_MappedLogFile]] = []
+        self._ids: Dict[Tuple[int, int], int] = {}
+        self._cache: "OrderedDict[Tuple[RawSpan, ...], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, path: str) -> int:
+        """Возвращает file_id файла (повторная регистрация того же файла даёт тот же id)."""
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            file_id = self._ids.get(key)
+            if file_id is None:
+                file_id = len(self._files)
+                self._files.append(_MappedLogFile(path))
+                self._ids[key] = file_id
+        return file_id
+
+    def read(self, spans: Tuple[RawSpan, ...], cache: bool = True) -> str:
+        """
+        Текст record'ов события (строки через "\\n").
+        cache=False — для массовых проходов (поиск), чтобы не вытеснять из кэша
+        просмотренные события.
+        """
+        with self._lock:
+            text = self._cache.get(spans)
+            if text is not None:
+                self._cache.move_to_end(spans)
+                return text
+
+            text = "\n".join(
+                self._read_span(file_id, offset, length).decode("utf-8", errors="ignore")
+                for file_id, offset, length in spans
+            )
+
+            if cache:
+                self._cache[spans] = text
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return text
+
+    def read_many(self, spans_list: List[Tuple[RawSpan, ...]]) -> List[str]:
+        """
+        Тексты нескольких событий за одно обращение, без кэша — для массовых
+        проходов (поиск по всем событиям): размер файла проверяется один раз
+        на файл, а не на каждый record.
+        """
+        with self._lock:
+            ends: Dict[int, int] = {}
+            for spans in spans_list:
+                for file_id, offset, length in spans:
+                    if offset + length > ends.get(file_id, 0):
+                        ends[file_id] = offset + length
+            maps = {}
+            for file_id, end in ends.items():
+                f = self._files[file_id]
+                maps[file_id] = f.mapped(end) if f is not None else None
+
+            texts = []
+            for spans in spans_list:
+                parts = []
+                for file_id, offset, length in spans:
+                    mm = maps[file_id]
+                    if mm is not None:
+                        parts.append(mm[offset:offset + length])
+                texts.append(b"\n".join(parts).decode("utf-8", errors="ignore"))
+            return texts
+
+    def _read_span(self, file_id: int, offset: int, length: int) -> bytes:
+        f = self._files[file_id]
+        if f is None:
+            return b""
+        return f.read(offset, length)
+
+    def retain(self, file_ids: Iterable[int]):
+        """Закрывает все файлы, кроме file_ids (на остальные больше не ссылаются события)."""
+        keep = set(file_ids)
+        with self._lock:
+            self._close_where(lambda file_id: file_id not in keep)
+
+    def release(self, file_ids: Iterable[int]):
+        """Закрывает файлы file_ids (их события больше не читают текст из файла)."""
+        drop = set(file_ids)
+        with self._lock:
+            self._close_where(lambda file_id: file_id in drop)
+
+    def unlinked(self) -> Set[int]:
+        """file_id открытых файлов, уже удалённых с диска."""
+        with self._lock:
+            return {file_id for file_id, f in enumerate(self._files) if f is not None and f.unlinked}
+
+    def _close_where(self, predicate):
+        closed = False
+        for file_id, f in enumerate(self._files):
+            if f is not None and predicate(file_id):
+                f.close()
+                self._files[file_id] = None
+                closed = True
+        if closed:
+            # id закрытых файлов не переиспользуются: события со старыми id получат ""
+            self._ids = {key: file_id for key, file_id in self._ids.items() if self._files[file_id] is not None}
+            self._cache.clear()
+
+    def close(self):
+        with self._lock:
+            for f in self._files:
+                if f is not None:
+                    f.close()
+            self._files.clear()
+            self._ids.clear()
+            self._cache.clear()
+
+
+# Общий реестр процесса: file_id в событиях ссылаются на него
+raw_log_files = RawLogFiles()
+
+
+def register_raw_file(path: str) -> int:
+    return raw_log_files.register(path)
+
+
+def retain_raw_files(file_ids: Iterable[int]):
+    raw_log_files.retain(file_ids)
+
+
+def read_raw_spans(spans: Tuple[RawSpan, ...], cache: bool = True) -> str:
+    return raw_log_files.read(spans, cache=cache)
+
+
+def read_raw_spans_many(spans_list: List[Tuple[RawSpan, ...]]) -> List[str]:
+    return raw_log_files.read_many(spans_list)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# Подмножество меньше size / SORT_DIRECT_FRACTION строк сортируется по своим
+# ключам напрямую (k log k); большее — пересечением с готовой перестановкой (O(size))
+SORT_DIRECT_FRACTION = 16
+
+
+def _string_ranks(pool) -> np.ndarray:
+    """
+    Ранг каждого кода словаря в порядке значений, со сдвигом на 1: rank[code + 1].
+    None (код -1) получает ранг пустой строки (или меньше всех, если её нет).
+    """
+    order = sorted(range(len(pool)), key=lambda c: pool.values[c])
+    rank = np.empty(len(pool) + 1, dtype=np.int64)
+    rank[np.asarray(order, dtype=np.int64) + 1] = np.arange(len(pool))
+    empty = pool.code_of("")
+    rank[0] = rank[empty + 1] if empty is not None else -1
+    return rank
+
+
+def sort_keys(store, name: str, rows: np.ndarray) -> np.ndarray:
+    """
+    Типизированные ключи сортировки колонки name для строк rows: время — timestamp
+    (события без времени — первыми), строки — ранг значения в словаре (сортируется
+    словарь, а не строки), pid/exit и другие целые — числа, success — -1/0/1.
+    """
+    if name in ("time", "timestamp"):
+        return np.nan_to_num(store.timestamps[rows], nan=-np.inf)
+    if name == "success":
+        return store.success[rows]
+    if name in store.STRING_COLUMNS:
+        return _string_ranks(store.pools[name])[store.codes(name)[rows] + 1]
+    if name in store.INT_COLUMNS:
+        return store.ints(name)[rows]
+    raise KeyError(f"по полю {name!r} сортировка не поддерживается")
+
+
+def column_order(store, name: str) -> np.ndarray:
+    """
+    Перестановка строк [0, len(store)) по возрастанию ключа колонки name
+    (при равных ключах — по row id). Долгая операция — для фонового потока.
+    """
+    size = len(store)
+    keys = sort_keys(store, name, np.arange(size, dtype=np.int64))
+    order = np.argsort(keys, kind="stable")
+    # перестановки держатся в памяти на каждую отсортированную колонку — int32, пока хватает
+    return order.astype(np.int32) if size <= np.iinfo(np.int32).max else order
+
+
+class SortOrders:
+    """
+    Готовые перестановки строк хранилища по колонкам таблицы (column_order()):
+    считаются один раз на колонку набора событий, в фоне, и служат для
+    сортировки в обе стороны — по убыванию это та же перестановка задом наперёд.
+    Перестановка описывает строки, которые были в хранилище при её построении;
+    дописанные позже строки sorted_rows() вставляет в неё по ключам.
+    """
+
+    def __init__(self):
+        self._orders: Dict[str, np.ndarray] = {}
+
+    def order(self, name: str) -> Optional[np.ndarray]:
+        return self._orders.get(name)
+
+    def add(self, name: str, order: np.ndarray):
+        self._orders[name] = order
+
+
+def sorted_rows(store, rows, name: str, reverse: bool = False) -> np.ndarray:
+    """
+    Строки rows (row id, без повторов), упорядоченные по колонке name; при равных
+    ключах — по row id (по убыванию — в обратном порядке). Если для колонки есть
+    готовая перестановка (store.sort_orders), порядок берётся из неё.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    order = store.sort_orders.order(name)
+
+    if order is None or len(rows) * SORT_DIRECT_FRACTION < len(order):
+        rows = np.sort(rows)
+        result = rows[np.argsort(sort_keys(store, name, rows), kind="stable")]
+    else:
+        size = len(order)
+        member = np.zeros(size, dtype=bool)
+        member[rows[rows < size]] = True
+        result = order[member[order]].astype(np.int64)
+
+        # строки, дописанные после построения перестановки (режим слежения):
+        # их row id больше всех, поэтому среди равных ключей они идут последними
+        tail = np.sort(rows[rows >= size])
+        if len(tail):
+            tail_keys = sort_keys(store, name, tail)
+            idx = np.argsort(tail_keys, kind="stable")
+            tail, tail_keys = tail[idx], tail_keys[idx]
+            positions = np.searchsorted(sort_keys(store, name, result), tail_keys, side="right")
+            result = np.insert(result, positions, tail)
+
+    return result[::-1] if reverse else result
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from .incidents import touches_critical_path
+from .timefmt import day_label, local_buckets
+
+# Типы событий, неуспешные записи которых считаются неуспешными аутентификациями
+AUTH_EVENT_TYPES = ("USER_AUTH", "USER_LOGIN")
+
+
+class EventStats:
+    """
+    Итоги вкладки 'Статистика' по набору строк: общие цифры и подсчёты по
+    типам, пользователям (метка -> количество) и локальным суткам ('YYYY-MM-DD' -> количество).
+    """
+
+    def __init__(self, total: int, unique_users: int, unique_types: int, failed_auth: int,
+                 critical_changes: int, type_counts: Dict[str, int], user_counts: Dict[str, int],
+                 day_counts: Dict[str, int]):
+        self.total = total
+        self.unique_users = unique_users
+        self.unique_types = unique_types
+        self.failed_auth = failed_auth
+        self.critical_changes = critical_changes
+        self.type_counts = type_counts
+        self.user_counts = user_counts
+        self.day_counts = day_counts
+
+
+def critical_change_mask(store) -> np.ndarray:
+    """
+    Маска строк хранилища — успешных SYSCALL с критичным файлом в details
+    (как incidents.find_critical_file_changes()). details проверяются в Python,
+    поэтому маска считается один раз на набор (store.critical_mask) и
+    дополняется только для дописанных строк.
+    """
+    size = len(store)
+    done = store.critical_mask
+    if done is not None and len(done) == size:
+        return done
+
+    start = 0 if done is None else len(done)
+    mask = np.zeros(size, dtype=bool)
+    if start:
+        mask[:start] = done
+
+    syscall = store.pools["event_type"].code_of("SYSCALL")
+    if syscall is not None and start < size:
+        tail = slice(start, size)
+        candidates = start + np.flatnonzero((store.codes("event_type")[tail] == syscall) & (store.success[tail] == 1))
+        # только details кандидатов, без сборки событий целиком
+        details = store.objects("details")
+        mask[[r for r in candidates.tolist() if touches_critical_path(details[r])]] = True
+
+    store.critical_mask = mask
+    return mask
+
+
+def _label_counts(pool, counts: np.ndarray, missing_label: str) -> Dict[str, int]:
+    """
+    Подсчёты по сдвинутым на 1 кодам словаря (counts[code + 1]) → метка -> количество.
+    Пустые значения и None объединяются под missing_label.
+    """
+    result: Dict[str, int] = {}
+    for shifted in np.flatnonzero(counts):
+        label = pool.decode(int(shifted) - 1) or missing_label
+        result[label] = result.get(label, 0) + int(counts[shifted])
+    return result
+
+
+def _unique_count(pool, counts: np.ndarray) -> int:
+    """Сколько разных непустых значений встретилось (по подсчётам counts[code + 1])."""
+    present = np.flatnonzero(counts[1:])
+    empty = pool.code_of("")
+    return len(present) - int(empty is not None and counts[empty + 1] > 0)
+
+
+def _day_counts(ts: np.ndarray) -> Dict[str, int]:
+    """Подсчёт событий по локальным суткам (ts — unixtime без NaN)."""
+    if not len(ts):
+        return {}
+    days = local_buckets(ts)
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    if span <= len(days):
+        counts = np.bincount(days - first, minlength=span)
+        values = first + np.flatnonzero(counts)
+        counts = counts[values - first]
+    else:
+        # редкие события с далёкими датами (мусор в логе): массив на весь интервал не заводим
+        values, counts = np.unique(days, return_counts=True)
+    result: Dict[str, int] = {}
+    for d, c in zip(values.tolist(), counts.tolist()):
+        # даты вне диапазона datetime сливаются под одной меткой '?'
+        label = day_label(d)
+        result[label] = result.get(label, 0) + c
+    return result
+
+
+def compute_stats(store, rows: Optional[np.ndarray] = None) -> EventStats:
+    """
+    Статистика по строкам rows хранилища (None — по всем) за один проход:
+    каждая колонка выбирается один раз, подсчёты — np.bincount по кодам
+    словарей (тип × success — одним bincount), сутки — целочисленной
+    арифметикой по таблице смещений UTC.
+    """
+    if rows is None:
+        def take(column):
+            return column
+    else:
+        rows = np.asarray(rows, dtype=np.int64)
+
+        def take(column):
+            return column[rows]
+
+    type_pool = store.pools["event_type"]
+    user_pool = store.pools["user"]
+
+    type_codes = take(store.codes("event_type"))
+    success = take(store.success)
+    user_codes = take(store.codes("user"))
+    ts = take(store.timestamps)
+    critical = take(critical_change_mask(store))
+
+    # (тип + 1) * 3 + (success + 1): строка таблицы — тип, столбцы — success -1 / 0 / 1
+    n_types = len(type_pool) + 1
+    by_type_success = np.bincount(
+        (type_codes.astype(np.int64) + 1) * 3 + (success.astype(np.int64) + 1), minlength=n_types * 3,
+    ).reshape(n_types, 3)
+    type_counts = by_type_success.sum(axis=1)
+    user_counts = np.bincount(user_codes.astype(np.int64) + 1, minlength=len(user_pool) + 1)
+
+    # неуспешные аутентификации: success 'no' или неизвестен
+    auth = [code + 1 for code in (type_pool.code_of(t) for t in AUTH_EVENT_TYPES) if code is not None]
+    failed_auth = int(by_type_success[auth, :2].sum()) if auth else 0
+
+    return EventStats(
+        total=len(type_codes),
+        unique_users=_unique_count(user_pool, user_counts),
+        unique_types=_unique_count(type_pool, type_counts),
+        failed_auth=failed_auth,
+        critical_changes=int(np.count_nonzero(critical)),
+        type_counts=_label_counts(type_pool, type_counts, "UNKNOWN"),
+        user_counts=_label_counts(user_pool, user_counts, "?"),
+        day_counts=_day_counts(ts[~np.isnan(ts)]),
+    )
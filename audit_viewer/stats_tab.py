@@ -1,10 +1,11 @@
 from PyQt5 import QtWidgets, QtCore
-from datetime import datetime
+
+import numpy as np
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
 
-from .incidents import find_critical_file_changes
+from .stats import compute_stats
 
 
 class StatsTabMixin:
@@ -145,14 +146,14 @@ class StatsTabMixin:
         users_group.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
         days_group.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
 
-    def _get_stats_filtered_events(self):
-        """Возвращает список событий, попадающих в диапазон на вкладке 'Статистика'."""
+    def _get_stats_rows(self):
+        """Row id событий, попадающих в диапазон на вкладке 'Статистика' (None — все события)."""
         if not self.all_events:
-            return []
+            return np.empty(0, dtype=np.int64)
 
         # если виджеты ещё не инициализированы или выключены
         if not hasattr(self, "stats_from_datetime"):
-            return self.all_events
+            return None
 
         from_dt = self.stats_from_datetime.dateTime()
         to_dt = self.stats_to_datetime.dateTime()
@@ -160,26 +161,21 @@ class StatsTabMixin:
         from_ts = from_dt.toSecsSinceEpoch()
         to_ts = to_dt.toSecsSinceEpoch()
 
-        result = []
-        for ev in self.all_events:
-            ts = ev.get("timestamp")
-            if ts is None:
-                # если вдруг нет таймстемпа — можно либо включать, либо пропускать; включим
-                result.append(ev)
-                continue
-            if from_ts <= ts <= to_ts:
-                result.append(ev)
-
-        return result
+        # если вдруг нет таймстемпа (NaN) — можно либо включать, либо пропускать; включим
+        ts = self.all_events.timestamps
+        mask = np.isnan(ts) | ((ts >= from_ts) & (ts <= to_ts))
+        if mask.all():
+            # весь журнал — колонки берутся как есть, без выборки
+            return None
+        return np.flatnonzero(mask)
 
     def _update_stats_time_filters_from_events(self):
         """Выставляет 'Время от/до' на вкладке 'Статистика' по min/max timestamp в all_events."""
-        timestamps = [ev.get("timestamp") for ev in self.all_events if ev.get("timestamp") is not None]
-        if not timestamps:
+        time_range = self.all_events.time_range()
+        if time_range is None:
             return
 
-        min_ts = min(timestamps)
-        max_ts = max(timestamps)
+        min_ts, max_ts = time_range
 
         from_dt = QtCore.QDateTime.fromSecsSinceEpoch(int(min_ts))
         to_dt = QtCore.QDateTime.fromSecsSinceEpoch(int(max_ts))
@@ -229,35 +225,19 @@ class StatsTabMixin:
             self._update_stats_controls_state()
             return
 
-        events = self._get_stats_filtered_events()
-
-        total = len(events)
-        users_set = {ev.get("user") for ev in events if ev.get("user")}
-        types_set = {ev.get("event_type") for ev in events if ev.get("event_type")}
-
-        # неуспешные аутентификации
-        failed_auth = 0
-        for ev in events:
-            etype = ev.get("event_type")
-            if etype in ("USER_AUTH", "USER_LOGIN") and not ev.get("success", True):
-                failed_auth += 1
-
-        # критичные изменения
-        critical_changes = len(find_critical_file_changes(events))
+        # все цифры и подсчёты — за один проход по колонкам хранилища
+        stats = compute_stats(self.all_events, self._get_stats_rows())
+        type_counts = stats.type_counts
+        user_counts = stats.user_counts
 
         # Заполняем цифры
-        self.stats_total_events_label.setText(str(total))
-        self.stats_unique_users_label.setText(str(len(users_set)))
-        self.stats_unique_types_label.setText(str(len(types_set)))
-        self.stats_failed_auth_label.setText(str(failed_auth))
-        self.stats_critical_changes_label.setText(str(critical_changes))
+        self.stats_total_events_label.setText(str(stats.total))
+        self.stats_unique_users_label.setText(str(stats.unique_users))
+        self.stats_unique_types_label.setText(str(stats.unique_types))
+        self.stats_failed_auth_label.setText(str(stats.failed_auth))
+        self.stats_critical_changes_label.setText(str(stats.critical_changes))
 
         # --- Таблица по типам ---
-        type_counts = {}
-        for ev in events:
-            t = ev.get("event_type") or "UNKNOWN"
-            type_counts[t] = type_counts.get(t, 0) + 1
-
         self.stats_types_table.setRowCount(len(type_counts))
         for row, (t, cnt) in enumerate(sorted(type_counts.items(), key=lambda x: x[1], reverse=True)):
             self.stats_types_table.setItem(row, 0, QtWidgets.QTableWidgetItem(str(t)))
@@ -278,11 +258,6 @@ class StatsTabMixin:
         )
 
         # --- Таблица по пользователям ---
-        user_counts = {}
-        for ev in events:
-            u = ev.get("user") or "?"
-            user_counts[u] = user_counts.get(u, 0) + 1
-
         self.stats_users_table.setRowCount(len(user_counts))
         for row, (u, cnt) in enumerate(sorted(user_counts.items(), key=lambda x: x[1], reverse=True)):
             self.stats_users_table.setItem(row, 0, QtWidgets.QTableWidgetItem(str(u)))
@@ -303,14 +278,7 @@ class StatsTabMixin:
         )
 
         # --- Таблица по дням ---
-        day_counts = {}
-        for ev in events:
-            ts = ev.get("timestamp")
-            if ts is None:
-                continue
-            dt = datetime.fromtimestamp(ts)
-            day_str = dt.strftime("%Y-%m-%d")
-            day_counts[day_str] = day_counts.get(day_str, 0) + 1
+        day_counts = stats.day_counts
 
         self.stats_days_table.setRowCount(len(day_counts))
         for row, (day, cnt) in enumerate(sorted(day_counts.items())):
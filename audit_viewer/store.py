@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .event import EVENT_FIELDS, AuditEvent
+from .index import INDEX_REBUILD_FRACTION, INDEX_REBUILD_MIN_ROWS, EventIndex
+from .sortorder import SortOrders, sorted_rows
+from .rawtext import read_raw_spans, read_raw_spans_many
+from .timefmt import format_timestamp
+
+# "Нет значения" для целочисленных колонок (pid, exit, ...)
+MISSING_INT = int(np.iinfo(np.int64).min)
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+# Код "нет значения" (None) в колонках со словарным кодированием
+MISSING_CODE = -1
+
+# success: None / False / True
+SUCCESS_UNKNOWN = -1
+
+# Сколько событий перекладывать в колонки за раз при загрузке из итератора
+_BATCH_SIZE = 65536
+
+
+class StringPool:
+    """Словарь строк: каждое уникальное значение хранится один раз, в колонке — его код."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING_CODE
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        if code < 0:
+            return None
+        return self.values[code]
+
+    def code_of(self, value: Optional[str]) -> Optional[int]:
+        """Код существующего значения или None, если такого значения нет в словаре."""
+        if value is None:
+            return MISSING_CODE
+        return self._codes.get(value)
+
+    def codes_where(self, predicate) -> np.ndarray:
+        """Коды всех значений словаря, для которых predicate(value) истинно."""
+        return np.array([code for code, value in enumerate(self.values) if predicate(value)], dtype=np.int32)
+
+
+class _Column:
+    """Растущий numpy-массив (ёмкость удваивается, как у list)."""
+
+    def __init__(self, dtype, fill):
+        self.dtype = dtype
+        self.fill = fill
+        self.data = np.empty(0, dtype=dtype)
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self.data):
+            return
+        new_capacity = max(capacity, 2 * len(self.data), 1024)
+        data = np.full(new_capacity, self.fill, dtype=self.dtype)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+
+class EventStore(Sequence):
+    """
+    Колоночное хранилище событий.
+
+    Вместо списка dict'ов (по ~20 ключей + details + raw на событие)
+    события лежат в numpy-массивах:
+        - timestamp — float64 (NaN, если нет);
+        - pid/ppid/exit/syscall/event_id — int64 (MISSING_INT, если нет);
+        - success — int8 (-1 / 0 / 1);
+        - строки с небольшим числом различных значений (user, event_type, key,
+          comm, exe, hostname, ...) — int32-коды в StringPool.
+    details и raw пока хранятся как объекты по строкам; в колонке raw лежит
+    либо текст, либо raw_spans события (ссылки на строки файла журнала).
+
+    Строки хранятся в порядке добавления (загрузка — от старых к новым,
+    новые события в режиме слежения дописываются в конец). Номер строки —
+    постоянный идентификатор события (row id); отфильтрованные/отсортированные
+    наборы описываются массивом row id (EventView).
+
+    Как Sequence хранилище отдаёт события в виде AuditEvent, совпадающих
+    с результатом build_event_summary() — строка собирается только по запросу.
+    """
+
+    STRING_COLUMNS = ("user", "event_type", "comm", "exe", "cwd", "tty", "acct", "addr",
+                      "hostname", "node", "key", "syscall_name", "arch")
+    INT_COLUMNS = ("event_id", "pid", "ppid", "syscall", "exit")
+    OBJECT_COLUMNS = ("details", "raw")
+
+    # порядок ключей как в build_event_summary()
+    FIELDS = EVENT_FIELDS
+
+    def __init__(self, events: Optional[Iterable[Dict[str, Any]]] = None):
+        self._n = 0
+
+        self._timestamp = _Column(np.float64, np.nan)
+        self._success = _Column(np.int8, SUCCESS_UNKNOWN)
+        self._ints = {name: _Column(np.int64, MISSING_INT) for name in self.INT_COLUMNS}
+        self._codes = {name: _Column(np.int32, MISSING_CODE) for name in self.STRING_COLUMNS}
+        self.pools = {name: StringPool() for name in self.STRING_COLUMNS}
+        self._objects: Dict[str, List[Any]] = {name: [] for name in self.OBJECT_COLUMNS}
+        # file_id файлов журнала, на строки которых ссылаются raw_spans (rawtext.RawLogFiles)
+        self.raw_files: Set[int] = set()
+
+        # нечисловые значения "целочисленных" полей (на случай мусора в логе):
+        # (row, column) -> исходная строка
+        self._int_overflow: Dict[tuple, str] = {}
+
+        self._index: Optional[EventIndex] = None
+        # индекс триграмм для текстового поиска (textindex.TrigramIndex) — строится в фоне после загрузки
+        self.text_index = None
+        # перестановки строк по колонкам таблицы (sortorder.SortOrders) — считаются в фоне по первому запросу
+        self.sort_orders = SortOrders()
+        # успешные SYSCALL с критичными файлами (stats.critical_change_mask()) — считаются один раз
+        self.critical_mask: Optional[np.ndarray] = None
+
+        if events is not None:
+            self.extend(events)
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> "EventStore":
+        return cls(events)
+
+    # --- Sequence ---
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.row(i) for i in range(*row.indices(self._n))]
+        if row < 0:
+            row += self._n
+        if not 0 <= row < self._n:
+            raise IndexError("event row out of range")
+        return self.row(row)
+
+    def __iter__(self) -> Iterator[AuditEvent]:
+        for i in range(self._n):
+            yield self.row(i)
+
+    # --- загрузка ---
+
+    def extend(self, events: Iterable[Dict[str, Any]]):
+        """Дописывает события в конец (пачками, не держа итератор целиком в памяти)."""
+        it = iter(events)
+        while True:
+            batch = list(itertools.islice(it, _BATCH_SIZE))
+            if not batch:
+                break
+            self._append_batch(batch)
+
+    def _append_batch(self, batch: List[Dict[str, Any]]):
+        start = self._n
+        end = start + len(batch)
+
+        for col in self._all_columns():
+            col.reserve(end)
+
+        self._timestamp.data[start:end] = [
+            np.nan if ev.get("timestamp") is None else ev["timestamp"] for ev in batch
+        ]
+        self._success.data[start:end] = [
+            SUCCESS_UNKNOWN if ev.get("success") is None else int(bool(ev["success"])) for ev in batch
+        ]
+
+        for name, col in self._ints.items():
+            values = []
+            for i, ev in enumerate(batch):
+                values.append(self._encode_int(start + i, name, ev.get(name)))
+            col.data[start:end] = values
+
+        for name, col in self._codes.items():
+            encode = self.pools[name].encode
+            col.data[start:end] = [encode(ev.get(name)) for ev in batch]
+
+        self._objects["details"].extend(ev.get("details", {}) for ev in batch)
+        refs = [_raw_ref(ev) for ev in batch]
+        self._objects["raw"].extend(refs)
+        # record'ы события — строки одного файла: достаточно первого участка
+        self.raw_files.update({ref[0][0] for ref in refs if type(ref) is tuple})
+
+        self._n = end
+
+    def _encode_int(self, row: int, name: str, value) -> int:
+        if value is None:
+            return MISSING_INT
+        try:
+            iv = int(value)
+        except (TypeError, ValueError):
+            iv = None
+        # храним только то, что восстанавливается без потерь (без ведущих нулей, пробелов и т.п.)
+        if iv is None or not (MISSING_INT < iv <= _INT64_MAX) or (isinstance(value, str) and str(iv) != value):
+            self._int_overflow[(row, name)] = value
+            return MISSING_INT
+        return iv
+
+    def _all_columns(self):
+        yield self._timestamp
+        yield self._success
+        yield from self._ints.values()
+        yield from self._codes.values()
+
+    # --- колонки ---
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamp.data[:self._n]
+
+    @property
+    def success(self) -> np.ndarray:
+        return self._success.data[:self._n]
+
+    def ints(self, name: str) -> np.ndarray:
+        return self._ints[name].data[:self._n]
+
+    def codes(self, name: str) -> np.ndarray:
+        return self._codes[name].data[:self._n]
+
+    def objects(self, name: str) -> List[Any]:
+        return self._objects[name]
+
+    # --- доступ к значениям ---
+
+    def value(self, row: int, name: str):
+        """Значение одного поля события (как в dict из build_event_summary())."""
+        if name == "timestamp":
+            ts = self._timestamp.data[row]
+            return None if np.isnan(ts) else float(ts)
+        if name == "time":
+            ts = self._timestamp.data[row]
+            return "" if np.isnan(ts) else format_timestamp(float(ts))
+        if name == "success":
+            s = self._success.data[row]
+            return None if s == SUCCESS_UNKNOWN else bool(s)
+        if name in self._codes:
+            return self.pools[name].decode(int(self._codes[name].data[row]))
+        if name in self._ints:
+            v = int(self._ints[name].data[row])
+            if v == MISSING_INT:
+                return self._int_overflow.get((row, name))
+            # event_id в событии — int, остальные поля — строки из лога
+            return v if name == "event_id" else str(v)
+        if name == "raw":
+            return self.raw_text(row, cache=False)
+        if name in self._objects:
+            return self._objects[name][row]
+        return None
+
+    def raw_text(self, row: int, cache: bool = True) -> str:
+        """Сырой текст события (читается из файла, если хранятся только raw_spans)."""
+        ref = self._objects["raw"][row]
+        if isinstance(ref, tuple):
+            return read_raw_spans(ref, cache=cache)
+        return ref or ""
+
+    def raw_texts(self, rows) -> List[str]:
+        """Сырой текст нескольких событий (без кэша просмотренных) — для поиска по многим событиям."""
+        refs = self._objects["raw"]
+        texts = [refs[int(r)] for r in rows]
+        spans_at = [i for i, ref in enumerate(texts) if isinstance(ref, tuple)]
+        if spans_at:
+            for i, text in zip(spans_at, read_raw_spans_many([texts[i] for i in spans_at])):
+                texts[i] = text
+        return [text or "" for text in texts]
+
+    def string_values(self, name: str, rows) -> List[Optional[str]]:
+        """Значения строкового поля name для строк rows (декодирование словаря без обращения к value())."""
+        values = self.pools[name].values
+        return [values[c] if c >= 0 else None for c in self.codes(name)[rows].tolist()]
+
+    def row(self, row: int) -> AuditEvent:
+        """Собирает событие по номеру строки (raw_spans передаются как есть, без чтения текста)."""
+        # time событие вычисляет само из timestamp — только если его покажут
+        values = {name: self.value(row, name) for name in self.FIELDS if name not in ("time", "raw")}
+        ref = self._objects["raw"][row]
+        if isinstance(ref, tuple):
+            values["raw_spans"] = ref
+        else:
+            values["raw"] = ref
+        return AuditEvent(**values)
+
+    # --- выборки ---
+
+    def index(self) -> EventIndex:
+        """
+        Индексы для отбора строк (см. index.select_rows()). Строятся при первом
+        обращении и заново — когда после построения дописано заметное число строк.
+        """
+        idx = self._index
+        if idx is None or self._n - idx.size > max(INDEX_REBUILD_MIN_ROWS, idx.size // INDEX_REBUILD_FRACTION):
+            idx = self._index = EventIndex(self)
+        return idx
+
+    def time_range(self):
+        """(min_ts, max_ts) по событиям с известным временем или None."""
+        ts = self.timestamps
+        if not len(ts) or np.isnan(ts).all():
+            return None
+        return float(np.nanmin(ts)), float(np.nanmax(ts))
+
+    def time_order(self) -> Optional[np.ndarray]:
+        """
+        Перестановка строк от старых к новым по (timestamp, event_id), как
+        parser.event_sort_key() (нет времени / номера — 0), или None, если строки
+        уже в этом порядке.
+        """
+        ts = np.nan_to_num(self.timestamps, nan=0.0)
+        ids = self.ints("event_id")
+        ids = np.where(ids == MISSING_INT, 0, ids)
+        dts = np.diff(ts)
+        if not (dts < 0).any() and not ((dts == 0) & (np.diff(ids) < 0)).any():
+            return None
+        return np.lexsort((ids, ts))
+
+    def take(self, rows) -> "EventStore":
+        """
+        Новое хранилище из строк rows (в этом порядке) — колонки переставляются
+        целиком, без сборки событий. Словари строк общие с исходным хранилищем
+        (они только дополняются, коды остаются верными для обоих).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(rows)
+        result = EventStore()
+        for src, dst in zip(self._all_columns(), result._all_columns()):
+            dst.reserve(n)
+            dst.data[:n] = src.data[:self._n][rows]
+        result.pools = self.pools
+        result.raw_files = set(self.raw_files)
+        row_list = rows.tolist()
+        for name in self.OBJECT_COLUMNS:
+            column = self._objects[name]
+            result._objects[name] = [column[r] for r in row_list]
+        if self._int_overflow:
+            new_row = {r: i for i, r in enumerate(row_list)}
+            result._int_overflow = {
+                (new_row[r], name): v for (r, name), v in self._int_overflow.items() if r in new_row
+            }
+        result._n = n
+        return result
+
+    def mask_in(self, name: str, values) -> np.ndarray:
+        """Маска строк, у которых строковое поле name равно одному из values."""
+        pool = self.pools[name]
+        codes = [pool.code_of(v) for v in values]
+        codes = [c for c in codes if c is not None]
+        if not codes:
+            return np.zeros(self._n, dtype=bool)
+        return np.isin(self.codes(name), codes)
+
+    def select(self, rows: np.ndarray, event_types=None, success: Optional[bool] = None) -> np.ndarray:
+        """Строки из rows с event_type из event_types и/или заданным success (порядок сохраняется)."""
+        mask = np.ones(len(rows), dtype=bool)
+        if event_types is not None:
+            mask &= self.mask_in("event_type", event_types)[rows]
+        if success is not None:
+            mask &= self.success[rows] == int(success)
+        return rows[mask]
+
+    def view(self, rows=None) -> "EventView":
+        """Представление набора строк (по умолчанию — все, от новых к старым)."""
+        if rows is None:
+            rows = np.arange(self._n - 1, -1, -1, dtype=np.int64)
+        return EventView(self, rows)
+
+
+class EventView(Sequence):
+    """
+    Подмножество событий хранилища в заданном порядке: массив row id.
+    Фильтрация и сортировка меняют только этот массив — сами события не копируются.
+    """
+
+    def __init__(self, store: EventStore, rows):
+        self.store = store
+        self.rows = np.asarray(rows, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.store.row(int(r)) for r in self.rows[i]]
+        return self.store.row(int(self.rows[i]))
+
+    def __iter__(self) -> Iterator[AuditEvent]:
+        row = self.store.row
+        for r in self.rows:
+            yield row(int(r))
+
+    def value(self, i: int, name: str):
+        return self.store.value(int(self.rows[i]), name)
+
+    def prepend_rows(self, rows):
+        self.rows = np.concatenate([np.asarray(rows, dtype=np.int64), self.rows])
+
+    def sort_by(self, name: str, reverse: bool = False):
+        """Сортировка по полю (время — по timestamp, строки — по значению, числа — как числа)."""
+        self.rows = sorted_rows(self.store, self.rows, name, reverse)
+
+
+def _raw_ref(ev) -> Any:
+    """Что положить в колонку raw: raw_spans события, если они есть, иначе текст."""
+    spans = getattr(ev, "raw_spans", None)
+    if spans:
+        return spans
+    return ev.get("raw", "")
+
+
+def store_rows(events):
+    """
+    Для EventStore / EventView возвращает (store, rows) — чтобы векторизованно
+    отобрать кандидатов, — для обычного списка событий None.
+    """
+    if isinstance(events, EventView):
+        return events.store, events.rows
+    if isinstance(events, EventStore):
+        return events, np.arange(len(events), dtype=np.int64)
+    return None
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import re
+from typing import Callable, List, Optional
+
+import numpy as np
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from .index import COST_TEXT, EventIndex, RowCondition
+
+# Сколько строк хранилища описывает один блок индекса: для каждой триграммы
+# хранятся номера блоков, в тексте которых она встречается. Больше блок —
+# меньше индекс, но больше строк проверяется на каждый блок-кандидат
+TRIGRAM_BLOCK_ROWS = 128
+
+# Сколько блоков разбирать между проверками отмены построения
+_BUILD_CHECK_BLOCKS = 64
+
+# Сколько строк проверять за раз (тексты пачки держатся в памяти одновременно)
+_VERIFY_BATCH_ROWS = 4096
+
+
+def search_texts(store, rows) -> List[str]:
+    """
+    Тексты, по которым ищет поле 'Поиск по тексту': команда, исполняемый файл
+    и сырой лог каждой строки rows.
+    """
+    comms = store.string_values("comm", rows)
+    exes = store.string_values("exe", rows)
+    raws = store.raw_texts(rows)
+    return [" ".join([comm or "", exe or "", raw]) for comm, exe, raw in zip(comms, exes, raws)]
+
+
+def _verify(rows: np.ndarray, hit: np.ndarray, store, matches: Callable[[str], bool]):
+    """Проверяет по полному тексту строки rows, ещё не отмеченные в hit (пачками)."""
+    todo = np.flatnonzero(~hit)
+    for start in range(0, len(todo), _VERIFY_BATCH_ROWS):
+        idx = todo[start:start + _VERIFY_BATCH_ROWS]
+        found = [matches(text) for text in search_texts(store, rows[idx])]
+        hit[idx[np.asarray(found, dtype=bool)]] = True
+
+
+def _trigrams(data: bytes) -> np.ndarray:
+    """Различные триграммы байтовой строки — числа b0 << 16 | b1 << 8 | b2 (по возрастанию)."""
+    if len(data) < 3:
+        return np.zeros(0, dtype=np.uint32)
+    a = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+    return np.unique((a[:-2] << 16) | (a[1:-1] << 8) | a[2:])
+
+
+class TrigramIndex:
+    """
+    Индекс триграмм по тексту поиска (search_texts(), в нижнем регистре, UTF-8)
+    для строк хранилища [0, size). Гранулярность — блок из block_rows строк:
+    grams — различные триграммы по возрастанию, блоки триграммы grams[i] —
+    blocks[offsets[i]:offsets[i + 1]] (по возрастанию).
+
+    Подстрока длиной от 3 байт может встретиться только в блоках, где есть
+    все её триграммы; найденные так строки-кандидаты затем проверяются.
+    """
+
+    def __init__(self, grams: np.ndarray, offsets: np.ndarray, blocks: np.ndarray, size: int,
+                 block_rows: int = TRIGRAM_BLOCK_ROWS):
+        self.grams = grams
+        self.offsets = offsets
+        self.blocks = blocks
+        self.size = size
+        self.block_rows = block_rows
+
+    @classmethod
+    def build(
+            cls,
+            store,
+            block_rows: int = TRIGRAM_BLOCK_ROWS,
+            cancelled: Optional[Callable[[], bool]] = None,
+            progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Optional["TrigramIndex"]:
+        """
+        Строит индекс по строкам, которые есть в store на момент вызова
+        (сырой текст читается из файлов журнала). Долгая операция — для фонового
+        потока; cancelled() — прервать (тогда возвращается None), progress(done, total) — ход в строках.
+        """
+        size = len(store)
+        gram_parts: List[np.ndarray] = []
+        block_parts: List[np.ndarray] = []
+
+        for block, start in enumerate(range(0, size, block_rows)):
+            if block % _BUILD_CHECK_BLOCKS == 0:
+                if cancelled is not None and cancelled():
+                    return None
+                if progress is not None:
+                    progress(start, size)
+            end = min(start + block_rows, size)
+            text = "\n".join(search_texts(store, np.arange(start, end)))
+            grams = _trigrams(text.lower().encode("utf-8"))
+            gram_parts.append(grams)
+            block_parts.append(np.full(len(grams), block, dtype=np.uint32))
+
+        if gram_parts:
+            all_grams = np.concatenate(gram_parts)
+            all_blocks = np.concatenate(block_parts)
+        else:
+            all_grams = np.zeros(0, dtype=np.uint32)
+            all_blocks = np.zeros(0, dtype=np.uint32)
+        del gram_parts, block_parts
+
+        # устойчивая сортировка по триграмме: блоки внутри неё остаются по возрастанию
+        order = np.argsort(all_grams, kind="stable")
+        all_grams = all_grams[order]
+        all_blocks = all_blocks[order]
+        del order
+
+        grams, starts = np.unique(all_grams, return_index=True)
+        offsets = np.append(starts, len(all_grams)).astype(np.int64)
+        if progress is not None:
+            progress(size, size)
+        return cls(grams, offsets, all_blocks, size, block_rows)
+
+    def _blocks_of(self, gram: int) -> np.ndarray:
+        i = int(np.searchsorted(self.grams, gram))
+        if i >= len(self.grams) or self.grams[i] != gram:
+            return np.zeros(0, dtype=np.uint32)
+        return self.blocks[self.offsets[i]:self.offsets[i + 1]]
+
+    def candidate_blocks(self, needles: List[str]) -> Optional[np.ndarray]:
+        """
+        Блоки, текст которых может содержать все подстроки needles (в нижнем регистре).
+        None — подстроки слишком короткие, индекс сузить поиск не может.
+        """
+        grams = [_trigrams(needle.encode("utf-8")) for needle in needles]
+        grams = np.unique(np.concatenate(grams)) if grams else np.zeros(0, dtype=np.uint32)
+        if not len(grams):
+            return None
+
+        postings = sorted((self._blocks_of(int(g)) for g in grams), key=len)
+        blocks = postings[0]
+        for other in postings[1:]:
+            if not len(blocks):
+                break
+            blocks = np.intersect1d(blocks, other, assume_unique=True)
+        return blocks
+
+    def candidate_rows(self, needles: List[str]) -> Optional[np.ndarray]:
+        """Строки [0, size) из блоков-кандидатов (по возрастанию) или None — см. candidate_blocks()."""
+        blocks = self.candidate_blocks(needles)
+        if blocks is None:
+            return None
+        rows = (blocks.astype(np.int64)[:, None] * self.block_rows
+                + np.arange(self.block_rows, dtype=np.int64)).ravel()
+        return rows[rows < self.size]
+
+
+def regex_literals(pattern: str) -> List[str]:
+    """
+    Подстроки, которые обязан содержать любой текст, подходящий под pattern
+    (в нижнем регистре): последовательности литералов верхнего уровня выражения.
+    Пустой список — обязательных подстрок не найдено (например, чередование a|b).
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return []
+
+    literals: List[str] = []
+    run: List[str] = []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(arg))
+            continue
+        if run:
+            literals.append("".join(run))
+            run = []
+    if run:
+        literals.append("".join(run))
+    return [lit.lower() for lit in literals]
+
+
+class _TextCondition(RowCondition):
+    """
+    Условие по тексту поиска (search_texts()). Если у хранилища построен
+    store.text_index, кандидаты берутся из него; без индекса (или для слишком
+    короткого запроса) условие только проверяет строки и ведущим не бывает.
+    index_rows() отдаёт кандидатов без проверки: select_rows() проверяет их
+    последними, кусками (с возможностью отмены).
+    """
+
+    exact_index = False
+    cost = COST_TEXT
+
+    def _needles(self) -> List[str]:
+        raise NotImplementedError
+
+    def _candidates(self, store, index: EventIndex) -> Optional[np.ndarray]:
+        text_index = store.text_index
+        if text_index is None:
+            return None
+        rows = text_index.candidate_rows(self._needles())
+        if rows is None:
+            return None
+        # строки, дописанные после построения индекса триграмм, — все кандидаты
+        tail = np.arange(min(text_index.size, index.size), index.size, dtype=np.int64)
+        return np.concatenate([rows[rows < index.size], tail])
+
+    def estimate(self, store, index: EventIndex) -> int:
+        rows = self._candidates(store, index)
+        # без индекса — дороже любого индексного условия
+        return index.size + 1 if rows is None else len(rows)
+
+    def index_rows(self, store, index: EventIndex) -> np.ndarray:
+        rows = self._candidates(store, index)
+        if rows is None:
+            rows = np.arange(index.size, dtype=np.int64)
+        return rows
+
+
+class TextContains(_TextCondition):
+    """Текст поиска содержит подстроку needle (без учёта регистра)."""
+
+    def __init__(self, needle: str):
+        self.needle = needle.lower()
+        # name -> (словарь, его размер, коды значений с needle): mask() зовётся на каждый кусок строк
+        self._pool_codes = {}
+
+    def _needles(self) -> List[str]:
+        return [self.needle]
+
+    def _matching_codes(self, store, name: str) -> np.ndarray:
+        """Коды значений словаря name, содержащих needle (пересчёт — только если словарь вырос)."""
+        pool = store.pools[name]
+        cached = self._pool_codes.get(name)
+        if cached is None or cached[0] is not pool or cached[1] != len(pool):
+            needle = self.needle
+            cached = self._pool_codes[name] = (pool, len(pool), pool.codes_where(lambda v: needle in v.lower()))
+        return cached[2]
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        needle = self.needle
+        # совпадение в comm/exe проверяется по словарю; остальные — по полному тексту
+        hit = (np.isin(store.codes("comm")[rows], self._matching_codes(store, "comm"))
+               | np.isin(store.codes("exe")[rows], self._matching_codes(store, "exe")))
+        _verify(rows, hit, store, lambda text: needle in text.lower())
+        return hit
+
+    def implies(self, other: RowCondition) -> bool:
+        # текст с подстрокой "ssh" содержит и "ss"
+        return isinstance(other, TextContains) and other.needle in self.needle
+
+
+class TextRegex(_TextCondition):
+    """Текст поиска подходит под регулярное выражение (без учёта регистра)."""
+
+    def __init__(self, pattern: str):
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self._literals = regex_literals(pattern)
+
+    def _needles(self) -> List[str]:
+        return self._literals
+
+    def mask(self, store, rows: np.ndarray) -> np.ndarray:
+        search = self.regex.search
+        hit = np.zeros(len(rows), dtype=bool)
+        _verify(rows, hit, store, lambda text: search(text) is not None)
+        return hit
+
+    def implies(self, other: RowCondition) -> bool:
+        return isinstance(other, TextRegex) and other.regex.pattern == self.regex.pattern
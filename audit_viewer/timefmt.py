@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+import numpy as np
+
+DAY_SECONDS = 86400
+HOUR_SECONDS = 3600
+
+# Сколько отформатированных секунд держать в кэше (строки нужны только видимым строкам таблицы)
+FORMAT_CACHE_SIZE = 65536
+
+_format_cache: Dict[int, str] = {}
+
+_EPOCH_DATE = date(1970, 1, 1)
+
+# Метки времени дальше этого (мусор в логе) прижимаются к границе, чтобы секунды влезали в int64
+_MAX_SECONDS = 2 ** 62
+
+
+def format_timestamp(ts: float) -> str:
+    """
+    Преобразует unixtime в строку 'YYYY-MM-DD HH:MM:SS'.
+
+    Строка зависит только от целой секунды, поэтому кэшируется по ней:
+    соседние события одной секунды форматируются один раз.
+    """
+    try:
+        sec = math.floor(ts)
+    except (TypeError, ValueError, OverflowError):
+        return ""
+
+    text = _format_cache.get(sec)
+    if text is not None:
+        return text
+
+    try:
+        text = datetime.fromtimestamp(sec).strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        return ""
+
+    if len(_format_cache) >= FORMAT_CACHE_SIZE:
+        _format_cache.clear()
+    _format_cache[sec] = text
+    return text
+
+
+def _utc_offset(sec: int) -> int:
+    try:
+        return time.localtime(sec).tm_gmtoff
+    except (OverflowError, OSError, ValueError):
+        # за пределами time_t платформы (мусорная метка времени) — считаем UTC
+        return 0
+
+
+def _present_days(ts: np.ndarray) -> np.ndarray:
+    """Номера суток UTC (по возрастанию, без повторов), в которые попадает хотя бы одна метка ts."""
+    days = np.floor_divide(np.floor(ts).astype(np.int64), DAY_SECONDS)
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    if span <= len(days):
+        return first + np.flatnonzero(np.bincount(days - first, minlength=span))
+    # редкие метки с далёкими датами: массив на весь интервал не заводим
+    return np.unique(days)
+
+
+class UtcOffsets:
+    """
+    Смещение локального времени от UTC в сутках UTC days (номера суток от эпохи,
+    по возрастанию): bounds[i] — секунда, с которой действует offsets[i]
+    (переходы на летнее/зимнее время).
+
+    Смещение запрашивается на границах только тех суток, где есть события,
+    точная секунда перехода внутри суток находится двоичным поиском — за год
+    это несколько сотен вызовов localtime() вместо одного на событие, а одна
+    мусорная метка времени в далёком будущем добавляет пару вызовов, а не
+    по вызову на каждые сутки до неё.
+    """
+
+    def __init__(self, days: np.ndarray):
+        days = np.asarray(days, dtype=np.int64)
+        # начало и конец каждых суток: все секунды событий лежат между соседними точками
+        points = np.union1d(days, days + 1) * DAY_SECONDS
+
+        start = int(points[0])
+        bounds = [start]
+        offsets = [_utc_offset(start)]
+        for lo, hi in zip(points[:-1].tolist(), points[1:].tolist()):
+            off = _utc_offset(hi)
+            if off == offsets[-1]:
+                continue
+            if hi - lo <= DAY_SECONDS:
+                # переход где-то в (lo, hi]
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if _utc_offset(mid) == offsets[-1]:
+                        lo = mid
+                    else:
+                        hi = mid
+            # иначе (lo, hi) — промежуток без событий, переход можно отнести к hi
+            bounds.append(hi)
+            offsets.append(off)
+
+        self.bounds = np.array(bounds, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    @classmethod
+    def for_timestamps(cls, ts: np.ndarray) -> "UtcOffsets":
+        """Таблица смещений для суток, в которые попадают метки ts (unixtime без NaN, непустой)."""
+        return cls(_present_days(np.asarray(ts, dtype=np.float64)))
+
+    def local_seconds(self, ts: np.ndarray) -> np.ndarray:
+        """Unixtime (float64, без NaN) → целые "локальные" секунды (UTC + смещение)."""
+        sec = np.floor(ts).astype(np.int64)
+        idx = np.searchsorted(self.bounds, sec, side="right") - 1
+        np.clip(idx, 0, len(self.offsets) - 1, out=idx)
+        return sec + self.offsets[idx]
+
+
+def local_buckets(ts: np.ndarray, bucket_seconds: int = DAY_SECONDS) -> np.ndarray:
+    """
+    Номера локальных суток (или часов при bucket_seconds=HOUR_SECONDS) для массива
+    unixtime без NaN — целочисленной арифметикой, без datetime на каждое событие.
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    if not len(ts):
+        return np.empty(0, dtype=np.int64)
+    ts = np.clip(ts, -_MAX_SECONDS, _MAX_SECONDS)
+    return UtcOffsets.for_timestamps(ts).local_seconds(ts) // bucket_seconds
+
+
+def day_label(day: int) -> str:
+    """Номер локальных суток из local_buckets() → 'YYYY-MM-DD' ('?' — вне диапазона дат)."""
+    try:
+        return (_EPOCH_DATE + timedelta(days=int(day))).isoformat()
+    except OverflowError:
+        return "?"
+
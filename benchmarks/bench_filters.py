@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки отбора событий во вкладке 'События аудита'.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_filters                    # 1 000 000 синтетических событий
+    python -m benchmarks.bench_filters --events 5000000
+    python -m benchmarks.bench_filters --sort              # сортировка таблицы по колонкам
+    python -m benchmarks.bench_filters --log /path/audit.log --search sshd --search /exe=".*bash"/
+    python -m benchmarks.bench_filters --log /path/audit.log --query 'type=SYSCALL and (exe~/bash$/ or key=web_shell)'
+    python -m benchmarks.bench_filters --check            # язык запросов против перебора (AssertionError при расхождении)
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from audit_viewer.index import CodesIn, SuccessIn, TimeRange, filter_rows, narrow_rows, select_rows
+from audit_viewer.parser import parse_audit_log_file
+from audit_viewer.query import QueryError, parse_query
+from audit_viewer.sortorder import column_order, sorted_rows
+from audit_viewer.store import SUCCESS_UNKNOWN, EventStore
+from audit_viewer.textindex import TextContains, TextRegex, TrigramIndex
+
+
+def synthetic_store(n_events: int, seed: int = 1) -> EventStore:
+    """Хранилище со случайными событиями (без разбора журнала — только колонки для фильтров)."""
+    rnd = random.Random(seed)
+    types = ["SYSCALL"] * 6 + ["USER_AUTH", "USER_LOGIN", "USER_CMD", "EXECVE", "AVC"]
+    users = ["root", "analyst", "www-data", "postgres"] + [f"user{i}" for i in range(40)]
+    keys = [None, None, None, "exec", "web_shell", "passwd_changes", "sudo_log"]
+
+    def events():
+        ts = 1700000000.0
+        for i in range(n_events):
+            ts += rnd.random()
+            yield {
+                "timestamp": ts,
+                "event_id": 1000 + i,
+                "event_type": rnd.choice(types),
+                "user": rnd.choice(users),
+                "key": rnd.choice(keys),
+                "success": rnd.random() < 0.8,
+                "raw": "",
+            }
+
+    return EventStore(events())
+
+
+def _time(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_filters(store: EventStore):
+    """Отбор проверкой всех строк по колонкам против отбора через индексы (select_rows)."""
+    t0 = time.perf_counter()
+    store.index()
+    print(f"{'index build':36s} {time.perf_counter() - t0:10.3f} s")
+
+    lo, hi = store.time_range()
+
+    def code(name, value):
+        code = store.pools[name].code_of(value)
+        return [] if code is None else [code]
+
+    cases = [
+        ("time: 1 hour", [TimeRange(lo + (hi - lo) / 2, lo + (hi - lo) / 2 + 3600)]),
+        ("type=USER_AUTH", [TimeRange(lo, hi), CodesIn("event_type", code("event_type", "USER_AUTH"))]),
+        ("type+user+failed", [
+            TimeRange(lo, hi),
+            CodesIn("event_type", code("event_type", "SYSCALL")),
+            CodesIn("user", code("user", "analyst")),
+            SuccessIn([0, SUCCESS_UNKNOWN]),
+        ]),
+        ("key=web_shell, 1 day", [
+            TimeRange(hi - 86400, hi),
+            CodesIn("key", code("key", "web_shell")),
+        ]),
+    ]
+
+    all_rows = np.arange(len(store) - 1, -1, -1, dtype=np.int64)
+    for name, conditions in cases:
+        scan = _time(lambda: filter_rows(store, all_rows, conditions))
+        indexed = _time(lambda: select_rows(store, conditions)[::-1])
+        matches = len(select_rows(store, conditions))
+        print(f"{name:24s} {matches:10d} rows  scan {scan * 1000:8.2f} ms  index {indexed * 1000:8.2f} ms")
+
+
+def bench_text_search(store: EventStore, queries):
+    """Текстовый поиск перебором против поиска с индексом триграмм (подстрока или /регулярное выражение/)."""
+    def condition(query):
+        if len(query) > 2 and query.startswith("/") and query.endswith("/"):
+            return TextRegex(query[1:-1])
+        return TextContains(query)
+
+    conditions = {query: [condition(query)] for query in queries}
+
+    store.text_index = None
+    scan = {query: _time(lambda: select_rows(store, conds), repeat=1) for query, conds in conditions.items()}
+
+    t0 = time.perf_counter()
+    store.text_index = TrigramIndex.build(store)
+    print(f"{'trigram index build':36s} {time.perf_counter() - t0:10.3f} s")
+
+    for query, conds in conditions.items():
+        indexed = _time(lambda: select_rows(store, conds), repeat=1)
+        matches = len(select_rows(store, conds))
+        print(f"{query[:24]:24s} {matches:10d} rows  scan {scan[query] * 1000:8.2f} ms  index {indexed * 1000:8.2f} ms")
+
+    for query, conds in conditions.items():
+        if isinstance(conds[0], TextContains):
+            bench_typing(store, query)
+
+
+def bench_typing(store: EventStore, query: str):
+    """Ввод запроса по символу: каждый префикс отбирается заново против сужения результата предыдущего."""
+    rows, size = None, 0
+    for i in range(1, len(query) + 1):
+        conds = [TextContains(query[:i])]
+        full = _time(lambda: select_rows(store, conds), repeat=1)
+        if rows is None:
+            narrowed = full
+            rows = select_rows(store, conds)
+        else:
+            base = rows
+            narrowed = _time(lambda: narrow_rows(store, base, size, conds), repeat=1)
+            rows = narrow_rows(store, base, size, conds)
+        size = len(store)
+        print(f"typing {query[:i]!r:17s} {len(rows):10d} rows  full {full * 1000:8.2f} ms  narrowed {narrowed * 1000:8.2f} ms")
+
+
+def bench_queries(store: EventStore, queries):
+    """Запрос языка запросов: каждое условие по всем строкам против плана select_rows()."""
+    all_rows = np.arange(len(store), dtype=np.int64)
+    for query in queries:
+        conds = parse_query(query)
+        naive = _time(lambda: np.logical_and.reduce([cond.mask(store, all_rows) for cond in conds]), repeat=1)
+        planned = _time(lambda: select_rows(store, conds), repeat=1)
+        matches = len(select_rows(store, conds))
+        print(f"{query[:40]:40s} {matches:10d} rows  naive {naive * 1000:8.2f} ms  planned {planned * 1000:8.2f} ms")
+
+
+def bench_sorting(store: EventStore):
+    """
+    Сортировка таблицы по колонке: прежняя (str() значения каждой строки, sorted())
+    против перестановки колонки, посчитанной один раз, — для всех строк и для
+    отфильтрованной трети, в обе стороны.
+    """
+    all_rows = np.arange(len(store) - 1, -1, -1, dtype=np.int64)
+    third = select_rows(store, [SuccessIn([0, SUCCESS_UNKNOWN])])[::-1]
+    for name in ("time", "user", "event_type", "success"):
+        def by_str():
+            keys = ["" if v is None else str(v) for v in (store.value(int(r), name) for r in all_rows)]
+            return all_rows[np.asarray(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int64)]
+
+        old = _time(by_str, repeat=1)
+        t0 = time.perf_counter()
+        store.sort_orders.add(name, column_order(store, name))
+        build = time.perf_counter() - t0
+        asc = _time(lambda: sorted_rows(store, all_rows, name))
+        desc = _time(lambda: sorted_rows(store, all_rows, name, reverse=True))
+        subset = _time(lambda: sorted_rows(store, third, name))
+        print(f"sort {name:19s} str keys {old * 1000:9.1f} ms  build {build * 1000:7.1f} ms  "
+              f"all asc {asc * 1000:6.1f} ms  desc {desc * 1000:6.1f} ms  {len(third)} rows {subset * 1000:6.1f} ms")
+
+
+def query_check_events(n_events: int = 300, seed: int = 4):
+    """
+    Небольшой набор событий для проверки языка запросов: все поля, которые он
+    умеет отбирать, пропуски значений, пробелы, кавычки и точки в значениях.
+    """
+    rnd = random.Random(seed)
+    users = ["root", "alice", "bob smith", None]
+    comms = ["bash", "sshd", 'say "hi"', "cat", None]
+    exes = ["/usr/bin/bash", "/usr/sbin/sshd", "/bin/cat", "/opt/a.b/run", None]
+    keys = ["exec", "a.b", "axb", "passwd_changes", None]
+    syscalls = [(59, "execve"), (257, "openat"), (2, "open"), (None, None)]
+    names = ["/etc/passwd", "/etc/shadow", "/tmp/x y", "/home/alice/.ssh/id"]
+    events = []
+    for i in range(n_events):
+        syscall, syscall_name = rnd.choice(syscalls)
+        exe = rnd.choice(exes)
+        details = {"name": rnd.choice(names)}
+        if rnd.random() < 0.3:
+            details["name"] = rnd.sample(names, 2)
+        if rnd.random() < 0.5:
+            details["a0"] = rnd.choice(["ls", "-la", "0x1f"])
+        events.append({
+            "timestamp": None if rnd.random() < 0.05 else 1700000000.0 + i * 7.5,
+            "event_id": 1000 + i,
+            "event_type": rnd.choice(["SYSCALL", "SYSCALL", "USER_LOGIN", "USER_CMD", "EXECVE"]),
+            "user": rnd.choice(users),
+            "comm": rnd.choice(comms),
+            "exe": exe,
+            "key": rnd.choice(keys),
+            "pid": rnd.choice([None, 10, 31, 100, 1234, rnd.randint(1, 5000)]),
+            "exit": rnd.choice([None, 0, -13, 3]),
+            "syscall": syscall,
+            "syscall_name": syscall_name,
+            "success": rnd.choice([True, False, None]),
+            "details": details,
+            "raw": f"type=X msg=audit(1:{1000 + i}): exe={exe} " + rnd.choice(["Accepted", "sshd denied", "ok"]),
+        })
+    return events
+
+
+def _text(e) -> str:
+    """Текст поиска события — как textindex.search_texts()."""
+    return " ".join([e["comm"] or "", e["exe"] or "", e["raw"]]).lower()
+
+
+def _detail(e, key, predicate) -> bool:
+    value = e["details"].get(key)
+    values = value if isinstance(value, list) else [value]
+    return any(v is not None and predicate(str(v)) for v in values)
+
+
+def _query_table(t):
+    """(запрос, проверка события); t(i) — отметка времени i-го события."""
+    ts_iso = datetime.fromtimestamp(t(40)).isoformat(sep=" ")
+    return [
+        # поля, кавычки, экранирование
+        ("type=SYSCALL", lambda e: e["event_type"] == "SYSCALL"),
+        ("TYPE=syscall", lambda e: False),
+        ('user="bob smith"', lambda e: e["user"] == "bob smith"),
+        ("user='bob smith'", lambda e: e["user"] == "bob smith"),
+        ("user!=root", lambda e: e["user"] != "root"),
+        (r'comm="say \"hi\""', lambda e: e["comm"] == 'say "hi"'),
+        ("comm^=s", lambda e: e["comm"] is not None and e["comm"].startswith("s")),
+        ("exe$=bash", lambda e: e["exe"] is not None and e["exe"].endswith("bash")),
+        ("exe*=bin/", lambda e: e["exe"] is not None and "bin/" in e["exe"]),
+        ("exe~/bash$/", lambda e: e["exe"] is not None and re.search("bash$", e["exe"])),
+        ('exe~"^/usr/s?bin/"', lambda e: e["exe"] is not None and re.search("^/usr/s?bin/", e["exe"])),
+        (r"exe~/\/opt\/a\.b\//", lambda e: e["exe"] == "/opt/a.b/run"),
+        (r"key~/^a\.b$/", lambda e: e["key"] == "a.b"),
+        ("key~/^a.b$/", lambda e: e["key"] in ("a.b", "axb")),
+        ("key!~/^a/", lambda e: not (e["key"] is not None and e["key"].startswith("a"))),
+        ("syscall=openat", lambda e: e["syscall_name"] == "openat"),
+        ("syscall=257", lambda e: e["syscall"] == 257),
+        ("details.name^=/etc/", lambda e: _detail(e, "name", lambda v: v.startswith("/etc/"))),
+        ('details.name="/tmp/x y"', lambda e: _detail(e, "name", lambda v: v == "/tmp/x y")),
+        ("details.a0=0x1f", lambda e: _detail(e, "a0", lambda v: v == "0x1f")),
+        # числа: ведущие нули, 0x, отрицательные, пропуски
+        ("pid=10", lambda e: e["pid"] == 10),
+        ("pid=010", lambda e: e["pid"] == 10),
+        ("pid=0x1f", lambda e: e["pid"] == 31),
+        ("pid>=100", lambda e: e["pid"] is not None and e["pid"] >= 100),
+        ("pid<0100", lambda e: e["pid"] is not None and e["pid"] < 100),
+        ("pid!=10", lambda e: e["pid"] != 10),
+        ("exit<0", lambda e: e["exit"] is not None and e["exit"] < 0),
+        ("exit=-13", lambda e: e["exit"] == -13),
+        ("id>1100 id<=1105", lambda e: 1100 < e["event_id"] <= 1105),
+        # время: события без времени проходят
+        (f"time>={t(40):.1f}", lambda e: e["timestamp"] is None or e["timestamp"] >= t(40)),
+        (f"time>{t(40):.1f}", lambda e: e["timestamp"] is None or e["timestamp"] > t(40)),
+        (f'time<"{ts_iso}"', lambda e: e["timestamp"] is None or e["timestamp"] < t(40)),
+        (f'time<="{ts_iso}" and time>={t(10):.1f}',
+         lambda e: e["timestamp"] is None or t(10) <= e["timestamp"] <= t(40)),
+        # статус, текст
+        ("success=no", lambda e: e["success"] is False),
+        ("success=unknown", lambda e: e["success"] is None),
+        ("sshd", lambda e: "sshd" in _text(e)),
+        ('"sshd denied"', lambda e: "sshd denied" in _text(e)),
+        ("text~/ACCEPTED$/", lambda e: re.search("accepted$", _text(e))),
+        ("raw*=Denied", lambda e: "denied" in _text(e)),
+        # not / and / or: not сильнее and, and сильнее or; and можно опустить
+        ("not type=SYSCALL or user=root", lambda e: e["event_type"] != "SYSCALL" or e["user"] == "root"),
+        ("type=SYSCALL or user=root and success=no",
+         lambda e: e["event_type"] == "SYSCALL" or (e["user"] == "root" and e["success"] is False)),
+        ("(type=SYSCALL or user=root) and success=no",
+         lambda e: (e["event_type"] == "SYSCALL" or e["user"] == "root") and e["success"] is False),
+        ("user=root exe$=bash or key=exec",
+         lambda e: (e["user"] == "root" and (e["exe"] or "").endswith("bash")) or e["key"] == "exec"),
+        ("NOT not key=exec", lambda e: e["key"] == "exec"),
+        ("not (user=alice or user=root) and pid>100",
+         lambda e: e["user"] not in ("alice", "root") and e["pid"] is not None and e["pid"] > 100),
+        ("((key=exec) or (not (key=axb or key=a.b))) AND type!=EXECVE",
+         lambda e: (e["key"] == "exec" or e["key"] not in ("axb", "a.b")) and e["event_type"] != "EXECVE"),
+        # слова, начинающиеся с and/or/not, — не ключевые слова
+        ("nothing or order or accepted", lambda e: any(w in _text(e) for w in ("nothing", "order", "accepted"))),
+    ]
+
+
+# Запросы с ошибкой: (запрос, часть сообщения QueryError)
+QUERY_ERRORS = [
+    ("()", "ожидалось условие"),
+    ("(user=root or )", "ожидалось условие"),
+    ("not ()", "ожидалось условие"),
+    ("user=root)", "лишняя закрывающая скобка"),
+    (")", "лишняя закрывающая скобка"),
+    ("(user=root", "нет закрывающей скобки"),
+    ("pid=>1", "начинается с оператора"),
+    ("user==root", "начинается с оператора"),
+    ("exe=~bash", "начинается с оператора"),
+    ("user=", "ожидалось значение"),
+    ("and user=root", "ожидалось условие перед and"),
+    ("user=root or", "запрос оборвался"),
+    ('user="root', "нет закрывающего"),
+    ("exe~/[/", "ошибка в регулярном выражении"),
+    ("pid>abc", "сравнивается с числом"),
+    ("time=1", "время сравнивается только"),
+    ("time>yesterday", "не удалось разобрать время"),
+    ("success=maybe", "статус задаётся"),
+    ("nosuch=1", "неизвестное поле"),
+]
+
+
+def check_queries():
+    """
+    parse_query() против перебора: для каждого запроса таблицы строки, которые
+    отбирают filter_rows() и select_rows() (через индексы), совпадают с
+    проверкой каждого события на Python; запросы с ошибкой дают QueryError.
+    """
+    events = query_check_events()
+    store = EventStore(events)
+    store.index()
+    all_rows = np.arange(len(store), dtype=np.int64)
+    table = _query_table(lambda i: 1700000000.0 + i * 7.5)
+    for query, predicate in table:
+        expected = [row for row, e in enumerate(events) if predicate(e)]
+        conditions = parse_query(query)
+        for name, rows in (("filter_rows", filter_rows(store, all_rows, conditions)),
+                           ("select_rows", select_rows(store, conditions))):
+            assert rows.tolist() == expected, (
+                f"{query!r} ({name}): {len(rows)} строк, перебором {len(expected)}; "
+                f"лишние {sorted(set(rows.tolist()) - set(expected))[:5]}, "
+                f"пропущены {sorted(set(expected) - set(rows.tolist()))[:5]}"
+            )
+    for query, message in QUERY_ERRORS:
+        try:
+            parse_query(query)
+        except QueryError as e:
+            assert message in str(e), f"{query!r}: {e}, ожидалось «{message}»"
+        else:
+            raise AssertionError(f"{query!r}: нет QueryError («{message}»)")
+    print(f"{'query == brute force':36s} {len(table):10d} queries  {len(QUERY_ERRORS)} errors  ({len(store)} events)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, default=1000000, help="событий в синтетическом хранилище")
+    ap.add_argument("--log", help="журнал для замера текстового поиска (вместо синтетического хранилища)")
+    ap.add_argument("--search", action="append", default=[], help="запрос текстового поиска (можно несколько)")
+    ap.add_argument("--query", action="append", default=[], help="выражение языка запросов (можно несколько)")
+    ap.add_argument("--sort", action="store_true", help="замерить сортировку таблицы вместо фильтров")
+    ap.add_argument("--check", action="store_true",
+                    help="только проверки: язык запросов против перебора событий, ошибки в запросах")
+    args = ap.parse_args(argv)
+
+    if args.check:
+        check_queries()
+        print("checks passed")
+        return 0
+
+    if args.log:
+        t0 = time.perf_counter()
+        store = EventStore(reversed(parse_audit_log_file(args.log, workers=os.cpu_count() or 1)))
+        print(f"{'store build':36s} {time.perf_counter() - t0:10.3f} s  ({len(store)} events)")
+        store.index()
+        if args.query:
+            bench_queries(store, args.query)
+        if args.search or not args.query:
+            bench_text_search(store, args.search or ["sshd", "success=no", "/exe=\".*bash\"/"])
+        return 0
+
+    t0 = time.perf_counter()
+    store = synthetic_store(args.events)
+    print(f"{'store build':36s} {time.perf_counter() - t0:10.3f} s  ({len(store)} events)")
+    if args.sort:
+        bench_sorting(store)
+    else:
+        bench_filters(store)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
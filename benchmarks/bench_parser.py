@@ -0,0 +1,694 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки разбора журналов auditd.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_parser                  # синтетический журнал
+    python -m benchmarks.bench_parser /path/audit.log  # свой файл
+    python -m benchmarks.bench_parser --events 1000000 --memory-only  # память на событие
+    python -m benchmarks.bench_parser --paths 8        # журнал с 8 PATH на SYSCALL
+    python -m benchmarks.bench_parser --enriched       # журнал в формате log_format=ENRICHED
+    python -m benchmarks.bench_parser --first-rows     # время до первых строк таблицы
+    python -m benchmarks.bench_parser --check          # проверки (AssertionError при расхождении)
+"""
+import argparse
+import gc
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from audit_viewer.event import EventDetails
+from audit_viewer.event_filter import EventFilter, iter_filtered_events
+from audit_viewer.follow import AuditLogFollower
+from audit_viewer.identity import IdentityResolver
+from audit_viewer.index import CodesIn, TimeRange, filter_rows
+from audit_viewer.parser import (
+    AUDIT_HEADER_BYTES_RE,
+    AUDIT_LINE_RE,
+    DEFAULT_REORDER_RECORDS,
+    DEFAULT_REORDER_SECONDS,
+    FIELD_RE,
+    _merge_fields_to_details,
+    _parse_audit_log_file_parallel,
+    _parse_chunk,
+    _split_byte_ranges,
+    _stitch_chunks,
+    _tokenize_fields_bytes,
+    event_sort_key,
+    iter_audit_events,
+    iter_audit_records,
+    iter_audit_records_mmap,
+    parse_audit_line,
+    parse_audit_line_bytes,
+    parse_audit_log_file,
+    parse_audit_log_file_checkpoint,
+    parse_audit_log_tail,
+    tokenize_fields,
+)
+from audit_viewer.rawtext import register_raw_file
+from audit_viewer.store import EventStore
+
+# Эталонные строки для токенизатора: непарные кавычки, вложенный msg='...',
+# висящая res=failed', hex-значения, ENRICHED, патологическая строка для
+# FIELD_RE и PROCTITLE на несколько МБ
+TOKENIZER_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tokenizer_corpus.log.gz")
+
+
+def generate_synthetic_log(path: str, n_events: int, seed: int = 1, paths: int = 1, enriched: bool = False):
+    """
+    Пишет синтетический журнал: SYSCALL+CWD+PATH+PROCTITLE+EOE, USER_AUTH, USER_CMD.
+    paths — сколько PATH-record'ов у каждого SYSCALL.
+    enriched — дописывать секцию переводов log_format=ENRICHED (\x1d AUID=... UID=...).
+    """
+    rnd = random.Random(seed)
+    ts = 1700000000.0
+    uids = ["0", "1000", "33", "4294967295"]
+    exes = ["/usr/bin/bash", "/usr/bin/cat", "/usr/bin/vim", "/usr/sbin/sshd"]
+    names = {"0": "root", "1000": "analyst", "33": "www-data", "4294967295": "unset"}
+
+    def tr(**values):
+        if not enriched:
+            return ""
+        return "\x1d" + " ".join(f'{k}="{v}"' if k not in ("ARCH", "SYSCALL") else f"{k}={v}"
+                                 for k, v in values.items())
+
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_events):
+            ts += rnd.random()
+            eid = 1000 + i
+            hdr = f"msg=audit({ts:.3f}:{eid}):"
+            r = rnd.random()
+            if r < 0.5:
+                uid = rnd.choice(uids)
+                exe = rnd.choice(exes)
+                f.write(
+                    f"type=SYSCALL {hdr} arch=c000003e syscall=257 success={rnd.choice(['yes', 'no'])} "
+                    f"exit=3 a0=ffffff9c a1=7ffd a2=0 a3=0 items={paths} ppid=1 pid={rnd.randint(100, 99999)} "
+                    f"auid={uid} uid={uid} gid=0 euid={uid} suid=0 fsuid=0 egid=0 sgid=0 fsgid=0 "
+                    f"tty=pts0 ses=1 comm=\"{exe.rsplit('/', 1)[1]}\" exe=\"{exe}\" key=\"passwd_changes\""
+                    + tr(ARCH="x86_64", SYSCALL="openat", AUID=names[uid], UID=names[uid], GID="root",
+                         EUID=names[uid], SUID="root", FSUID="root", EGID="root", SGID="root", FSGID="root")
+                    + "\n"
+                    f"type=CWD {hdr} cwd=\"/root\"\n"
+                    + "".join(
+                        f"type=PATH {hdr} item={item} name=\"/etc/passwd\" inode={1 + item} dev=fd:00 "
+                        f"mode=0100644 ouid=0 ogid=0 rdev=00:00 nametype=NORMAL{tr(OUID='root', OGID='root')}\n"
+                        for item in range(paths)
+                    )
+                    + f"type=PROCTITLE {hdr} proctitle=2F7573722F62696E2F636174\n"
+                    f"type=EOE {hdr}\n"
+                )
+            elif r < 0.8:
+                f.write(
+                    f"type=USER_AUTH {hdr} pid=1 uid=0 auid=4294967295 ses=4294967295 "
+                    f"msg='op=PAM:authentication grantors=? acct=\"root\" exe=\"/usr/sbin/sshd\" "
+                    f"hostname=10.0.0.{rnd.randint(1, 9)} addr=10.0.0.{rnd.randint(1, 9)} terminal=ssh "
+                    f"res={rnd.choice(['success', 'failed'])}'{tr(UID='root', AUID='unset')}\n"
+                )
+            else:
+                f.write(
+                    f"type=USER_CMD {hdr} pid=2 uid=1000 auid=1000 ses=2 "
+                    f"msg='cwd=\"/home/user\" cmd=6C73 terminal=pts/0 res=success'{tr(UID='analyst', AUID='analyst')}\n"
+                )
+
+
+def generate_interleaved_log(path: str, n_events: int, seed: int = 2):
+    """
+    Журнал с неудобными для разбора кусками местами: record'ы двух событий
+    вперемешку, одинокий EOE в начале файла, USER_LOGIN без EOE, EXECVE
+    с hex-аргументами, PATH-record'ы одного события с разным числом строк.
+    """
+    rnd = random.Random(seed)
+    ts = 1700000000.0
+    eid = 5000
+
+    with open(path, "w", encoding="utf-8") as f:
+        # EOE события, начало которого осталось в предыдущем файле
+        f.write(f"type=EOE msg=audit({ts:.3f}:{eid - 1}):\n")
+        written = 0
+        while written < n_events:
+            ts += rnd.random()
+            a, b = eid, eid + 1
+            eid += 2
+            ha = f"msg=audit({ts:.3f}:{a}):"
+            hb = f"msg=audit({ts + 0.001:.3f}:{b}):"
+            n_paths = rnd.randint(0, 3)
+            lines = [
+                f"type=SYSCALL {ha} arch=c000003e syscall=59 success=yes exit=0 items={n_paths} ppid=1 "
+                f"pid={rnd.randint(100, 9999)} auid=1000 uid=1000 comm=\"bash\" exe=\"/usr/bin/bash\" key=\"exec\"",
+                f"type=SYSCALL {hb} arch=c000003e syscall=257 success=no exit=-13 items=1 ppid=1 "
+                f"pid={rnd.randint(100, 9999)} auid=0 uid=0 comm=\"cat\" exe=\"/usr/bin/cat\" key=\"passwd_changes\"",
+                f"type=EXECVE {ha} argc=3 a0=\"ls\" a1=2D6C61 a2=\"/tmp/a b\"",
+                f"type=CWD {hb} cwd=\"/root\"",
+                f"type=CWD {ha} cwd=2F686F6D652F7573657220646972",
+            ]
+            lines += [f"type=PATH {ha} item={i} name=\"/etc/file{i}\" nametype=NORMAL" for i in range(n_paths)]
+            lines += [
+                f"type=PATH {hb} item=0 name=\"/etc/shadow\" nametype=NORMAL",
+                f"type=PROCTITLE {ha} proctitle=6C73002D6C61",
+                f"type=EOE {ha}",
+                f"type=PROCTITLE {hb} proctitle=636174002F6574632F736861646F77",
+                f"type=EOE {hb}",
+            ]
+            if rnd.random() < 0.3:
+                hl = f"msg=audit({ts + 0.002:.3f}:{eid}):"
+                eid += 1
+                lines.insert(rnd.randint(0, len(lines)),
+                             f"type=USER_LOGIN {hl} pid=1 uid=0 auid=1000 ses=3 msg='op=login acct=\"analyst\" "
+                             f"exe=\"/usr/sbin/sshd\" hostname=? addr=10.0.0.1 terminal=ssh res=failed'")
+                written += 1
+            f.write("\n".join(lines) + "\n")
+            written += 2
+
+
+def check_parallel(path: str, chunk_counts, workers: int):
+    """
+    Параллельный разбор (куски + склейка) даёт те же события, что последовательный,
+    включая сырой текст: разбор на chunk_counts кусков (границы кусков попадают
+    внутрь событий) и один разбор через пул из workers процессов.
+    """
+    identities = IdentityResolver()
+    file_id = register_raw_file(path)
+    serial = parse_audit_log_file(path, workers=1, file_id=file_id, identities=identities)
+    # to_dict() читает raw — сравнивается текст, а не ссылки на строки файла
+    expected = [ev.to_dict() for ev in serial]
+
+    def compare(label, events):
+        events.sort(key=event_sort_key, reverse=True)
+        got = [ev.to_dict() for ev in events]
+        if got == expected:
+            return
+        for i, (want, have) in enumerate(zip(expected, got)):
+            if want != have:
+                raise AssertionError(f"{label}: событие #{i} отличается\nserial:   {want!r}\nparallel: {have!r}")
+        raise AssertionError(f"{label}: {len(got)} событий, последовательно — {len(expected)}")
+
+    for n_chunks in chunk_counts:
+        ranges = _split_byte_ranges(path, n_chunks)
+        results = [
+            _parse_chunk(path, start, end, DEFAULT_REORDER_RECORDS, DEFAULT_REORDER_SECONDS, file_id, identities)
+            for start, end in ranges
+        ]
+        compare(f"{len(ranges)} chunks", _stitch_chunks(results, identities))
+
+    compare(f"workers={workers}", _parse_audit_log_file_parallel(path, workers, file_id, identities))
+    print(f"{'parallel == serial':28s} {len(expected):10d} events  {len(chunk_counts)} chunkings + pool of {workers}")
+
+
+def check_identities(tmp: str):
+    """
+    Снимок passwd/group другого хоста (IdentityResolver.from_files()): имена
+    берутся только из снимка, отсутствие имени не уходит в системные базы;
+    переводы ENRICHED (AUID=, UID=, OGID=, ...) важнее снимка — и в поле user
+    при разборе, и в describe() для details.
+    """
+    passwd = os.path.join(tmp, "passwd")
+    group = os.path.join(tmp, "group")
+    with open(passwd, "w", encoding="utf-8") as f:
+        f.write("# снимок\n"
+                "toor:x:0:0:root:/root:/bin/bash\n"
+                "alice:x:1000:1000::/home/alice:/bin/bash\n"
+                "alice2:x:1000:1000:повтор uid — побеждает первая запись:/:/bin/sh\n"
+                "broken:x:notanumber:0::/:\n"
+                "short:x\n")
+    with open(group, "w", encoding="utf-8") as f:
+        f.write("wheel:x:0:\nstaff:x:50:alice\n")
+
+    ids = IdentityResolver.from_files(passwd, group)
+    assert ids.is_snapshot
+    assert ids.user_name(0) == "toor", ids.user_name(0)
+    assert ids.user_name(1000) == "alice", ids.user_name(1000)
+    # uid 1 есть почти в любой системе (daemon), но не в снимке
+    assert ids.user_name(1) is None and ids.user_name(1) is None
+    assert ids.group_name(50) == "staff" and ids.group_name(1000) is None
+
+    for auid, uid, want in (
+            ("1000", "0", "alice (1000)"),
+            (None, "1000", "alice (1000)"),
+            ("4294967295", "0", "unset"),
+            ("-1", None, "unset"),
+            ("0", None, "root (0)"),
+            ("4242", None, "4242"),
+            ("1000 (alice)", None, "alice (1000)"),
+            ("abc", None, "abc"),
+            (None, None, "?"),
+    ):
+        got = ids.resolve_user(auid, uid)
+        assert got == want, f"resolve_user({auid!r}, {uid!r}) = {got!r}, ожидалось {want!r}"
+
+    for field, value, translations, want in (
+            ("uid", "1000", None, "1000 (alice)"),
+            ("uid", "1000", {"UID": "bob"}, "1000 (bob)"),
+            ("euid", "4242", {}, "4242"),
+            ("gid", "4294967295", None, "4294967295 (unset)"),
+            ("ogid", "50", {"OGID": "wheel"}, "50 (wheel)"),
+            ("ogid", ["0", "50"], {"OGID": ["root", "users"]}, str(["0 (root)", "50 (users)"])),
+            # переводов меньше, чем PATH — имена из снимка
+            ("ogid", ["0", "50"], {"OGID": ["root"]}, str(["0 (wheel)", "50 (staff)"])),
+            ("ouid", ["1000"], {"OUID": "bob"}, str(["1000 (alice)"])),
+            ("uid", "abc", None, "abc"),
+            ("comm", "bash", {"COMM": "x"}, "bash"),
+    ):
+        got = ids.describe(field, value, translations)
+        assert got == want, f"describe({field!r}, {value!r}, {translations!r}) = {got!r}, ожидалось {want!r}"
+
+    # при разборе: ENRICHED-перевод важнее снимка, без перевода — снимок
+    log = os.path.join(tmp, "identity.log")
+    with open(log, "w", encoding="utf-8") as f:
+        for eid, auid, tr in ((1, "1000", '\x1dAUID="bob" UID="root"'), (2, "1000", ""),
+                              (3, "1000", '\x1dAUID="unset" UID="root"'), (4, "4294967295", '\x1dAUID="unset"')):
+            hdr = f"msg=audit(1700000000.{eid:03d}:{eid}):"
+            f.write(f"type=SYSCALL {hdr} syscall=2 success=yes auid={auid} uid=0 comm=\"cat\"{tr}\n"
+                    f"type=EOE {hdr}\n")
+    users = {ev["event_id"]: ev["user"] for ev in parse_audit_log_file(log, identities=ids)}
+    want = {1: "bob (1000)", 2: "alice (1000)", 3: "alice (1000)", 4: "unset"}
+    assert users == want, f"user при разборе: {users!r}, ожидалось {want!r}"
+    print(f"{'identity snapshot':28s} ok")
+
+
+def _follow_lines(eid: int, eoe: bool = True) -> str:
+    hdr = f"msg=audit(1700000000.{eid % 1000:03d}:{eid}):"
+    if not eoe:
+        return (f"type=USER_LOGIN {hdr} pid=1 uid=0 auid=1000 ses=3 msg='op=login acct=\"analyst\" "
+                f"exe=\"/usr/sbin/sshd\" hostname=? addr=10.0.0.1 terminal=ssh res=success'\n")
+    return (f"type=SYSCALL {hdr} syscall=2 success=yes auid=1000 uid=0 comm=\"cat\" exe=\"/usr/bin/cat\"\n"
+            f"type=PATH {hdr} item=0 name=\"/etc/passwd\" nametype=NORMAL\n"
+            f"type=EOE {hdr}\n")
+
+
+def check_follower(tmp: str):
+    """
+    Полная загрузка + слежение (follow.AuditLogFollower) отдают каждое событие
+    ровно один раз: строки, дописанные во время разбора (в т.ч. дописывание
+    недописанной строки), ротация с дописыванием в переименованный файл,
+    момент ротации без нового файла, усечение (copytruncate) и событие без EOE.
+    """
+    path = os.path.join(tmp, "follow", "audit.log")
+    os.makedirs(os.path.dirname(path))
+
+    def append(text, target=path):
+        with open(target, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def ids(events):
+        # событие, собранное из обрывков строк, отличается типом или comm — не только id
+        got = sorted((ev["event_id"], ev["event_type"], ev["comm"]) for ev in events)
+        return [eid for eid, _, _ in got] if all(
+            (event_type, comm) in (("SYSCALL", "cat"), ("USER_LOGIN", "")) for _, event_type, comm in got
+        ) else got
+
+    late = _follow_lines(5)
+    cut = late.index("):") + 20
+    append("".join(_follow_lines(i) for i in range(5)) + late[:cut])  # последняя строка недописана
+
+    def grow_during_parse(done_bytes, events):
+        # auditd пишет дальше, пока файл разбирается
+        append(late[cut:] + _follow_lines(6) + _follow_lines(7))
+
+    events, checkpoint = parse_audit_log_file_checkpoint(path, progress=grow_during_parse)
+    assert ids(events) == [0, 1, 2, 3, 4], f"разбор: {ids(events)}"
+
+    follower = AuditLogFollower.from_checkpoint(checkpoint, idle_flush_seconds=0)
+    steps = []
+
+    def step(label, want):
+        got = ids(follower.poll())
+        assert got == want, f"{label}: получены {got}, ожидались {want}"
+        steps.append(label)
+
+    try:
+        step("дописано во время разбора", [5, 6, 7])
+        step("без изменений", [])
+        append(_follow_lines(8))
+        step("дописано", [8])
+
+        # ротация: старый файл переименован и ещё дописан, новый создан
+        append(_follow_lines(9))
+        os.rename(path, path + ".1")
+        append(_follow_lines(10), path + ".1")
+        step("момент ротации (нового файла ещё нет)", [9, 10])
+        append(_follow_lines(11), path + ".1")
+        append(_follow_lines(12))
+        step("ротация", [11, 12])
+        append(_follow_lines(13) + _follow_lines(14))
+        step("дописано после ротации", [13, 14])
+
+        # copytruncate: тот же inode, файл начинается заново и короче прочитанного
+        with open(path, "r+b") as f:
+            f.truncate(0)
+        append(_follow_lines(15))
+        step("усечение", [15])
+
+        # USER_LOGIN без EOE отдаётся по таймауту (idle_flush_seconds=0 — сразу)
+        append(_follow_lines(16, eoe=False) + _follow_lines(17))
+        step("событие без EOE", [16, 17])
+    finally:
+        follower.close()
+    print(f"{'follow == once':28s} {len(steps):10d} steps")
+
+
+def _panel_rows(store: EventStore, event_filter: EventFilter) -> np.ndarray:
+    """Отбор в GUI (как EventsTabMixin._panel_conditions) по тем же условиям, что и event_filter."""
+    conditions = [TimeRange(event_filter.time_from, event_filter.time_to)]
+    for name, values in (("event_type", event_filter.event_types), ("user", event_filter.users)):
+        if values:
+            (value,) = values
+            code = store.pools[name].code_of(value)
+            conditions.append(CodesIn(name, [] if code is None else [code]))
+    if event_filter.keys:
+        (key_filter,) = event_filter.keys
+        conditions.append(CodesIn("key", store.pools["key"].codes_where(lambda v: key_filter in v.lower())))
+    return filter_rows(store, np.arange(len(store), dtype=np.int64), conditions)
+
+
+def check_pushdown(path: str, n_filters: int = 200, seed: int = 3):
+    """
+    Отбор при чтении журнала (iter_filtered_events — helper/сборщик) против
+    отбора в GUI по уже загруженным событиям: для случайных фильтров панели
+    (время, тип, пользователь, ключ — по отдельности и вместе) должны
+    получаться одни и те же события.
+    """
+    rnd = random.Random(seed)
+    identities = IdentityResolver()
+    store = EventStore(parse_audit_log_file(path, identities=identities))
+    ts_min, ts_max = store.time_range()
+    types = [v for v in store.pools["event_type"].values if v] + ["NO_SUCH_TYPE"]
+    users = [v for v in store.pools["user"].values if v] + ["nobody_here"]
+    keys = ["passwd", "EXEC", "_ch", "x", "no_such_key"]
+
+    def key_of(ev):
+        return ev["event_id"], ev["timestamp"], ev["event_type"], ev["user"]
+
+    for i in range(n_filters):
+        # границы — целые секунды, как у полей 'Время от'/'Время до'
+        a, b = sorted(rnd.randint(int(ts_min) - 5, int(ts_max) + 5) for _ in range(2))
+        event_filter = EventFilter(
+            time_from=a if rnd.random() < 0.6 else None,
+            time_to=b if rnd.random() < 0.6 else None,
+            event_types=[rnd.choice(types)] if rnd.random() < 0.4 else None,
+            keys=[rnd.choice(keys)] if rnd.random() < 0.3 else None,
+            users=[rnd.choice(users)] if rnd.random() < 0.4 else None,
+        )
+        with open(path, "rb") as f:
+            got = sorted(key_of(ev) for ev in iter_filtered_events(f, event_filter, identities))
+        expected = sorted(key_of(store.row(row)) for row in _panel_rows(store, event_filter))
+        assert got == expected, (
+            f"{os.path.basename(path)}: фильтр #{i} {event_filter.to_dict()}: "
+            f"при чтении {len(got)} событий, в GUI {len(expected)}; "
+            f"лишние {sorted(set(got) - set(expected))[:3]}, пропущены {sorted(set(expected) - set(got))[:3]}"
+        )
+    print(f"{'pushdown == GUI filter':28s} {n_filters:10d} filters  {len(store)} events")
+
+
+def run_checks(tmp: str):
+    """Все проверки --check; при расхождении — AssertionError."""
+    check_tokenizer(TOKENIZER_CORPUS)
+    check_identities(tmp)
+    check_follower(tmp)
+
+    logs = []
+    for name, generate in (
+            ("plain.log", lambda p: generate_synthetic_log(p, 1500, paths=3)),
+            ("enriched.log", lambda p: generate_synthetic_log(p, 1500, enriched=True)),
+            ("interleaved.log", lambda p: generate_interleaved_log(p, 1500)),
+    ):
+        path = os.path.join(tmp, name)
+        generate(path)
+        logs.append(path)
+
+    workers = max(2, min(os.cpu_count() or 1, 8))
+    for path in logs:
+        with open(path, "rb") as f:
+            n_lines = sum(1 for _ in f)
+        # от пары кусков до куска на строку — граница проходит внутри каждого многострочного события
+        chunk_counts = list(range(2, 40)) + [61, 127, 509, 1021, n_lines // 3, n_lines // 2, n_lines]
+        print(os.path.basename(path))
+        check_parallel(path, chunk_counts, workers)
+        check_pushdown(path)
+
+
+def _measure(name: str, path: str, records_iter):
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+
+    collections = [0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            collections[0] += 1
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    try:
+        t0 = time.perf_counter()
+        n = 0
+        for _ in records_iter():
+            n += 1
+        elapsed = time.perf_counter() - t0
+    finally:
+        gc.callbacks.remove(on_gc)
+
+    print(f"{name:28s} {n:10d} records  {elapsed:8.2f} s  {size_mb / elapsed:8.1f} MB/s  "
+          f"gc runs: {collections[0]}")
+
+
+def bench_readers(path: str):
+    """Сравнение чтения в текстовом режиме + str-регулярки и mmap + bytes."""
+    def text_reader():
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            yield from iter_audit_records(f)
+
+    def mmap_reader():
+        yield from iter_audit_records_mmap(path)
+
+    _measure("text + str regex", path, text_reader)
+    _measure("mmap + bytes", path, mmap_reader)
+
+
+def legacy_fields(data: str):
+    """Прежний разбор полей через FIELD_RE — эталон для tokenize_fields()."""
+    fields = {}
+    for fm in FIELD_RE.finditer(data):
+        key = fm.group(1)
+        value = fm.group(2)
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
+            value = value[1:-1]
+        elif value.endswith("'"):
+            value = value[:-1]
+        fields[key] = value
+    return fields
+
+
+def _short(text, limit: int = 200) -> str:
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
+
+
+def check_tokenizer(path: str) -> int:
+    """
+    tokenize_fields() и bytes-разбор (mmap-чтение) против FIELD_RE на каждой
+    строке файла (.gz читается через gzip); при расхождении — AssertionError
+    с первой несовпавшей строкой. Возвращает число проверенных строк.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    n = 0
+    t0 = time.perf_counter()
+    with opener(path, "rb") as f:
+        for raw in f:
+            line_b = raw.strip()
+            line = line_b.decode("utf-8", errors="ignore")
+            m = AUDIT_LINE_RE.match(line)
+            if not m:
+                continue
+            data = m.group("data") or ""
+            n += 1
+
+            expected = legacy_fields(data)
+            assert tokenize_fields(data) == expected, f"tokenize_fields != FIELD_RE: {_short(line)!r}"
+            header = AUDIT_HEADER_BYTES_RE.match(line_b)
+            assert header, f"bytes-заголовок не разобран: {_short(line)!r}"
+            assert _tokenize_fields_bytes(line_b, header.end()) == expected, \
+                f"_tokenize_fields_bytes != FIELD_RE: {_short(line)!r}"
+            rec = parse_audit_line(line)
+            rec_b = parse_audit_line_bytes(raw)
+            assert rec == rec_b, f"parse_audit_line_bytes != parse_audit_line: {_short(line)!r}"
+
+    assert n, f"в {path} нет строк audit"
+    print(f"{'tokenizer == FIELD_RE':28s} {n:10d} lines  {time.perf_counter() - t0:8.2f} s  "
+          f"({os.path.basename(path)})")
+    return n
+
+
+def bench_tokenizer(path: str):
+    """Проверка tokenize_fields() на эталоне (эталонные строки и каждая строка файла) и сравнение скорости с FIELD_RE."""
+    check_tokenizer(TOKENIZER_CORPUS)
+    check_tokenizer(path)
+
+    corpus = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = AUDIT_LINE_RE.match(line.strip())
+            if m:
+                corpus.append(m.group("data"))
+
+    for name, func in (("FIELD_RE", legacy_fields), ("tokenize_fields", tokenize_fields)):
+        t0 = time.perf_counter()
+        for data in corpus:
+            func(data)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:28s} {elapsed:8.2f} s  {len(corpus) / elapsed / 1000:8.1f} k lines/s")
+
+    # патологическая строка: длинное "слово" без '=' (hex после незакрытой кавычки)
+    bad = 'proctitle="' + " " + "A" * 20000 + " res=failed'"
+    results = []
+    for name, func in (("FIELD_RE (pathological)", legacy_fields),
+                       ("tokenize_fields (pathol.)", tokenize_fields)):
+        t0 = time.perf_counter()
+        results.append(func(bad))
+        print(f"{name:28s} {time.perf_counter() - t0:8.3f} s")
+    assert results[0] == results[1], "tokenize_fields != FIELD_RE на патологической строке"
+
+
+def _copy_str(value):
+    """Новый (не интернированный) объект строки — как отдавал прежний разбор."""
+    if isinstance(value, str) and len(value) > 1:
+        return (value + " ")[:-1]
+    return value
+
+
+def legacy_event_dict(ev):
+    """Событие в прежнем виде: dict на каждое событие, строки и имена полей не интернированы."""
+    d = {name: _copy_str(value) for name, value in ev.items()}
+    d["details"] = {_copy_str(k): v for k, v in ev["details"].items()}
+    return d
+
+
+def _traced_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        current, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def bench_event_memory(path: str):
+    """
+    Память на событие: прежние dict'ы против AuditEvent (__slots__ + интернирование)
+    и AuditEvent со ссылками на строки файла (raw_spans) вместо сырого текста.
+    """
+    legacy, legacy_bytes = _traced_bytes(lambda: [legacy_event_dict(ev) for ev in iter_audit_events(path)])
+    n = len(legacy)
+    sample_dict = legacy[0] if legacy else None
+    del legacy
+
+    events, slots_bytes = _traced_bytes(lambda: list(iter_audit_events(path)))
+    sample_event = events[0] if events else None
+    del events
+
+    file_id = register_raw_file(path)
+    _spans, spans_bytes = _traced_bytes(lambda: list(iter_audit_events(path, file_id=file_id)))
+    del _spans
+
+    if not n:
+        print("no events")
+        return
+
+    print(f"events: {n}")
+    print(f"{'dict per event':28s} {legacy_bytes / n:8.0f} B/event  (container {sys.getsizeof(sample_dict)} B)")
+    print(f"{'AuditEvent (__slots__)':28s} {slots_bytes / n:8.0f} B/event  (container {sys.getsizeof(sample_event)} B)")
+    print(f"{'AuditEvent + raw_spans':28s} {spans_bytes / n:8.0f} B/event")
+    for name, value in (("reduction (__slots__)", slots_bytes), ("reduction (+ raw_spans)", spans_bytes)):
+        print(f"{name:28s} {(legacy_bytes - value) / n:8.0f} B/event  "
+              f"({100.0 * (legacy_bytes - value) / legacy_bytes:.1f} %)")
+
+
+def bench_details(path: str):
+    """details: сборка целиком для каждого события против ленивого EventDetails."""
+    groups = {}
+    for rec in iter_audit_records_mmap(path):
+        groups.setdefault(rec["event_id"], []).append(rec)
+    groups = list(groups.values())
+
+    for name, build in (("details merged eagerly", _merge_fields_to_details),
+                        ("EventDetails (lazy)", lambda g: EventDetails([r["fields"] for r in g]))):
+        t0 = time.perf_counter()
+        details = [build(g) for g in groups]
+        elapsed = time.perf_counter() - t0
+        del details
+        # память — отдельным проходом: под tracemalloc время не показательно
+        details, size = _traced_bytes(lambda: [build(g) for g in groups])
+        del details
+        print(f"{name:28s} {elapsed:8.2f} s  {size / len(groups):8.0f} B/event")
+
+
+def bench_first_rows(path: str):
+    """
+    Время до первых строк таблицы: предварительный разбор хвоста файла
+    (с построением EventStore, как в LogLoadWorker) против полного разбора.
+    """
+    file_id = register_raw_file(path)
+
+    t0 = time.perf_counter()
+    tail = parse_audit_log_tail(path, file_id=file_id)
+    EventStore(reversed(tail))
+    first = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    events = parse_audit_log_file(path, workers=os.cpu_count() or 1, file_id=file_id)
+    EventStore(reversed(events))
+    full = time.perf_counter() - t0
+
+    print(f"{'first rows (tail)':28s} {len(tail):10d} events  {first:8.2f} s")
+    print(f"{'full parse':28s} {len(events):10d} events  {full:8.2f} s")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", nargs="?", help="файл журнала (по умолчанию — синтетический)")
+    ap.add_argument("--events", type=int, default=200000, help="событий в синтетическом журнале")
+    ap.add_argument("--paths", type=int, default=1, help="PATH-record'ов на SYSCALL в синтетическом журнале")
+    ap.add_argument("--enriched", action="store_true", help="синтетический журнал в формате ENRICHED")
+    ap.add_argument("--memory-only", action="store_true", help="только замер памяти на событие")
+    ap.add_argument("--first-rows", action="store_true", help="только время до первых строк таблицы")
+    ap.add_argument("--check", action="store_true",
+                    help="только проверки: токенизатор на эталонных строках, снимок passwd/group, слежение, "
+                         "параллельный разбор против последовательного, отбор при чтении против отбора в GUI")
+    args = ap.parse_args(argv)
+
+    if args.check:
+        with tempfile.TemporaryDirectory() as tmp:
+            run_checks(tmp)
+        print("checks passed")
+        return 0
+
+    def run(path):
+        if args.first_rows:
+            bench_first_rows(path)
+            return
+        if not args.memory_only:
+            bench_readers(path)
+            bench_tokenizer(path)
+            bench_details(path)
+        bench_event_memory(path)
+
+    if args.path:
+        run(args.path)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "audit.log")
+        generate_synthetic_log(path, args.events, paths=args.paths, enriched=args.enriched)
+        run(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
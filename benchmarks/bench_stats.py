@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк вкладки 'Статистика': прежний подсчёт (несколько проходов по списку
+событий, dict.get и datetime.fromtimestamp на каждое событие) против
+stats.compute_stats() — одного прохода по колонкам хранилища.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_stats                          # 1, 2 и 5 млн синтетических событий
+    python -m benchmarks.bench_stats --events 200000 1000000
+    python -m benchmarks.bench_stats --no-legacy --events 20000000
+    python -m benchmarks.bench_stats --check      # проверки времени (AssertionError при расхождении)
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from audit_viewer import timefmt
+from audit_viewer.event import AuditEvent
+from audit_viewer.incidents import find_critical_file_changes
+from audit_viewer.stats import compute_stats
+from audit_viewer.store import EventStore
+from audit_viewer.timefmt import DAY_SECONDS, HOUR_SECONDS, day_label, format_timestamp, local_buckets
+
+# Часовые пояса для проверки: переходы летнего времени в обе стороны полушарий,
+# получасовые смещение и переход, пояс без переходов
+CHECK_TIMEZONES = ("UTC", "Europe/Berlin", "America/Sao_Paulo", "Australia/Lord_Howe", "Asia/Kolkata")
+
+
+def synthetic_store(n_events: int, seed: int = 1) -> EventStore:
+    """Хранилище со случайными событиями: типы, пользователи, success, пути в details у SYSCALL."""
+    rnd = random.Random(seed)
+    types = ["SYSCALL"] * 6 + ["USER_AUTH", "USER_LOGIN", "USER_CMD", "EXECVE", "AVC"]
+    users = ["root", "analyst", "www-data", "postgres", ""] + [f"user{i}" for i in range(40)]
+    # details разделяются между событиями — память уходит на колонки, а не на словари
+    paths = ["/etc/passwd", "/etc/shadow", "/etc/sudoers.tmp", "/tmp/x", "/var/log/syslog", "/home/u/.bashrc"]
+    details = [{"name": p} for p in paths] + [{}]
+
+    def events():
+        ts = 1700000000.0
+        for i in range(n_events):
+            ts += rnd.random() * 2
+            event_type = rnd.choice(types)
+            yield {
+                "timestamp": ts,
+                "event_id": 1000 + i,
+                "event_type": event_type,
+                "user": rnd.choice(users),
+                "success": rnd.random() < 0.8,
+                "details": rnd.choice(details) if event_type == "SYSCALL" else {},
+                "raw": "",
+            }
+
+    return EventStore(events())
+
+
+def legacy_stats(events) -> dict:
+    """Подсчёт, как его делала вкладка раньше: отдельный проход по событиям на каждую цифру и группировку."""
+    users_set = {ev.get("user") for ev in events if ev.get("user")}
+    types_set = {ev.get("event_type") for ev in events if ev.get("event_type")}
+
+    failed_auth = 0
+    for ev in events:
+        if ev.get("event_type") in ("USER_AUTH", "USER_LOGIN") and ev.get("success") is not True:
+            failed_auth += 1
+
+    critical_changes = len(find_critical_file_changes(events))
+
+    type_counts = {}
+    for ev in events:
+        t = ev.get("event_type") or "UNKNOWN"
+        type_counts[t] = type_counts.get(t, 0) + 1
+
+    user_counts = {}
+    for ev in events:
+        u = ev.get("user") or "?"
+        user_counts[u] = user_counts.get(u, 0) + 1
+
+    day_counts = {}
+    for ev in events:
+        ts = ev.get("timestamp")
+        if ts is None:
+            continue
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        day_counts[day] = day_counts.get(day, 0) + 1
+
+    return {
+        "total": len(events),
+        "unique_users": len(users_set),
+        "unique_types": len(types_set),
+        "failed_auth": failed_auth,
+        "critical_changes": critical_changes,
+        "type_counts": type_counts,
+        "user_counts": user_counts,
+        "day_counts": day_counts,
+    }
+
+
+def _as_dict(stats) -> dict:
+    return {name: getattr(stats, name) for name in (
+        "total", "unique_users", "unique_types", "failed_auth", "critical_changes",
+        "type_counts", "user_counts", "day_counts",
+    )}
+
+
+def bench(n_events: int, legacy: bool):
+    t0 = time.perf_counter()
+    store = synthetic_store(n_events)
+    build = time.perf_counter() - t0
+
+    # первый вызов проверяет details кандидатов (маска критичных изменений), следующие берут её готовой
+    t0 = time.perf_counter()
+    stats = compute_stats(store)
+    first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    compute_stats(store)
+    repeat = time.perf_counter() - t0
+    half = np.arange(len(store) // 2, len(store), dtype=np.int64)
+    t0 = time.perf_counter()
+    compute_stats(store, half)
+    subset = time.perf_counter() - t0
+
+    line = (f"{n_events:9d} events  store {build:6.1f} s  engine first {first * 1000:8.1f} ms  "
+            f"repeat {repeat * 1000:7.1f} ms  half {subset * 1000:7.1f} ms")
+    if legacy:
+        events = list(store)
+        t0 = time.perf_counter()
+        expected = legacy_stats(events)
+        old = time.perf_counter() - t0
+        del events
+        line += f"  legacy {old:7.2f} s  x{old / first:5.1f} (x{old / repeat:6.1f} repeat)"
+        line += "  equal" if expected == _as_dict(stats) else "  MISMATCH"
+    print(line, flush=True)
+
+
+def _transition_seconds(start: int, end: int):
+    """Секунды [start, end), на которых меняется смещение локального времени (переходы DST)."""
+    found = []
+    prev = time.localtime(start).tm_gmtoff
+    for t in range(start, end, HOUR_SECONDS):
+        off = time.localtime(t).tm_gmtoff
+        if off != prev:
+            lo, hi = t - HOUR_SECONDS, t
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if time.localtime(mid).tm_gmtoff == prev:
+                    lo = mid
+                else:
+                    hi = mid
+            found.append(hi)
+            prev = off
+    return found
+
+
+def check_time_zone(rnd: random.Random):
+    """format_timestamp(), local_buckets() и day_label() против datetime в текущем часовом поясе."""
+    start, end = 1483228800, 1735689600  # 2017-01-01 .. 2025-01-01 UTC (в Бразилии DST до 2019)
+    transitions = _transition_seconds(start, end)
+    ts = [rnd.uniform(start, end) for _ in range(20000)]
+    for t in transitions:
+        # каждая секунда вокруг перехода и дробные метки на самой границе
+        ts.extend(t + d for d in range(-3, 4))
+        ts.extend(t + d + 0.999 for d in (-1, 0))
+    ts = np.array(ts, dtype=np.float64)
+
+    days = local_buckets(ts, DAY_SECONDS)
+    hours = local_buckets(ts, HOUR_SECONDS)
+    for t, day, hour in zip(ts.tolist(), days.tolist(), hours.tolist()):
+        dt = datetime.fromtimestamp(math.floor(t))
+        want_day = (dt.date() - date(1970, 1, 1)).days
+        assert day == want_day, f"{time.tzname}: сутки {t!r}: {day}, datetime — {want_day}"
+        assert hour == want_day * 24 + dt.hour, f"{time.tzname}: час {t!r}: {hour}, datetime — {dt}"
+        want_text = dt.strftime("%Y-%m-%d %H:%M:%S")
+        # дважды: второй раз строка берётся из кэша по секундам
+        for _ in range(2):
+            assert format_timestamp(t) == want_text, f"{time.tzname}: {t!r} → {format_timestamp(t)!r}, ожидалось {want_text!r}"
+        assert day_label(day) == dt.date().isoformat()
+    assert AuditEvent(timestamp=float(ts[0])).time == format_timestamp(float(ts[0]))
+    return len(ts), len(transitions)
+
+
+def check_time():
+    """
+    Время для таблицы и статистики без datetime на каждое событие совпадает
+    с datetime.fromtimestamp() в нескольких часовых поясах, в том числе
+    посекундно вокруг переходов летнего времени; мусорные метки не ломают
+    и не подвешивают подсчёт.
+    """
+    rnd = random.Random(3)
+    saved_tz = os.environ.get("TZ")
+    try:
+        for tz in CHECK_TIMEZONES:
+            os.environ["TZ"] = tz
+            time.tzset()
+            # кэш строк — по секунде без учёта пояса (пояс процесса не меняется на ходу)
+            timefmt._format_cache.clear()
+            n, n_transitions = check_time_zone(rnd)
+            print(f"{'time ' + tz:28s} {n:10d} timestamps  {n_transitions} DST transitions")
+    finally:
+        if saved_tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = saved_tz
+        time.tzset()
+        timefmt._format_cache.clear()
+
+    for bad in (None, float("nan"), float("inf"), "x"):
+        assert format_timestamp(bad) == "", f"format_timestamp({bad!r}) = {format_timestamp(bad)!r}"
+
+    # одна мусорная метка далеко в будущем: '?' вместо даты, подсчёт не растягивается на все сутки до неё
+    ts = np.array([1700000000.0, 1700003600.5, 1e300, -1e300], dtype=np.float64)
+    t0 = time.perf_counter()
+    days = local_buckets(ts)
+    elapsed = time.perf_counter() - t0
+    assert elapsed < 1.0, f"local_buckets с мусорной меткой: {elapsed:.2f} с"
+    assert day_label(int(days[0])) == datetime.fromtimestamp(1700000000).date().isoformat()
+    assert day_label(int(days[2])) == "?" and day_label(int(days[3])) == "?"
+    print(f"{'time garbage':28s} {elapsed * 1000:8.1f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, nargs="+", default=[1000000, 2000000, 5000000],
+                    help="размеры синтетических хранилищ")
+    ap.add_argument("--no-legacy", action="store_true", help="не замерять прежний подсчёт (он держит список событий)")
+    ap.add_argument("--check", action="store_true",
+                    help="только проверки: время и сутки/часы против datetime в нескольких часовых поясах")
+    args = ap.parse_args(argv)
+
+    if args.check:
+        check_time()
+        print("checks passed")
+        return 0
+
+    for n_events in args.events:
+        bench(n_events, legacy=not args.no_legacy)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
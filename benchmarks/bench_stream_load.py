@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Загрузка системного журнала потоком (helper через pkexec или фоновый сборщик):
+поток NDJSON из write_event_stream() подаётся в обработчики главного окна
+так же, как его читает QProcess/QLocalSocket, с периодическим сбросом пачек
+в таблицу, как по helper_flush_timer.
+
+В потоке часть событий запаздывает (как USER_AUTH/USER_LOGIN без EOE, которые
+уходят из окна переупорядочивания позже соседей) и приходит в следующих пачках.
+Проверяется, что по окончании потока хранилище упорядочено по времени,
+а таблица — от новых к старым; при расхождении — AssertionError.
+
+Запуск из корня проекта (нужен PyQt5, окно не показывается):
+    python -m benchmarks.bench_stream_load                     # 200 000 событий
+    python -m benchmarks.bench_stream_load --events 1000000 --late-every 20
+"""
+import argparse
+import heapq
+import io
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets  # noqa: E402
+
+from audit_viewer.helper_stream import write_event_stream  # noqa: E402
+from audit_viewer.main_window import MainWindow  # noqa: E402
+
+# Кусками такого размера поток приходит в readyRead
+READ_CHUNK_BYTES = 64 * 1024
+# Сколько кусков приходит между срабатываниями helper_flush_timer
+CHUNKS_PER_FLUSH = 8
+
+
+def interleaved_events(n_events: int, late_every: int, max_delay: int, seed: int = 1):
+    """
+    События по возрастанию времени, в которых каждое late_every-е (USER_AUTH)
+    передвинуто на 1..max_delay позиций позже — так их отдаёт разбор журнала.
+    """
+    rnd = random.Random(seed)
+    users = ["root", "analyst", "www-data"] + [f"user{i}" for i in range(20)]
+    events = []
+    ts = 1700000000.0
+    for i in range(n_events):
+        ts += rnd.random()
+        late = i % late_every == 0
+        events.append({
+            "timestamp": round(ts, 3),
+            "event_id": 1000 + i,
+            "event_type": "USER_AUTH" if late else "SYSCALL",
+            "user": rnd.choice(users),
+            "success": rnd.random() < 0.8,
+            "details": {},
+            "raw": "",
+        })
+
+    stream = []
+    delayed = []  # куча (позиция, на которой событие выйдет, номер, событие)
+    for i, ev in enumerate(events):
+        if ev["event_type"] == "USER_AUTH":
+            heapq.heappush(delayed, (i + rnd.randint(1, max_delay), i, ev))
+        else:
+            stream.append(ev)
+        while delayed and delayed[0][0] <= i:
+            stream.append(heapq.heappop(delayed)[2])
+    stream.extend(heapq.heappop(delayed)[2] for _ in range(len(delayed)))
+    return stream
+
+
+def feed_stream(window: MainWindow, data: bytes):
+    """Подаёт поток в окно кусками, как _on_helper_output(), и завершает загрузку."""
+    window._start_helper_stream()
+    for n, start in enumerate(range(0, len(data), READ_CHUNK_BYTES), 1):
+        for msg in window._helper_decoder.feed(data[start:start + READ_CHUNK_BYTES]):
+            window._handle_helper_message(msg)
+        if n % CHUNKS_PER_FLUSH == 0:
+            window._flush_helper_events()
+    window._finish_helper_load()
+
+
+def check_stream_load(n_events: int, late_every: int, max_delay: int):
+    events = interleaved_events(n_events, late_every, max_delay)
+    out = io.BytesIO()
+    write_event_stream(out, events, total=len(events))
+    data = out.getvalue()
+
+    window = MainWindow()
+    t0 = time.perf_counter()
+    feed_stream(window, data)
+    elapsed = time.perf_counter() - t0
+
+    store = window.all_events
+    assert len(store) == n_events, f"загружено {len(store)} событий из {n_events}"
+    assert store.time_order() is None, "хранилище не упорядочено по времени"
+
+    model = window.events_model
+    rows = model.rows
+    assert len(rows) == n_events, f"в таблице {len(rows)} строк из {n_events}"
+    ts = store.timestamps[rows]
+    assert np.all(np.diff(ts) <= 0), "таблица не упорядочена от новых к старым"
+    first = model.get_event(0)
+    assert first["timestamp"] == max(ev["timestamp"] for ev in events), "первая строка таблицы — не самое новое событие"
+
+    window.close()
+    print(f"{n_events:9d} events  late every {late_every} by up to {max_delay}  "
+          f"{len(data) / 1e6:7.1f} MB stream  load {elapsed:6.2f} s  order ok", flush=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, nargs="+", default=[200000], help="событий в потоке")
+    ap.add_argument("--late-every", type=int, default=50, help="каждое N-е событие запаздывает")
+    ap.add_argument("--max-delay", type=int, default=10000, help="на сколько событий самое позднее")
+    args = ap.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+    for n_events in args.events:
+        check_stream_load(n_events, args.late_every, args.max_delay)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
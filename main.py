@@ -1,16 +1,21 @@
 import sys
-from PyQt5 import QtWidgets
-
-from audit_viewer.main_window import MainWindow
-import audit_helper
+import multiprocessing
 
 HELPER_FLAG = "--run-helper"
 
 
 def main():
+    # нужно для параллельного разбора (ProcessPoolExecutor) в сборке PyInstaller
+    multiprocessing.freeze_support()
+
     if HELPER_FLAG in sys.argv:
+        # helper не импортирует GUI (PyQt5, matplotlib): первые события уходят сразу
+        import audit_helper
         return audit_helper.main()
 
+    from PyQt5 import QtWidgets
+    from audit_viewer.main_window import MainWindow
+
     app = QtWidgets.QApplication(sys.argv)
     window = MainWindow()
     window.show()